@@ -0,0 +1,27 @@
+"""Test pvs.core module."""
+
+# Asserts are used here,
+# ruff: noqa: S101, PLR2004
+
+from tests.test_testing_runner import SCENARIO
+from wetest.pvs.core import pvs_from_suite
+from wetest.testing import generator
+from wetest.testing.plan import TestPlan as Plan
+
+
+def test_sweep_pvs():
+    sweep_test = {"name": "sweep", "setter": "SP", "range": {"start": 0, "stop": 1}}
+    sweep_test["range"]["lin"] = 100001
+    sweep_test["finally"] = {"value": 0}
+    tests_gen = generator.TestsGenerator({**SCENARIO, "tests": [sweep_test]})
+    plan = Plan()
+    tests_gen.append_to_plan(plan, scenario_index=0)
+
+    pvs = pvs_from_suite(plan)
+    assert list(pvs) == ["RUN:SP"]
+    setter_subtests = pvs["RUN:SP"].setter_subtests
+    assert len(setter_subtests) == 100002
+    assert {"test-0-0-0", "test-0-0-100001"} <= setter_subtests
+    assert not pvs["RUN:SP"].getter_subtests
+    # only the `finally` subtest exists, the ones of the range are not created
+    assert len(tests_gen.tests_list[0]._created) == 1  # noqa: SLF001
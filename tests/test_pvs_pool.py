@@ -0,0 +1,41 @@
+"""Test pvs.pool module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+import time
+
+from wetest.pvs.pool import PVsPool, normalize_pv_name
+
+
+def test_normalize_pv_name():
+    assert normalize_pv_name("SIM:SP") == "SIM:SP"
+    assert normalize_pv_name("SIM:SP.VAL") == "SIM:SP"
+    assert normalize_pv_name("SIM:SP.DESC") == "SIM:SP.DESC"
+
+
+def test_pool_reuses_channels():
+    pool = PVsPool(connection_timeout=0)
+    first = pool.get("WETEST:POOL:TEST")
+    assert pool.get("WETEST:POOL:TEST.VAL") is first
+    assert pool.get("WETEST:POOL:TEST") is first
+    assert pool.stats()["channels"] == 1
+    assert pool.misses == 1
+    assert pool.hits == 2  # noqa: PLR2004
+
+    pool.close()
+    assert len(pool) == 0
+    assert "WETEST:POOL:TEST" not in pool
+
+
+def test_warm_up_deadline():
+    pool = PVsPool(connection_timeout=0)
+    start = time.time()
+    latencies, unreachable = pool.warm_up(["WETEST:POOL:A", "WETEST:POOL:B.VAL"], 0.2)
+    assert time.time() - start < 1
+    assert latencies == {}
+    assert sorted(unreachable) == ["WETEST:POOL:A", "WETEST:POOL:B"]
+    # warmed up channels are reused
+    assert pool.get("WETEST:POOL:A") is pool.get("WETEST:POOL:A.VAL")
+    assert pool.misses == 0
+    pool.close()
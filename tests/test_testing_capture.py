@@ -0,0 +1,71 @@
+"""Test testing.capture module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+import numpy as np
+
+from wetest.testing.capture import Capture, CaptureSettings
+from wetest.testing.generator import TestData as Data
+
+
+class MonitoredPV:
+    """PV calling its callbacks when its value is set."""
+
+    pvname = "GET"
+
+    def __init__(self, value) -> None:
+        self.value = value
+        self.callbacks = {}
+
+    def get(self, **_kws):
+        return self.value
+
+    def add_callback(self, callback, **_kws):
+        self.callbacks[len(self.callbacks)] = callback
+        return len(self.callbacks) - 1
+
+    def remove_callback(self, index):
+        del self.callbacks[index]
+
+    def set(self, value):
+        self.value = value
+        for callback in list(self.callbacks.values()):
+            callback(value=value)
+
+
+def test_capture_is_bounded():
+    pv = MonitoredPV(0)
+    capture = Capture(pv, max_samples=3)
+    for value in [1, 2, 3]:
+        pv.set(value)
+    times, values = capture.stop()
+    pv.set(4)
+
+    # the latest samples are kept
+    assert list(values) == [1, 2, 3]
+    assert np.all(np.diff(times) >= 0)
+    assert capture.dropped == 1
+    assert not pv.callbacks
+
+
+def test_capture_overflow():
+    pv = MonitoredPV(0)
+    capture = Capture(pv, max_samples=10)
+    for value in range(1, 1000):
+        pv.set(value)
+    times, values = capture.stop()
+
+    assert list(values) == list(range(990, 1000))
+    assert len(times) == 10  # noqa: PLR2004
+    assert capture.dropped == 990  # noqa: PLR2004
+
+
+def test_capture_applies():
+    settings = CaptureSettings()
+    numeric = Data("continue", "test", "subtest", getter="GET", get_value=1)
+    assert not settings.applies(numeric)
+    settings.max_samples = 10
+    assert settings.applies(numeric)
+    text = Data("continue", "test", "subtest", getter="GET", get_value="on")
+    assert not settings.applies(text)
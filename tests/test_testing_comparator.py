@@ -0,0 +1,50 @@
+"""Test testing.comparator module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+import numpy as np
+import pytest
+
+from wetest.testing.comparator import convert_values
+from wetest.testing.generator import TestData as Data
+
+
+def subtest(**kwargs):
+    return Data("continue", "test", "subtest", getter="GET", **kwargs)
+
+
+def test_convert_values():
+    assert convert_values(["a", "12", "1.5", 3]) == [97, 12, 1.5, 3]
+
+
+def test_exact():
+    comparator = subtest(get_value=3).comparator
+    comparator.check(3)
+    with pytest.raises(AssertionError, match="Expected GET to be 3, but got 4"):
+        comparator.check(4)
+
+
+def test_tolerance():
+    comparator = subtest(get_value=10, margin=0.1, delta=0.5).comparator
+    comparator.check(10.9)
+    with pytest.raises(AssertionError, match=r"within \[9,11\]"):
+        comparator.check(11.5)
+
+
+def test_array():
+    comparator = subtest(get_value=[1, "2"], delta=0.2).comparator
+    comparator.check(np.array([1.1, 50, 0]))
+    comparator.check(np.array([1.1, 50]))
+    with pytest.raises(AssertionError, match="difference is"):
+        comparator.check(np.array([1.5, 50, 0]))
+    with pytest.raises(AssertionError, match="3 elements long"):
+        subtest(get_value=[1, 2, 3]).comparator.check(np.array([1, 2]))
+
+
+def test_conversion_error_is_deferred():
+    comparator = subtest(get_value=["abc"], set_value=["abc"]).comparator
+    with pytest.raises(ValueError, match="abc"):
+        comparator.check(np.array([0]))
+    with pytest.raises(ValueError, match="abc"):
+        _ = comparator.set_value
@@ -0,0 +1,44 @@
+"""Test testing.control module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+import threading
+import time
+
+import pytest
+
+from wetest.common.constants import ABORT_FROM_TEST, PAUSE_FROM_TEST
+from wetest.testing.control import RunAbortedError, RunControl
+
+
+def test_pause_resume():
+    run_control = RunControl()
+    run_control.checkpoint()
+
+    run_control.request(PAUSE_FROM_TEST)
+    assert run_control.paused
+    threading.Timer(0.2, run_control.resume).start()
+    start = time.time()
+    run_control.checkpoint()
+    assert time.time() - start >= 0.15  # noqa: PLR2004
+
+
+def test_abort_while_paused_or_sleeping():
+    run_control = RunControl()
+    run_control.pause()
+    threading.Timer(0.1, run_control.request, [ABORT_FROM_TEST]).start()
+    with pytest.raises(RunAbortedError):
+        run_control.checkpoint()
+
+    # a new start clears the abort, closing stops waiting for one
+    run_control.request_start()
+    assert run_control.wait_start()
+    start = time.time()
+    threading.Timer(0.1, run_control.abort).start()
+    with pytest.raises(RunAbortedError):
+        run_control.sleep(10)
+    assert time.time() - start < 1
+
+    run_control.close()
+    assert not run_control.wait_start()
@@ -0,0 +1,48 @@
+"""Test testing.dag module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+import pytest
+
+from wetest.testing.dag import (
+    InvalidDependencyError,
+    critical_path,
+    resolve_after,
+)
+
+TESTS = [
+    {"name": "configure A"},
+    {"name": "check A"},
+    {"name": "configure B", "after": []},
+    {"name": "ignored", "after": "configure B"},
+    {"name": "check B"},
+    {"name": "check all", "after": ["check A", "check B"]},
+]
+
+
+def test_resolve_after():
+    prerequisites = resolve_after(TESTS, [True, True, True, False, True, True])
+    assert prerequisites == [set(), {0}, set(), {2}, {2}, {1, 4}]
+    assert resolve_after(TESTS[:2], [True, True]) is None
+
+
+def test_resolve_after_unknown_test():
+    with pytest.raises(InvalidDependencyError):
+        resolve_after(
+            [{"name": "first", "after": "second"}, {"name": "second"}],
+            [1, 1],
+        )
+
+
+def test_critical_path():
+    durations = {"configure A": 1, "check A": 1, "configure B": 3, "check all": 1}
+    dependencies = {
+        "configure A": set(),
+        "check A": {"configure A"},
+        "configure B": set(),
+        "check all": {"check A", "configure B"},
+    }
+    length, path = critical_path(dependencies, durations.get)
+    assert length == 4  # noqa: PLR2004
+    assert path == ["configure B", "check all"]
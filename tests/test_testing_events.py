@@ -0,0 +1,55 @@
+"""Test testing.events module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+import io
+import json
+
+from wetest.common.constants import PAUSE_FROM_TEST
+from wetest.testing import events
+
+
+def test_round_trip():
+    channel = events.EventChannel()
+    channel.send(events.STARTED, (1, 2, 3))
+    channel.send(events.RESULT, (1, 2, 3), events.FAILURE, 0.25, "Expected 1")
+    channel.send(events.CONTROL, status=events.CONTROLS[PAUSE_FROM_TEST])
+
+    started = channel.recv()
+    assert started.kind == events.STARTED
+    assert started.test_id == "test-1-2-3"
+    assert started.message is None
+
+    result = channel.recv()
+    assert (result.status, result.duration, result.message) == (
+        events.FAILURE,
+        0.25,
+        "Expected 1",
+    )
+    assert channel.recv().control == PAUSE_FROM_TEST
+    assert channel.nb_received == 3  # noqa: PLR2004
+    assert channel.rate() > 0
+
+
+def test_json_lines():
+    stream = io.StringIO()
+    writer = events.JsonLinesWriter(stream)
+    writer.send(events.STARTED, (0, 0, 0))
+    writer.send(events.RESULT, (0, 0, 0), events.FAILURE, 0.25, "Expected 1")
+    writer.send(events.CONTROL, status=events.CONTROLS[PAUSE_FROM_TEST])
+
+    started, result, control = map(json.loads, stream.getvalue().splitlines())
+    assert started["test"] == "test-0-0-0"
+    assert (result["status"], result["message"]) == ("failure", "Expected 1")
+    assert control["control"] == PAUSE_FROM_TEST
+    assert "test" not in control
+
+
+def test_log_event(caplog):
+    retry = events.Event(events.RETRY, 2, (0, 1, 2), 0.5, "Expected 1")
+    failure = events.Event(events.RESULT, events.FAILURE, (0, 1, 2), 0.5, "Expected 1")
+    events.log_event(retry)
+    events.log_event(failure)
+    assert "Retry (2/?) test-0-1-2    (in 0.500s) Expected 1" in caplog.text
+    assert "Failure of test-0-1-2    (in 0.500s) Expected 1" in caplog.text
@@ -0,0 +1,81 @@
+"""Test testing.plan module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+from tests.test_testing_runner import SCENARIO
+from wetest.testing import generator
+from wetest.testing.plan import FILE_SKIP_REASON, RunResults
+from wetest.testing.plan import TestPlan as Plan
+
+
+def make_plan():
+    plan = Plan()
+    generator.TestsGenerator(SCENARIO).append_to_plan(plan, scenario_index=0)
+    return plan
+
+
+def test_skip_reasons():
+    plan = make_plan()
+    assert len(plan) == plan.countTestCases() == 5  # noqa: PLR2004
+    assert plan.skip_reasons() == {}
+
+    plan.tests_infos["test-0-0-0"].skip = True
+    assert plan.skip_reasons() == {"test-0-0-0": FILE_SKIP_REASON}
+    reasons = plan.skip_reasons(["test-0-0-0", "test-0-1-0"], "GUI")
+    assert set(reasons) == {"test-0-0-1", "test-0-0-2", "test-0-1-1"}
+    assert set(reasons.values()) == {"GUI"}
+
+
+def test_run_results():
+    plan = make_plan()
+    result = RunResults(plan, plan.skip_reasons(["test-0-0-0"], "GUI"))
+
+    # skipped tests are not executed
+    for planned_test in plan[1:]:
+        planned_test(result)
+    assert result.testsRun == 4  # noqa: PLR2004
+    assert [test.id() for test, _ in result.skipped] == [
+        "test-0-0-1",
+        "test-0-0-2",
+        "test-0-1-0",
+        "test-0-1-1",
+    ]
+    # the first subtest did not run, which is expected once aborted only
+    assert [test.id() for test, _ in result.not_run] == ["test-0-0-0"]
+    assert not result.wasSuccessful()
+    assert "not_run=1" in result.summary()
+    result.aborted = True
+    assert result.not_run == []
+    assert result.wasSuccessful()
+
+    # failures only keep the assertion message
+    result.startTest(plan[0])
+    try:
+        assert plan[0].data.skip, "wrong value"
+    except AssertionError as e:
+        result.addFailure(plan[0], (type(e), e, e.__traceback__))
+    result.stopTest(plan[0])
+    [(failed_test, message)] = result.failures
+    assert failed_test is plan[0]
+    assert message.startswith("AssertionError: wrong value")
+    assert "Traceback" not in message
+    assert "failures=1" in result.summary()
+
+
+def test_sweep_subtests():
+    sweep_test = {"name": "sweep", "setter": "SP", "range": {"start": 0, "stop": 1}}
+    sweep_test["range"]["lin"] = 100001
+    tests_gen = generator.TestsGenerator({**SCENARIO, "tests": [sweep_test]})
+    assert isinstance(tests_gen.tests_list[0], generator.SubtestSweep)
+    plan = Plan()
+    tests_gen.append_to_plan(plan, scenario_index=0)
+
+    assert len(plan) == 100001  # noqa: PLR2004
+    assert plan.index("test-0-0-50000") == 50000  # noqa: PLR2004
+    test_data = plan.tests_infos["test-0-0-50000"]
+    assert test_data.set_value == 0.5  # noqa: PLR2004
+    assert plan[50000].data is test_data
+    assert "test-0-0-100001" not in plan.tests_infos
+    assert plan.pv_names() == {"RUN:SP"}
+    assert plan.skip_reasons() == {}
@@ -1,11 +1,22 @@
 """Test testing.reader module."""
 
 # Asserts are used here,
-# ruff: noqa: S101
+# ruff: noqa: S101, PLR2004
 
 import pytest
+from pykwalify.errors import SchemaError
 
-from wetest.testing.reader import ScenarioReader, UnsupportedFileFormatError
+from wetest.testing.cache import ParseCache, file_digest
+from wetest.testing.reader import (
+    MacroError,
+    MacrosManager,
+    ScenarioReader,
+    UnsupportedFileFormatError,
+    compiled_schema,
+    iter_scenario,
+    read_scenarios,
+    read_template,
+)
 
 
 def test_yaml_version_checker():
@@ -63,3 +74,159 @@ def test_scenario_are_deserialized_in_suite():
 
 def test_bad_syntax():
     assert not ScenarioReader("tests/bad.yml").is_valid()
+
+
+def test_compiled_schema():
+    assert compiled_schema() is compiled_schema()
+    core = compiled_schema().core({"version": {"major": 2}})
+    with pytest.raises(SchemaError, match="minor"):
+        core.validate()
+
+
+TOP_FILE = """
+version: {major: 2, minor: 0, bugfix: 0}
+name: Suite
+include:
+    - [scenario.yaml, GETTER: RB]
+"""
+
+SCENARIO_FILE = """
+version: {major: 2, minor: 0, bugfix: 0}
+config: {name: Scenario}
+tests:
+    - name: Read back
+      getter: $(GETTER)
+      values: [1]
+"""
+
+
+def test_macros_substitution():
+    macros = MacrosManager(
+        known_macros={"P": "SL", "N": 2, "PV2": "SL:2", "F": "1e3", "L": [1, "$(P)"]},
+    )
+    assert macros.substitute_macros("$(P):$(N)") == "SL:2"
+    assert macros.substitute_macros("$(PV$(N))") == "SL:2"
+    assert macros.substitute_macros("${F}") == 1000.0
+    assert macros.substitute_macros("$(N)$(N)") == 22
+    assert macros.substitute_macros("n$(U)") == "n$(U)"
+    assert macros.substitute_macros("[$(N), $(P)]") == [2, "SL"]
+    assert macros.substitute_macros({"values": "$(L)"}) == {"values": [1, "SL"]}
+    assert macros.substitute_macros("no") == "no"
+    assert macros.substitute_macros("$(P)") == "SL"
+    assert macros.used_macros == {"P", "N", "PV2", "F", "L"}
+    assert macros.unknown_macros == {"U": 1}
+
+    macros.add_new_macros([{"A": "$(B)+"}, {"B": "$(A)-"}])
+    macros.substitute_macros("$(A)")
+    with pytest.raises(MacroError):
+        macros.raise_errors()
+
+
+def test_parse_cache(tmp_path, monkeypatch):
+    top_file = tmp_path / "suite.yaml"
+    top_file.write_text(TOP_FILE)
+    scenario_file = tmp_path / "scenario.yaml"
+    scenario_file.write_text(SCENARIO_FILE)
+    cache = ParseCache(tmp_path / "cache")
+    first = ScenarioReader(top_file, cache=cache).get_deserialized()
+    assert first["scenarios"][0]["tests"][0]["getter"] == "RB"
+
+    def no_parsing(_self):
+        raise AssertionError
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ScenarioReader, "_deserialize", no_parsing)
+        assert ScenarioReader(top_file, cache=cache).get_deserialized() == first
+        # macros are part of the key
+        macros = MacrosManager(known_macros={"GETTER": "RB2"})
+        with pytest.raises(AssertionError):
+            ScenarioReader(top_file, macros_mgr=macros, cache=cache)
+
+        # includes are looked for from the current directory first
+        other_directory = tmp_path / "other"
+        other_directory.mkdir()
+        (other_directory / "scenario.yaml").write_text(SCENARIO_FILE)
+        patch.chdir(other_directory)
+        with pytest.raises(AssertionError):
+            ScenarioReader(top_file, cache=cache)
+        patch.chdir(tmp_path)
+
+        # included files are checked too
+        scenario_file.write_text(SCENARIO_FILE + "\n")
+        with pytest.raises(AssertionError):
+            ScenarioReader(top_file, cache=cache)
+
+
+def test_templates_parsed_once(tmp_path):
+    top_file = tmp_path / "suite.yaml"
+    top_file.write_text(TOP_FILE + "    - [scenario.yaml, GETTER: RB2]\n")
+    (tmp_path / "scenario.yaml").write_text(SCENARIO_FILE)
+    read_template.cache_clear()
+    suite = ScenarioReader(top_file).get_deserialized()
+
+    getters = [scenario["tests"][0]["getter"] for scenario in suite["scenarios"]]
+    assert getters == ["RB", "RB2"]
+    # parsed once for both includes, the template is left as is
+    assert read_template.cache_info().misses == 2
+    template = read_template(
+        str(tmp_path / "scenario.yaml"), file_digest(tmp_path / "scenario.yaml")
+    )
+    assert template["tests"][0]["getter"] == "$(GETTER)"
+
+
+def test_streaming(tmp_path):
+    for path in ["tests/macro-testing.yaml", "tests/suite_example01.yaml"]:
+        blocks = {}
+        for block, content in iter_scenario(path):
+            blocks[block] = list(content) if block == "tests" else content
+        assert blocks == read_template(path, file_digest(path))
+
+    read = ScenarioReader("tests/suite_example01.yaml", stream=False)
+    streamed = ScenarioReader("tests/suite_example01.yaml", stream=True)
+    assert streamed.get_deserialized() == read.get_deserialized()
+
+    # tests are substituted as read, with the macros given after them too
+    late_macros = tmp_path / "late_macros.yaml"
+    late_macros.write_text(SCENARIO_FILE + "macros: {GETTER: RB}\n")
+    read = ScenarioReader(late_macros, stream=False)
+    streamed = ScenarioReader(late_macros, stream=True)
+    assert streamed.get_deserialized() == read.get_deserialized()
+    assert streamed.get_deserialized()["scenarios"][0]["tests"][0]["getter"] == "RB"
+
+
+def test_parallel_includes(tmp_path):
+    serial = ScenarioReader("tests/suite_example01.yaml")
+    parallel = ScenarioReader("tests/suite_example01.yaml", jobs=2)
+    assert parallel.get_deserialized() == serial.get_deserialized()
+    assert parallel.files == serial.files
+
+    # errors are the ones of the first file failing, in declaration order
+    top_file = tmp_path / "suite.yaml"
+    top_file.write_text(TOP_FILE + "    - scenario.yaml\n    - old.yaml\n")
+    (tmp_path / "scenario.yaml").write_text(SCENARIO_FILE)
+    (tmp_path / "old.yaml").write_text(SCENARIO_FILE.replace("major: 2", "major: 1"))
+    with pytest.raises(UnsupportedFileFormatError, match=r"1\.0\.0"):
+        ScenarioReader(top_file, jobs=2)
+
+
+def test_read_scenarios(tmp_path):
+    (tmp_path / "scenario.yaml").write_text(SCENARIO_FILE)
+    files = []
+    for getter in ["RB", "RB2"]:
+        files.append(tmp_path / f"suite_{getter}.yaml")
+        files[-1].write_text(
+            TOP_FILE.replace("GETTER: RB", f"GETTER: {getter}")
+            + f"    - [scenario.yaml, GETTER: {getter}:2]\n",
+        )
+    serial = read_scenarios(files)
+    parallel = read_scenarios(files, jobs=2)
+    assert [reader.get_deserialized() for reader in parallel] == [
+        reader.get_deserialized() for reader in serial
+    ]
+    tests = parallel[1].get_deserialized()["scenarios"][1]["tests"]
+    assert tests[0]["getter"] == "RB2:2"
+
+    # errors are the ones of the first file failing, in order
+    (tmp_path / "old.yaml").write_text(SCENARIO_FILE.replace("major: 2", "major: 1"))
+    with pytest.raises(UnsupportedFileFormatError, match=r"1\.0\.0"):
+        read_scenarios([*files, tmp_path / "old.yaml"], jobs=2)
@@ -0,0 +1,39 @@
+"""Test testing.retry module."""
+
+# Asserts are used here,
+# ruff: noqa: S101, PLR2004
+
+import pytest
+
+from wetest.testing.retry import INFINITE_RETRY_MAX_TIME, RetryPolicy
+
+
+def test_fixed_backoff():
+    policy = RetryPolicy(retry=2)
+    assert policy.wait_time(1, 0) == pytest.approx(0.1)
+    assert policy.wait_time(2, 0) == pytest.approx(0.1)
+    assert policy.should_retry(2, 0)
+    assert not policy.should_retry(3, 0)
+
+
+def test_exponential_backoff():
+    policy = RetryPolicy.from_data(
+        5,
+        {"backoff": "exponential", "interval": 1, "max_interval": 5, "max_time": 10},
+    )
+    assert [policy.wait_time(n, 0) for n in range(1, 5)] == [1, 2, 4, 5]
+    # waits never exceed the time budget
+    assert policy.wait_time(4, 9) == pytest.approx(1)
+    assert not policy.should_retry(1, 10)
+
+
+def test_jitter_backoff():
+    policy = RetryPolicy(retry=3, backoff="jitter", interval=1)
+    assert all(0 <= policy.wait_time(3, 0) <= 4 for _ in range(20))
+
+
+def test_infinite_retry_is_bounded():
+    policy = RetryPolicy(retry=float("inf"))
+    assert policy.max_time == INFINITE_RETRY_MAX_TIME
+    assert policy.should_retry(10**6, 0)
+    assert not policy.should_retry(1, INFINITE_RETRY_MAX_TIME)
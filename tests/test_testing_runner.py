@@ -0,0 +1,91 @@
+"""Test testing.runner module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+from wetest.testing import generator
+from wetest.testing.aio import AsyncTestSuite
+from wetest.testing.plan import TestPlan as Plan
+from wetest.testing.runner import (
+    ConcurrentTestSuite,
+    group_tests,
+    is_batchable,
+)
+
+SCENARIO = {
+    "config": {
+        "name": "runner testing",
+        "type": "functional",
+        "prefix": "RUN:",
+        "use_prefix": True,
+        "delay": 0,
+        "delay_mode": "fixed",
+        "ignore": False,
+        "skip": False,
+        "on_failure": "continue",
+        "retry": 0,
+    },
+    "tests": [
+        {"name": "range", "setter": "SP", "getter": "RB.VAL", "values": [1, 2, 3]},
+        {
+            "name": "commands",
+            "commands": [
+                {"name": "first", "getter": "A", "value": 1},
+                {"name": "second", "setter": "B", "value": 1},
+            ],
+        },
+    ],
+}
+
+
+def test_group_tests(monkeypatch):
+    suite = Plan()
+    generator.TestsGenerator(SCENARIO).append_to_plan(suite, scenario_index=0)
+
+    def no_subtest(_self, _value):
+        raise AssertionError
+
+    # subtests of a sweep are only created once the group runs
+    with monkeypatch.context() as patch:
+        patch.setattr(generator.SubtestSweep, "_create", no_subtest)
+        groups = group_tests(suite)
+    assert [(g.scenario, g.test) for g in groups] == [(0, 0), (0, 1)]
+    assert [g.indexes for g in groups] == [range(3), range(3, 5)]
+    assert groups[0].pvs == {"RUN:SP", "RUN:RB"}
+    assert groups[1].pvs == {"RUN:A", "RUN:B"}
+    assert groups[0].title == "range"
+    assert [test_case.index for test_case, _ in groups[0].subtests()] == [0, 1, 2]
+
+
+def test_startable_groups():
+    suite = Plan()
+    generator.TestsGenerator(SCENARIO).append_to_plan(suite, scenario_index=0)
+    configs = [{"name": "suite"}, SCENARIO["config"]]
+    groups = group_tests(suite)
+
+    # groups sharing a PV never start together
+    pending = list(groups)
+    pvs_in_use = {"RUN:A"}
+    runner = ConcurrentTestSuite(suite, configs, jobs=2)
+    started = list(runner.startable_groups(pending, 0, pvs_in_use))
+    assert started == [groups[0]]
+    assert pending == [groups[1]]
+    assert pvs_in_use == {"RUN:A", "RUN:SP", "RUN:RB"}
+
+    # no more than `jobs` groups running, no limit on event loop by default
+    assert list(runner.startable_groups(list(groups), 2, set())) == []
+    runner = AsyncTestSuite(suite, configs)
+    assert list(runner.startable_groups(list(groups), 2, set())) == groups
+
+
+def test_is_batchable():
+    suite = Plan()
+    generator.TestsGenerator(SCENARIO).append_to_plan(suite, scenario_index=0)
+    groups = group_tests(suite)
+
+    # only the getter-only command can be read along with others
+    assert not any(is_batchable(test_data) for _, test_data in groups[0].subtests())
+    assert [is_batchable(test_data) for _, test_data in groups[1].subtests()] == [
+        True,
+        False,
+    ]
@@ -0,0 +1,32 @@
+"""Test testing.settle module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+import pytest
+
+from wetest.testing.settle import MIN_SAMPLES, SAFETY_FACTOR, SettleHistory
+
+
+def test_learned_delay():
+    history = SettleHistory(path=None)
+    for _ in range(MIN_SAMPLES - 1):
+        history.record("SP", "RB", 0.1)
+    assert history.learned_delay("SP", "RB", 1.0) is None
+
+    history.record("SP", "RB", 0.1)
+    assert history.learned_delay("SP", "RB", 1.0) == pytest.approx(0.1 * SAFETY_FACTOR)
+    # never more than the configured delay
+    assert history.learned_delay("SP", "RB", 0.12) == pytest.approx(0.12)
+    assert history.learned_delay(None, "RB", 1.0) is None
+
+
+def test_save_merges(tmp_path):
+    path = tmp_path / "settle-history.json"
+    first, second = SettleHistory(path), SettleHistory(path)
+    first.record("SP", "RB", 0.1)
+    second.record("SP", "RB", 0.2)
+    first.save()
+    second.save()
+
+    assert SettleHistory(path).samples("SP", "RB") == [0.1, 0.2]
@@ -0,0 +1,36 @@
+"""Test testing.shards module."""
+
+# Asserts are used here,
+# ruff: noqa: S101
+
+from tests.test_testing_runner import SCENARIO
+from wetest.testing import generator
+from wetest.testing.plan import FAILURE, SKIPPED, RunResults
+from wetest.testing.plan import TestPlan as Plan
+from wetest.testing.shards import (
+    ShardedTestSuite,
+    merge_outcome,
+    scenario_outcome,
+)
+
+
+def test_outcome_round_trip():
+    plan = Plan()
+    generator.TestsGenerator(SCENARIO).append_to_plan(plan, scenario_index=0)
+    assert list(ShardedTestSuite(plan, [], 2).scenarios()) == [0]
+
+    result = RunResults(plan)
+    result.add_tests_run(5)
+    result.record(plan.index("test-0-0-1"), FAILURE, "trace", 0.5)
+    result.record(plan.index("test-0-1-0"), SKIPPED, "reason")
+    outcome = scenario_outcome(0, result)
+    assert len(outcome["records"]) == 2  # noqa: PLR2004
+    # only the subtests run are sent back
+    assert sorted(outcome["recorded"]) == [index for index, *_ in outcome["records"]]
+
+    merged = RunResults(plan)
+    merge_outcome(merged, outcome)
+    assert merged.testsRun == 5  # noqa: PLR2004
+    assert merged.failures == result.failures
+    assert merged.skipped == result.skipped
+    assert merged.durations[plan.index("test-0-0-1")] == 0.5  # noqa: PLR2004
@@ -0,0 +1,70 @@
+"""Test testing.metrics and testing.soak modules."""
+
+# Asserts are used here,
+# ruff: noqa: S101, PLR2004
+
+import pytest
+
+from tests.test_testing_plan import make_plan
+from wetest.testing.events import FAILURE, SUCCESS
+from wetest.testing.metrics import GET, LatencyHistogram, LoadMetrics
+from wetest.testing.plan import RunResults
+from wetest.testing.soak import SoakTestSuite
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for latency in [0.001] * 90 + [0.1] * 10:
+        histogram.add(latency)
+    assert histogram.count == 100
+    # accurate to a bin
+    assert histogram.percentile(50) == pytest.approx(0.001, rel=0.05)
+    assert histogram.percentile(99) == pytest.approx(0.1, rel=0.05)
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_metrics_rows():
+    metrics = LoadMetrics()
+    metrics.record(GET, "RB", 0.001)
+    assert not metrics.histograms  # not enabled
+
+    metrics.enabled = True
+    metrics.elapsed = 2.0
+    for pv_name in ("RB", "RB", "RB2"):
+        metrics.record(GET, pv_name, 0.001)
+    (kind, total, count, rate, *_), rb, _rb2 = metrics.rows()
+    assert (kind, total, count, rate) == (GET, None, 3, 1.5)
+    assert rb[1:3] == ("RB", 2)
+
+
+class FailingOnce:
+    """Runner failing the first subtest on its first run only.
+
+    The other subtests always succeed.
+    """
+
+    def __init__(self) -> None:
+        self.nb_runs = 0
+
+    def countTestCases(self):  # noqa: N802
+        return 1
+
+    def __call__(self, result):
+        self.nb_runs += 1
+        status = FAILURE if self.nb_runs == 1 else SUCCESS
+        result.startTest(result.plan[0])
+        result.record(0, status, "failed" if status == FAILURE else None)
+        for index in range(1, len(result.plan)):
+            result.record(index, SUCCESS)
+
+
+def test_soak_repeat():
+    plan = make_plan()
+    result = RunResults(plan)
+    SoakTestSuite(FailingOnce(), repeat=3)(result)
+
+    assert result.testsRun == 3
+    # first failure is kept
+    assert result.failures[0][1] == "Iteration 1: failed"
+    assert result.metrics.iterations == 3
+    assert result.metrics.failed_iterations == 1
@@ -0,0 +1,62 @@
+"""Test testing.window module."""
+
+# Asserts are used here,
+# ruff: noqa: S101, PLR2004
+
+import pytest
+
+from wetest.testing.generator import TestData as Data
+from wetest.testing.window import SampleBuffer, WindowCheck
+
+
+def subtest(window, **kwargs):
+    return Data(
+        "continue",
+        "test",
+        "subtest",
+        getter="GET",
+        window=window,
+        **kwargs,
+    )
+
+
+def filled(window, values):
+    samples = window.new_buffer()
+    for value in values:
+        samples.add(value)
+    return samples
+
+
+def test_ring_buffer():
+    samples = SampleBuffer(capacity=3)
+    for value in [10, 1, 2, 3, "nan?"]:
+        samples.add(value)
+    assert samples.count == 4
+    assert sorted(samples.values) == [1, 2, 3]
+    # extrema are kept once overwritten
+    assert (samples.min, samples.max) == (1, 10)
+    assert isinstance(samples.error, ValueError)
+
+
+def test_window_checks():
+    test_data = subtest({"duration": 1, "min_samples": 3}, get_value=1, delta=0.1)
+    window = test_data.window
+    window.check("GET", test_data.comparator, filled(window, [0.95, 1.05, 1.0]))
+    with pytest.raises(AssertionError, match="at least 3 samples"):
+        window.check("GET", test_data.comparator, filled(window, [1.0]))
+    with pytest.raises(AssertionError, match="Mean of 3 samples"):
+        window.check("GET", test_data.comparator, filled(window, [1.2, 1.2, 1.2]))
+
+
+def test_window_band_and_stddev():
+    test_data = subtest(
+        {"duration": 1, "min": 0, "max": 2, "stddev": 0.1},
+        get_value=1,
+        delta=0.5,
+    )
+    window = test_data.window
+    with pytest.raises(AssertionError, match="stay below 2"):
+        window.check("GET", test_data.comparator, filled(window, [1, 1, 2.5]))
+    with pytest.raises(AssertionError, match="standard deviation"):
+        window.check("GET", test_data.comparator, filled(window, [0.5, 1.5]))
+    assert WindowCheck.from_data(None) is None
@@ -17,13 +17,11 @@ import importlib.metadata
 import logging
 import multiprocessing
 import os
-import re
 import signal
 import sys
+import threading
 import time
 import tkinter as tk
-import unittest
-from copy import deepcopy
 from pathlib import Path
 
 import epics
@@ -36,7 +34,6 @@ from wetest.common.constants import (
     END_OF_TESTS,
     FILE_HANDLER,
     LVL_FORMAT_VAL,
-    LVL_RUN_CONTROL,
     PAUSE_FROM_GUI,
     PAUSE_FROM_MANAGER,
     PAUSE_FROM_TEST,
@@ -60,16 +57,26 @@ from wetest.gui.specific import (
 from wetest.pvs.core import PVsTable
 from wetest.pvs.naming import NamingError, generate_naming
 from wetest.pvs.parse import pvs_from_path
+from wetest.pvs.pool import CONNECTION_DEADLINE, PV_POOL
 from wetest.report.generator import ReportGenerator
-from wetest.testing.generator import (
-    SelectableTestSuite,
-    TestsGenerator,
-)
+from wetest.testing import control, events
+from wetest.testing.aio import AsyncTestSuite
+from wetest.testing.cache import DEFAULT_CACHE_DIRECTORY, PARSE_CACHE
+from wetest.testing.capture import CAPTURE, DEFAULT_MAX_SAMPLES
+from wetest.testing.control import RunAbortedError, RunControl
+from wetest.testing.events import EventChannel
+from wetest.testing.generator import TestsGenerator
+from wetest.testing.plan import RunResults, TestPlan
 from wetest.testing.reader import (
+    DEFAULT_READ_JOBS,
     FileNotFound,
     MacrosManager,
-    ScenarioReader,
+    read_scenarios,
 )
+from wetest.testing.runner import ConcurrentTestSuite
+from wetest.testing.settle import DEFAULT_HISTORY_PATH, SETTLE_HISTORY
+from wetest.testing.shards import ShardedTestSuite
+from wetest.testing.soak import SoakTestSuite
 
 DESCRIPTION = """WeTest is a testing facility for EPICS modules.
 Tests are described in a YAML file,
@@ -101,6 +108,12 @@ DELAY = 1
 FILE_PREFIX = "TEST-wetest.testing.generator.TestsSequence-"
 OUTPUT_DIR = "/tmp/"
 END_OF_GUI = "GUI has been closed"
+# GUI status of the results sent by the runner
+RESULT_STATUSES = {
+    events.SUCCESS: STATUS_SUCCESS,
+    events.FAILURE: STATUS_FAIL,
+    events.ERROR: STATUS_ERROR,
+}
 
 
 def quiet_exception(*args):
@@ -117,30 +130,6 @@ def quiet_exception(*args):
     return decorator
 
 
-class MultithreadedQueueStream:
-    """Multiprocessing Queue implementing methodes of sys.stdout used by
-    logging.StreamHandler.
-
-    Apparently there is no way to inherit from this object,
-    so wrapping on it instead.
-    """
-
-    def __init__(self) -> None:
-        self.queue = multiprocessing.Queue()
-
-    def put(self, data):
-        self.queue.put(data)
-
-    def get(self):
-        return self.queue.get()
-
-    def write(self, a_str=""):
-        self.queue.put(a_str)
-
-    def flush(self):
-        self.write()
-
-
 class ListStream(list):
     """List implementing methodes of sys.stdout used by logging.StreamHandler.
 
@@ -155,40 +144,40 @@ class ListStream(list):
         pass
 
 
-def generate_tests(scenarios, macros_mgr=None, propagate=False):
+def generate_tests(scenarios, macros_mgr=None, propagate=False, read_jobs=1):
     """Create a test suite from a YAML file (suite or scenario).
 
     :param scenario_file: A list of YAML scenario file path.
     :param macros_mgr:    MacrosManager with macros already defined
+    :param read_jobs:     Number of processes reading the included files, of
+                          all the files at once.
 
-    :returns suite:       A unittest TestSuite object.
+    :returns suite:       A TestPlan object.
     :returns configs:     Scenarios config blocks.
     """
-    suite = SelectableTestSuite()
+    suite = TestPlan()
 
-    # get data from scenarios
-    ## read the first file
-    tests_data = ScenarioReader(
-        scenarios.pop(0),
+    # get data from scenarios, the files they include being read together
+    readers = read_scenarios(
+        scenarios,
         macros_mgr=macros_mgr,
         propagate=propagate,
-    ).get_deserialized()
+        cache=PARSE_CACHE,
+        jobs=read_jobs,
+    )
+    ## from the first file
+    tests_data = readers[0].get_deserialized()
     if "scenarios" not in tests_data:
         tests_data["scenarios"] = []
     ## append scenario from remaining files
-    for scenario in scenarios:
-        new_tests_data = ScenarioReader(
-            scenario,
-            macros_mgr=macros_mgr,
-            propagate=propagate,
-        ).get_deserialized()
-        tests_data["scenarios"] += new_tests_data["scenarios"]
+    for reader in readers[1:]:
+        tests_data["scenarios"] += reader.get_deserialized()["scenarios"]
 
     # Get titles
     ## Defaults title when several files from command line.
     configs = [{"name": "WeTest Suite"}]
     ## Overwise get top title from first file
-    if len(scenarios) == 0 and "name" in tests_data:
+    if len(readers) == 1 and "name" in tests_data:
         configs = [{"name": tests_data["name"]}]
     # and populate TestSuite
     for idx, scenario in enumerate(tests_data["scenarios"]):
@@ -196,8 +185,8 @@ def generate_tests(scenarios, macros_mgr=None, propagate=False):
         tests_gen = TestsGenerator(scenario)
         configs.append(tests_gen.get_config())
 
-        logger.debug("Append tests to suite...")
-        tests_gen.append_to_suite(suite, scenario_index=idx)
+        logger.debug("Append tests to plan...")
+        tests_gen.append_to_plan(suite, scenario_index=idx)
 
     logger.debug("Created tests suite.")
 
@@ -236,6 +225,117 @@ def export_pdf(filename, tests, results, configs, naming):
     report.save()
 
 
+def print_results(results, stream=None):
+    """Print failures, errors and summary of a run, like unittest does."""
+    stream = sys.stderr if stream is None else stream
+    for flavour, tests in (("ERROR", results.errors), ("FAIL", results.failures)):
+        for planned_test, message in tests:
+            stream.write(f"{'=' * 70}\n{flavour}: {planned_test.id()}\n{'-' * 70}\n")
+            stream.write(f"{message}\n")
+    stream.write(f"{'-' * 70}\n{results.summary()}\n")
+    if results.metrics is not None:
+        stream.write(f"{'-' * 70}\n{results.metrics.table()}\n")
+    stream.flush()
+
+
+def select_runner(  # noqa: PLR0913, PLR0917 one parameter per command line option
+    suite,
+    configs,
+    jobs,
+    use_asyncio,
+    shards,
+    repeat=None,
+    duration=None,
+):
+    """Return the runner of suite matching the command line options."""
+    if shards is not None and shards > 1:
+        runner = ShardedTestSuite(suite, configs, shards, jobs, use_asyncio)
+    elif use_asyncio:
+        runner = AsyncTestSuite(suite, configs, jobs)
+    else:
+        runner = ConcurrentTestSuite(suite, configs, jobs or 1)
+    if repeat is not None or duration is not None:
+        return SoakTestSuite(runner, repeat, duration)
+    return runner
+
+
+def run_headless(data, output):
+    """Run the tests once in this process, writing events as JSON lines.
+
+    No GUI, no manager process and no parser process: tests send their events
+    straight to output. Tests requesting a pause do not pause the run, those
+    requesting an abort do abort it.
+
+    :param data:   Same as the args of a ProcessManager.
+    :param output: A text file object to write JSON lines to.
+
+    :returns: The RunResults, None if the run was aborted.
+    """
+    suite = data["suite"]
+    writer = events.JsonLinesWriter(output)
+    run_control = RunControl(pausable=False)
+    events.set_channel(writer)
+    control.set_run_control(run_control)
+
+    results = RunResults(suite, suite.skip_reasons())
+    aborted = False
+    try:
+        PV_POOL.warm_up(suite.pv_names(), data["connection_deadline"])
+        logger.info("Running %d tests...", len(suite))
+        tests = select_runner(
+            suite,
+            data["configs"],
+            data["jobs"],
+            data["asyncio"],
+            data["shards"],
+            data["repeat"],
+            data["duration"],
+        )
+        try:
+            tests(results)
+            # shard workers stop on abort without raising
+            run_control.checkpoint()
+        except RunAbortedError:
+            logger.warning("Tests aborted.")
+            aborted = results.aborted = True
+        finally:
+            results.stop_time = time.time()
+    finally:
+        PV_POOL.close()
+        SETTLE_HISTORY.save()
+        events.set_channel(None)
+        control.set_run_control(None)
+
+    print_results(results)
+    writer.write(
+        {
+            "event": events.KIND_NAMES[events.END],
+            "time": results.stop_time,
+            "aborted": aborted,
+            "tests_run": results.testsRun,
+            "duration": results.stop_time - results.start_time,
+            **{
+                name: results.count(status)
+                for status, name in events.STATUS_NAMES.items()
+            },
+            "load": None if results.metrics is None else results.metrics.as_dict(),
+        },
+    )
+
+    if aborted:
+        return None
+    if data["pdf_output"] is not None:
+        export_pdf(
+            data["pdf_output"],
+            suite,
+            results,
+            data["configs"],
+            data["naming"],
+        )
+        logger.warning("Done generating report: %s", data["pdf_output"])
+    return results
+
+
 def main():
     """Program's main entry point."""
     logger.info("Launching WeTest...")
@@ -306,6 +406,47 @@ def main():
         default=False,
         help="Run withtout monitoring any PVs.",
     )
+    parser.add_argument(
+        "--connection-deadline",
+        metavar="SECONDS",
+        type=float,
+        default=CONNECTION_DEADLINE,
+        help="Time given to all the PVs to connect at startup, before "
+        f"reporting the unreachable ones (defaults to {CONNECTION_DEADLINE}s).",
+    )
+    parser.add_argument(
+        "--settle-history",
+        metavar="HISTORY_FILE",
+        type=Path,
+        default=DEFAULT_HISTORY_PATH,
+        help="File keeping the time getters took to settle in previous runs, "
+        "used by the adaptive delay mode "
+        f"(defaults to {DEFAULT_HISTORY_PATH}).",
+    )
+    cache_group = parser.add_mutually_exclusive_group(required=False)
+    cache_group.add_argument(
+        "--parse-cache",
+        metavar="CACHE_DIR",
+        type=Path,
+        default=DEFAULT_CACHE_DIRECTORY,
+        help="Directory keeping scenario files once read and validated, "
+        "read again only when a file of the suite, the macros or WeTest changed "
+        f"(defaults to {DEFAULT_CACHE_DIRECTORY}).",
+    )
+    cache_group.add_argument(
+        "--no-parse-cache",
+        action="store_true",
+        default=False,
+        help="Always read and validate scenario files (see --parse-cache).",
+    )
+    parser.add_argument(
+        "--read-jobs",
+        metavar="N",
+        type=int,
+        default=DEFAULT_READ_JOBS,
+        help="Read the files included by the scenarios on up to N processes "
+        f"(defaults to the number of CPUs, {DEFAULT_READ_JOBS}).",
+    )
     parser.add_argument(
         "-n",
         "--naming",
@@ -323,6 +464,21 @@ def main():
         default=False,
         help="Do not open a GUI.",
     )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        default=False,
+        help="Run the tests once in a single process, without GUI nor "
+        "waiting for user, streaming results as JSON lines (see --jsonl-output), "
+        "exit status is 1 if any test failed (implies --no-gui).",
+    )
+    parser.add_argument(
+        "--jsonl-output",
+        metavar="JSONL_FILE",
+        type=str,
+        default="-",
+        help="JSON lines file written by --headless (defaults to stdout).",
+    )
     auto_play_group = parser.add_mutually_exclusive_group(required=False)
     auto_play_group.add_argument(
         "-p",
@@ -339,6 +495,66 @@ def main():
         help="Tests will not start running automatically.",
     )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        metavar="N",
+        type=int,
+        default=None,
+        help="Run up to N tests of unit scenarios at the same time "
+        "(tests using the same PV never overlap, defaults to 1, "
+        "or no limit with --asyncio).",
+    )
+
+    parser.add_argument(
+        "--shards",
+        metavar="N",
+        type=int,
+        default=None,
+        help="Run whole scenarios in parallel on N runner processes, "
+        "each of them using --jobs and --asyncio as usual "
+        "(scenarios should then not share PVs).",
+    )
+
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        default=False,
+        help="Run tests on an asyncio event loop instead of one thread per "
+        "running test, puts and delays of in-flight tests do not block "
+        "each other.",
+    )
+
+    parser.add_argument(
+        "--repeat",
+        metavar="N",
+        type=int,
+        default=None,
+        help="Soak mode, run the tests N times in a row, reporting the "
+        "throughput and the put, get and settle latencies of each PV.",
+    )
+
+    parser.add_argument(
+        "--duration",
+        metavar="SECONDS",
+        type=float,
+        default=None,
+        help="Soak mode, run the tests again and again for SECONDS "
+        "(the last run is completed), see --repeat.",
+    )
+
+    parser.add_argument(
+        "--capture",
+        metavar="N",
+        type=int,
+        nargs="?",
+        const=DEFAULT_MAX_SAMPLES,
+        default=0,
+        help="Monitor the getter of each subtest from its put until its outcome, "
+        "keeping up to N samples (defaults to %(const)s), "
+        "the ones of failed subtests are drawn in the report.",
+    )
+
     # output relative arguments
     report_group = parser.add_mutually_exclusive_group(required=False)
     report_group.add_argument(
@@ -366,7 +582,7 @@ def main():
         logger.warning("WeTest %s", version)
         sys.exit(0)
 
-    with_gui = not args.no_gui
+    with_gui = not (args.no_gui or args.headless)
 
     scenarios = args.scenario_file + args.scenario
     # Check parameters are valid
@@ -378,6 +594,11 @@ def main():
         )
         sys.exit(2)
 
+    # settle times learned by the runners, in this process and in the forked ones
+    SETTLE_HISTORY.path = args.settle_history
+    CAPTURE.max_samples = args.capture
+    PARSE_CACHE.directory = None if args.no_parse_cache else args.parse_cache
+
     # select naming convention
     naming = generate_naming(args.naming)
 
@@ -427,18 +648,25 @@ def main():
                 scenarios=scenarios,
                 macros_mgr=macros_mgr,
                 propagate=args.propagate_macros,
+                read_jobs=args.read_jobs,
             )
         except FileNotFound:
             logger.exception("Could not open scenario file")
             sys.exit(4)
 
-    queue_to_gui = multiprocessing.Manager().Queue()
-    queue_from_gui = multiprocessing.Manager().Queue()
-
     # stop here if no PVs to monitor and no test to run
     if len(pvs_from_files) == 0 and suite.countTestCases() == 0:
         logger.error("Please provide at least a test to run or PVs to monitor.")
         sys.exit(3)
+    if args.headless and (suite is None or suite.countTestCases() == 0):
+        logger.error("Please provide at least a test to run headless.")
+        sys.exit(3)
+
+    # headless runs do without the GUI queues and their manager processes
+    queue_to_gui, queue_from_gui = None, None
+    if not args.headless:
+        queue_to_gui = multiprocessing.Manager().Queue()
+        queue_from_gui = multiprocessing.Manager().Queue()
 
     # monitor PVs
     if args.no_pv:
@@ -447,6 +675,7 @@ def main():
         all_connected, pv_refs = PVsTable(queue_to_gui).register_pvs(
             pv_list=pvs_from_files,
             suite=suite,
+            deadline=args.connection_deadline,
         )
 
     # show naming compatibility in CLI
@@ -491,8 +720,26 @@ def main():
         "configs": configs,
         "pdf_output": pdf_output,
         "naming": naming,
+        "jobs": args.jobs,
+        "asyncio": args.asyncio,
+        "shards": args.shards,
+        "connection_deadline": args.connection_deadline,
+        "repeat": args.repeat,
+        "duration": args.duration,
     }
 
+    if args.headless:
+        if not autoplay:
+            logger.error("Headless run can not wait for user, leaving.")
+            sys.exit(5)
+        if args.jsonl_output == "-":
+            results = run_headless(data, sys.stdout)
+        else:
+            with Path(args.jsonl_output).open("w") as output:
+                results = run_headless(data, output)
+        logger.warning("Exiting WeTest.")
+        sys.exit(0 if results is not None and results.wasSuccessful() else 1)
+
     pm = ProcessManager(data, not with_gui, queue_to_gui, queue_from_gui)
     try:
         pm.run()
@@ -545,18 +792,21 @@ class ProcessManager:
         self.pdf_output = args["pdf_output"]
         self.configs = args["configs"]
         self.naming = args["naming"]
-
-        # trace start request  (to unpause run process)
-        self.evt_start = multiprocessing.Event()
+        self.jobs = args["jobs"]
+        self.use_asyncio = args["asyncio"]
+        self.shards = args["shards"]
+        self.connection_deadline = args["connection_deadline"]
+        self.repeat = args["repeat"]
+        self.duration = args["duration"]
+
+        # start, pause, resume and abort the runner
+        self.control = RunControl()
         # stdin to subprocesses, for raw input use
         # https://stackoverflow.com/questions/13786974/raw-input-and-multiprocessing-in-python
         self.stdin = os.fdopen(os.dup(sys.stdin.fileno()))
 
-        # access to runner output
-        self.runner_output = MultithreadedQueueStream()
-        queue_handler = logging.StreamHandler(self.runner_output)
-        queue_handler.setLevel(LVL_RUN_CONTROL)
-        logging.getLogger("_wetest_tests_results").addHandler(queue_handler)
+        # events sent by the runner about tests progress
+        self.events = EventChannel()
 
         # process handles
         self.p_run_and_report = None
@@ -579,6 +829,8 @@ class ProcessManager:
         self.ns.pid_p_parse_output = None
         self.ns.pid_p_gui_commands = None
 
+        # tests skipped by the next run, by test id
+        self.skip_reasons = None if self.suite is None else self.suite.skip_reasons()
         # results fill by test runner, used by report generator
         self.results = None
 
@@ -641,19 +893,44 @@ class ProcessManager:
 
     @quiet_exception(KeyboardInterrupt)
     def run_and_report(self):
-        """Run the tests and generate the report."""
+        """Run the tests and generate the report, each time start is requested."""
+        events.set_channel(self.events)
+        control.set_run_control(self.control)
         self.p_run_and_report_started.set()
         logger.debug("Enter run_and_report (%d)", multiprocessing.current_process().pid)
+
+        try:
+            # connect the PVs of the tests once for all the runs
+            if self.suite is not None:
+                PV_POOL.warm_up(self.suite.pv_names(), self.connection_deadline)
+
+            while self.wait_for_start():
+                if self.run_tests():
+                    self.report()
+                if self.ns.no_gui:
+                    break
+        finally:
+            PV_POOL.close()
+
+        time.sleep(0.1)  # Just enough to let the Queue finish
+        # https://stackoverflow.com/questions/36359528/broken-pipe-error-with-multiprocessing-queue.
+        # TODO(gohierf): is this solved now that Queue comes from a multiprocessing.Manager ?
+
+        logger.debug("Leave run_and_report (%d)", multiprocessing.current_process().pid)
+
+    def wait_for_start(self):
+        """Wait for start request, return False if the runner should leave instead."""
         logger.warning("-----------------------")
         if self.ns.no_gui:
             logger.warning("Ready to start testing.")
         else:
             logger.warning("Ready to start testing, use GUI play button.")
 
-        # do not start running before start requested
-        self.evt_start.wait()
-        self.evt_start.clear()
+        return self.control.wait_start()
 
+    def run_tests(self):
+        """Run the tests, return False if there is nothing to report."""
+        self.results = None
         if self.suite is not None:
             # update selection if necessary
             if self.selection_from_GUI.is_set():
@@ -664,25 +941,44 @@ class ProcessManager:
 
             logger.info("Running tests suite...")
 
-            runner = unittest.TextTestRunner(verbosity=0)  # use verbosity for debug
-
             # check that there are tests to run
-            logger.info("Nbr tests: %d", self.suite.countTestCases())
-
-            nbr_tests = len(self.suite._tests)
+            nbr_tests = len(self.suite)
             if nbr_tests == 0:
                 logger.error("No test to run.")
                 self.results = []
             else:
                 logger.info("Running %d tests...", nbr_tests)
-                self.results = runner.run(deepcopy(self.suite))
+                tests = select_runner(
+                    self.suite,
+                    self.configs,
+                    self.jobs,
+                    self.use_asyncio,
+                    self.shards,
+                    self.repeat,
+                    self.duration,
+                )
+                self.results = RunResults(self.suite, self.skip_reasons)
+                try:
+                    tests(self.results)
+                    # shard workers stop on abort without raising
+                    self.control.checkpoint()
+                except RunAbortedError:
+                    logger.warning("Tests aborted.")
+                    self.results.aborted = True
+                    return False
+                finally:
+                    self.results.stop_time = time.time()
+                    SETTLE_HISTORY.save()
+                print_results(self.results)
 
             logger.info("Ran tests suite.")
-            self.runner_output.put(END_OF_TESTS)
+            self.events.send(events.END)
 
         logger.warning("Done running tests.")
+        return True
 
-        # Generate PDF
+    def report(self):
+        """Generate the PDF report of the last run."""
         if self.results and self.pdf_output is not None:
             logger.info("Will export result in PDF file: %s", self.pdf_output)
             export_pdf(
@@ -697,49 +993,53 @@ class ProcessManager:
         else:
             logger.warning("No report to generate.")
 
-        time.sleep(0.1)  # Just enough to let the Queue finish
-        # https://stackoverflow.com/questions/36359528/broken-pipe-error-with-multiprocessing-queue.
-        # TODO(gohierf): is this solved now that Queue comes from a multiprocessing.Manager ?
-
-        logger.debug("Leave run_and_report (%d)", multiprocessing.current_process().pid)
-
     def pause_runner(self):
+        self.control.pause()
         self.queue_to_gui.put(PAUSE_FROM_MANAGER)
         if self.ns.no_gui:
             logger.warning(
                 "Pausing execution.\n"
-                "  - To continue press Ctrl+Z and enter `fg`.\n"
+                "  - To continue press ENTER.\n"
                 "  - To abort press Ctrl+C twice.",
             )
+            threading.Thread(
+                target=self.resume_on_enter,
+                name="resume_on_enter",
+                daemon=True,
+            ).start()
         else:
             logger.warning(
                 "Pausing execution.\n"
-                "  - To continue, use GUI play button or press Ctrl+Z and enter `fg`.\n"
+                "  - To continue, use GUI play button.\n"
                 "  - To abort, use GUI abort button or press Ctrl+C twice.",
             )
-        os.kill(self.ns.pid_run_and_report, signal.SIGSTOP)
         logger.debug("Paused run_and_report (%d)", self.ns.pid_run_and_report)
 
+    def resume_on_enter(self):
+        """Resume paused tests once ENTER is pressed."""
+        self.stdin.readline()
+        self.resume_play()
+
     def start_play(self):
-        """Call play runner after setting evt_start."""
-        self.evt_start.set()
+        """Request the runner to run the tests."""
+        self.control.request_start()
         self.play_runner()
 
     def resume_play(self):
-        """Call play runner without setting evt_start."""
+        """Resume paused tests."""
         self.play_runner()
 
     def play_runner(self):
         self.queue_to_gui.put(PLAY_FROM_MANAGER)
         logger.info("Playing.")
-        os.kill(self.ns.pid_run_and_report, signal.SIGCONT)
+        self.control.resume()
         logger.debug("Continue run_and_report (%d)", self.ns.pid_run_and_report)
 
     def stop_runner(self):
         logger.warning("Aborting execution.")
         self.queue_to_gui.put(ABORT_FROM_MANAGER)  # notify GUI
-        os.kill(self.ns.pid_run_and_report, signal.SIGKILL)  # actually stop tests
-        logger.debug("Killed run_and_report (%d)", self.ns.pid_run_and_report)
+        self.control.abort()  # actually stop tests
+        logger.debug("Aborted run_and_report (%d)", self.ns.pid_run_and_report)
 
     def stop_parser(self):
         os.kill(self.ns.pid_p_parse_output, signal.SIGKILL)
@@ -771,11 +1071,10 @@ class ProcessManager:
 
             elif cmd == ABORT_FROM_GUI:
                 self.stop_runner()
-                self.start_runner_process()  # enable replay from GUI
 
             elif cmd == END_OF_GUI:
                 self.ns.no_gui = True
-                self.stop_runner()
+                self.control.close()
                 self.stop_parser()
                 break
 
@@ -786,8 +1085,14 @@ class ProcessManager:
 
     def update_selection(self, selected):
         """Select only the test provided in selected, otherwise skip them."""
-        logger.warning("Applying selection may take some time.")
-        self.suite.apply_selection(selected, "Skipped from GUI.")
+        self.skip_reasons = self.suite.skip_reasons(selected, "Skipped from GUI.")
+
+    def log_event(self, event):
+        """Log an event from the runner as a line of the test results."""
+        test_data = None
+        if event.kind in (events.STARTED, events.SKIP, events.RETRY):
+            test_data = self.suite.tests_infos.get(event.test_id)
+        events.log_event(event, test_data)
 
     @quiet_exception(KeyboardInterrupt)
     def parse_output(self):
@@ -795,105 +1100,57 @@ class ProcessManager:
         self.p_parse_output_started.set()
         logger.debug("Enter parse_output (%d)", multiprocessing.current_process().pid)
         while True:
-            # get next output to parse
-            new_str = self.runner_output.get().rstrip("\n")
-            logger.debug("from tests runner:>%s<", new_str)
-            # ignore empty lines
-            if new_str == "":
-                continue
-
-            # check for start of test
-            match_running = re.search(
-                r"^Running\s*(?P<test_id>test-\d+-\d+-\d+)\s*.*$",
-                new_str,
-            )
-            # check for skipped test
-            match_skipped = re.search(
-                r"^Skipping\s*(?P<test_id>test-\d+-\d+-\d+)\s*.*$",
-                new_str,
-            )
-            # check for retry of test
-            match_rerun = re.search(
-                r"^Retry \(.*\)\s*(?P<test_id>test-\d+-\d+-\d+)\s*\(in (?P<duration>\d+\.\d+)s\)\s*(?P<trace>.*)$",
-                new_str,
-            )
-            # check for end of test
-            match_result = re.match(
-                r"^(?P<status>Success\s*of|Failure\s*of|Error\s*of)\s*(?P<test_id>test-\d+-\d+-\d+)\s*\(in (?P<duration>\d+\.\d+)s\)\s*(?P<trace>[\s\S]*)$",
-                new_str,
-            )
+            event = self.events.recv()
+            self.log_event(event)
 
-            if match_running is not None:
-                logger.debug("=> New test running")
-                logger.debug("test_id: %s", match_running.group("test_id"))
-                test_id = match_running.group("test_id")
-                self.queue_to_gui.put([test_id, STATUS_RUN, None, None])
-
-            elif match_skipped is not None:
-                logger.debug("=> Test skipped")
-                logger.debug("test_id: %s", match_skipped.group("test_id"))
-                test_id = match_skipped.group("test_id")
-                self.queue_to_gui.put([test_id, STATUS_SKIP, None, None])
-
-            elif match_rerun is not None:
-                logger.debug("=> Test retry")
-                test_id = match_rerun.group("test_id")
-                duration = match_rerun.group("duration")
-                trace = match_rerun.group("trace")
-                if trace == "":
-                    trace = None
-                self.queue_to_gui.put([test_id, STATUS_RETRY, duration, trace])
-
-            elif match_result is not None:
-                logger.debug("=> New test result")
-                status = match_result.group("status")
-                test_id = match_result.group("test_id")
-                duration = match_result.group("duration")
-                trace = match_result.group("trace")
-                if trace == "":
-                    trace = None
-                if status.startswith("Error "):
-                    status = STATUS_ERROR
-                elif status.startswith("Failure "):
-                    status = STATUS_FAIL
-                elif status.startswith("Success "):
-                    status = STATUS_SUCCESS
-                else:
-                    logger.error("Unexpected status %s", status)
-                    status = STATUS_UNKNOWN
+            if event.kind == events.STARTED:
+                self.queue_to_gui.put([event.test_id, STATUS_RUN, None, None])
+
+            elif event.kind == events.SKIP:
+                self.queue_to_gui.put([event.test_id, STATUS_SKIP, None, None])
+
+            elif event.kind == events.RETRY:
+                self.queue_to_gui.put(
+                    [event.test_id, STATUS_RETRY, event.duration, event.message],
+                )
 
+            elif event.kind == events.RESULT:
+                status = RESULT_STATUSES.get(event.status)
+                if status is None:
+                    logger.error("Unexpected status %s", event.status)
+                    status = STATUS_UNKNOWN
                 # finish running test
-                self.queue_to_gui.put([test_id, status, duration, trace])
+                self.queue_to_gui.put(
+                    [event.test_id, status, event.duration, event.message],
+                )
 
             # check for test requested continue
-            elif new_str == CONTINUE_FROM_TEST:
+            elif event.control == CONTINUE_FROM_TEST:
                 logger.debug("=> Continue from test")
 
             # check for test requested pause
-            elif new_str == PAUSE_FROM_TEST:
+            elif event.control == PAUSE_FROM_TEST:
                 logger.debug("=> Pause from test")
                 self.pause_runner()
 
             # check for test requested abort
-            elif new_str == ABORT_FROM_TEST:
+            elif event.control == ABORT_FROM_TEST:
                 logger.debug("=> Abort from test")
                 self.stop_runner()
                 if self.ns.no_gui:
                     break
-                self.start_runner_process()  # enable replay from GUI
 
             # check for no more tests
-            elif new_str == END_OF_TESTS:
+            elif event.kind == events.END:
                 logger.debug("=> No more test to run.")
+                self.events.log_stats()
                 self.queue_to_gui.put(END_OF_TESTS)
                 if self.ns.no_gui:
                     break
 
-                self.start_runner_process()  # enable replay from GUI
-
             # we should not reach here
             else:
-                logger.critical("Unexpected test output:\n%s", new_str)
+                logger.critical("Unexpected runner event:\n%s", event)
 
         logger.debug("Leave parse_output (%d)", multiprocessing.current_process().pid)
 
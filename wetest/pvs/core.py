@@ -20,6 +20,8 @@ from wetest.common.constants import (
     LVL_PV_DISCONNECTED,
     TERSE_FORMATTER,
 )
+from wetest.pvs.pool import CONNECTION_DEADLINE, log_connections, wait_for_connections
+from wetest.testing.generator import SubtestSweep
 
 # configure logging
 logger = logging.getLogger(__name__)
@@ -147,6 +149,22 @@ class PVInfo:
             self.data.getter_subtests.add(subtest_info.id)
             self.add_title(subtest_info)
 
+    def add_subtest_ids(self, subtest_ids, test_title, *, setter=False, getter=False):
+        """Add subtests by id, when their TestData is not created.
+
+        :param subtest_ids: ids of the subtests.
+        :param test_title:  title of their test.
+        :param setter:      whether the subtests use this PV as setter.
+        :param getter:      whether the subtests use this PV as getter.
+        """
+        subtest_ids = list(subtest_ids)
+        if setter:
+            self.data.setter_subtests.update(subtest_ids)
+        if getter:
+            self.data.getter_subtests.update(subtest_ids)
+        if setter or getter:
+            self.data.tests_titles.update(dict.fromkeys(subtest_ids, test_title))
+
     def add_title(self, subtest_info):
         """Add title in self.data.tests_titles."""
         test_id = subtest_info.id.split("_")[-1]
@@ -199,29 +217,43 @@ def test_id_sort(test_id):
 
 
 def pvs_from_suite(suite, ref_dict=None, connection_callback=None):
-    """Determine all the PVs declared in suite."""
+    """Determine all the PVs declared in suite.
+
+    The subtests of range and values tests are not created, only their ids.
+    """
     pvs_refs = {} if ref_dict is None else ref_dict
 
-    for test_data in list(suite.tests_infos.values()):
-        if test_data.setter is not None:
-            if test_data.setter in pvs_refs:
-                pvs_refs[test_data.setter].add_subtest(test_data)
-            else:
-                pvs_refs[test_data.setter] = PVInfo(
-                    test_data.setter,
-                    setter_subtests=test_data,
-                    connection_callback=connection_callback,
-                )
+    def pv_info(pv_name):
+        if pv_name not in pvs_refs:
+            pvs_refs[pv_name] = PVInfo(
+                pv_name,
+                connection_callback=connection_callback,
+            )
+        return pvs_refs[pv_name]
 
-        if test_data.getter is not None:
-            if test_data.getter in pvs_refs:
-                pvs_refs[test_data.getter].add_subtest(test_data)
-            else:
-                pvs_refs[test_data.getter] = PVInfo(
-                    test_data.getter,
-                    getter_subtests=test_data,
-                    connection_callback=connection_callback,
+    for _start, entry in suite.entries():
+        if not isinstance(entry, SubtestSweep):
+            subtests = [entry.data]
+        else:
+            # the `finally` subtests appended are already created
+            subtests = [
+                entry[subtest] for subtest in range(len(entry.values), len(entry))
+            ]
+            setter, getter = entry.values_pvs()
+            subtest_ids = [
+                entry.test_id(subtest) for subtest in range(len(entry.values))
+            ]
+            for pv_name in {setter, getter} - {None}:
+                pv_info(pv_name).add_subtest_ids(
+                    subtest_ids,
+                    entry.fields["test_title"],
+                    setter=pv_name == setter,
+                    getter=pv_name == getter,
                 )
+
+        for test_data in subtests:
+            for pv_name in {test_data.setter, test_data.getter} - {None}:
+                pv_info(pv_name).add_subtest(test_data)
     return pvs_refs
 
 
@@ -240,11 +272,16 @@ class PVsTable:
             self.queue = queue
         self.pvs_refs = {}
 
-    def register_pvs(self, suite=None, pv_list=None):
-        """Check connection of all the PVs declared in suite."""
+    def register_pvs(self, suite=None, pv_list=None, deadline=CONNECTION_DEADLINE):
+        """Check connection of all the PVs declared in suite.
+
+        Channels are all created first, then their connections are waited for
+        together, for at most deadline seconds.
+        """
         if suite is None and pv_list is None:
             msg = "Expecting pv_list or suite to be provided"
             raise NotImplementedError(msg)
+        start_time = time.time()
         # collect all the PVs and initialize the callback
         for pv_name in set(pv_list if pv_list is not None else []):
             self.pvs_refs[pv_name] = PVInfo(
@@ -261,9 +298,15 @@ class PVsTable:
 
         all_connected = True
 
-        # send PV status to GUI at least once per PV
-        time.sleep(1)  # give some time to PV connection to settle
+        # wait for all the connections at once
+        latencies, unreachable = wait_for_connections(
+            [pv.pv for pv in self.pvs_refs.values()],
+            deadline,
+            start_time,
+        )
+        log_connections(latencies, unreachable, time.time() - start_time)
 
+        # send PV status to GUI at least once per PV
         for pv in list(self.pvs_refs.values()):
             # make sure that unreachable PV are displayed in stdout at least once
             if not pv.check_connection():
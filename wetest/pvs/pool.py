@@ -0,0 +1,266 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Share Channel Access channels between the tests of a run."""
+
+import logging
+import threading
+import time
+
+import epics
+import numpy as np
+
+from wetest.common.constants import FILE_HANDLER, TERSE_FORMATTER
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(TERSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+VAL_FIELD = ".VAL"
+
+# maximum time waited for the values of a batch of gets (seconds)
+GET_TIMEOUT = 5.0
+# maximum time waited for all the PVs to connect when warming up (seconds)
+CONNECTION_DEADLINE = 1.0
+# how often pending connections are checked, resolution of latencies (seconds)
+CONNECTION_POLL_PERIOD = 0.005
+# connection latency percentiles reported
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def normalize_pv_name(pv_name):
+    """Return the channel name to use for pv_name.
+
+    `X` and `X.VAL` designate the same value, they share a single channel.
+    """
+    pv_name = str(pv_name).strip()
+    if pv_name.endswith(VAL_FIELD):
+        return pv_name[: -len(VAL_FIELD)]
+    return pv_name
+
+
+def wait_for_connections(pvs, deadline=CONNECTION_DEADLINE, start_time=None):
+    """Wait for several PVs to connect, all at the same time.
+
+    :param pvs:        PVs whose channels are already created.
+    :param deadline:   maximum time to wait for connections (seconds).
+    :param start_time: when channels were created, to measure latencies from.
+
+    :returns: the connection latency of each connected PV, by name, and the
+              names of the PVs still not connected after deadline.
+    """
+    start_time = time.time() if start_time is None else start_time
+    epics.ca.flush_io()
+
+    latencies = {}
+    pending = list(pvs)
+    while pending:
+        now = time.time()
+        still_pending = []
+        for pv in pending:
+            if pv.connected:
+                latencies[pv.pvname] = now - start_time
+            else:
+                still_pending.append(pv)
+        pending = still_pending
+        if not pending or now - start_time >= deadline:
+            break
+        time.sleep(CONNECTION_POLL_PERIOD)
+
+    return latencies, [pv.pvname for pv in pending]
+
+
+def log_connections(latencies, unreachable, elapsed):
+    """Log how many PVs connected, and connection latency percentiles."""
+    message = "Connected %d/%d PVs in %.3fs"
+    args = [len(latencies), len(latencies) + len(unreachable), elapsed]
+    if latencies:
+        values = np.percentile(list(latencies.values()), LATENCY_PERCENTILES)
+        for percentile, value in zip(LATENCY_PERCENTILES, values):
+            message += f", p{percentile} %.3fs"
+            args.append(value)
+        message += ", max %.3fs"
+        args.append(max(latencies.values()))
+    logger.info(message, *args)
+
+
+class PVsPool:
+    """A pool of PVs, each PV is created once and reused afterwards.
+
+    hits:           number of requests served by an already opened PV
+    misses:         number of requests that required to open a new PV
+    connect_time:   cumulated time spent waiting for PV connections (seconds)
+    """
+
+    def __init__(self, connection_timeout=None) -> None:
+        self.connection_timeout = connection_timeout
+        self.hits = 0
+        self.misses = 0
+        self.connect_time = 0.0
+        self._pvs = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pvs)
+
+    def __contains__(self, pv_name) -> bool:
+        return normalize_pv_name(pv_name) in self._pvs
+
+    def __str__(self) -> str:
+        return (
+            f"PVsPool: {len(self)} channels, {self.hits} hits, "
+            f"{self.misses} misses, {self.connect_time:.3f}s spent connecting"
+        )
+
+    def get(self, pv_name):
+        """Return a PV for pv_name, opening the channel on first use.
+
+        A PV that is not connected yet is given another chance to connect,
+        the time spent doing so is added to connect_time.
+        """
+        name = normalize_pv_name(pv_name)
+        with self._lock:
+            pv = self._pvs.get(name)
+            if pv is None:
+                self.misses += 1
+                pv = epics.PV(name, connection_timeout=self.connection_timeout)
+                self._pvs[name] = pv
+            else:
+                self.hits += 1
+
+        if not pv.connected:
+            start_time = time.time()
+            pv.wait_for_connection(timeout=self.connection_timeout)
+            elapsed = time.time() - start_time
+            with self._lock:
+                self.connect_time += elapsed
+
+        return pv
+
+    def warm_up(self, pv_names, deadline=CONNECTION_DEADLINE):
+        """Open the channels of all pv_names at once and wait for them together.
+
+        Channels are all created before waiting, startup then only depends on
+        the slowest IOC. Connected PVs are reused by the following gets.
+
+        :param pv_names: names of the PVs to connect.
+        :param deadline: maximum time to wait for connections (seconds).
+
+        :returns: the connection latency of each connected PV, by name, and the
+                  names of the PVs still not connected after deadline.
+        """
+        start_time = time.time()
+        pvs = {}
+        with self._lock:
+            for pv_name in pv_names:
+                name = normalize_pv_name(pv_name)
+                if name not in self._pvs:
+                    self._pvs[name] = epics.PV(
+                        name,
+                        connection_timeout=self.connection_timeout,
+                    )
+                pvs[name] = self._pvs[name]
+
+        latencies, unreachable = wait_for_connections(
+            list(pvs.values()),
+            deadline,
+            start_time,
+        )
+        elapsed = time.time() - start_time
+        with self._lock:
+            self.connect_time += elapsed
+        log_connections(latencies, unreachable, elapsed)
+        return latencies, unreachable
+
+    def get_values(self, requests, timeout=GET_TIMEOUT):
+        """Read several PVs with a single Channel Access round trip.
+
+        All the gets are issued without waiting, flushed at once and only
+        then collected, instead of one blocking round trip per PV.
+
+        :param requests: list of (pv_name, as_string) tuples.
+        :param timeout:  maximum time to wait for each value.
+
+        :returns: the list of values read, None for PVs not connected.
+        """
+        pvs = [self.get(pv_name) for pv_name, _as_string in requests]
+
+        # issue a single get per channel
+        issued = {}
+        for pv, (_pv_name, as_string) in zip(pvs, requests):
+            # enum strings are only known to the PV, read it on its own
+            if not pv.connected or (as_string and "enum" in str(pv.type)):
+                continue
+            if pv.pvname not in issued:
+                epics.ca.get(pv.chid, wait=False)
+                issued[pv.pvname] = (pv.chid, as_string)
+        epics.ca.flush_io()
+
+        received = {
+            pv_name: epics.ca.get_complete(chid, as_string=as_string, timeout=timeout)
+            for pv_name, (chid, as_string) in issued.items()
+        }
+
+        values = []
+        for pv, (_pv_name, as_string) in zip(pvs, requests):
+            if pv.pvname in issued and issued[pv.pvname][1] == as_string:
+                values.append(received[pv.pvname])
+            elif pv.connected:
+                values.append(pv.get(as_string=as_string, use_monitor=False))
+            else:
+                values.append(None)
+        return values
+
+    def stats(self):
+        """Return the pool counters as a dictionary."""
+        return {
+            "channels": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "connect_time": self.connect_time,
+        }
+
+    def close(self):
+        """Disconnect all the PVs and clear their channels."""
+        logger.info("%s", self)
+        with self._lock:
+            pvs = list(self._pvs.values())
+            self._pvs = {}
+
+        for pv in pvs:
+            chid = pv.chid
+            pv.disconnect()
+            if chid is not None:
+                epics.ca.clear_channel(chid)
+
+        logger.debug("Closed %d channels", len(pvs))
+
+    def forget(self):
+        """Drop the PVs without clearing their channels.
+
+        Called by pyepics before it clears all the channels, for instance
+        when a CAProcess inherits the pool from its parent.
+        """
+        with self._lock:
+            pvs = list(self._pvs.values())
+            self._pvs = {}
+
+        for pv in pvs:
+            pv.disconnect()
+
+
+# Pool shared by all the tests run in this process
+PV_POOL = PVsPool()
+epics.ca.register_clear_cache(PV_POOL.forget)
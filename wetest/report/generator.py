@@ -15,7 +15,9 @@ import datetime
 import logging
 import re
 
+import numpy as np
 from pkg_resources import resource_filename
+from reportlab.graphics.shapes import Drawing, Line, PolyLine, String
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
@@ -24,6 +26,10 @@ from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Table, Table
 from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
 from wetest.pvs.core import pvs_from_suite
 from wetest.pvs.naming import NamingError
+from wetest.testing.dag import critical_paths, path_titles
+from wetest.testing.metrics import format_latency
+from wetest.testing.reader import ADAPTIVE
+from wetest.testing.runner import group_tests
 
 # configure logging
 logger = logging.getLogger(__name__)
@@ -34,6 +40,11 @@ logger.addHandler(stream_handler)
 logger.addHandler(FILE_HANDLER)
 INCH = 72
 
+# size of the drawings of captured getter values (points)
+SPARKLINE_WIDTH = 330
+SPARKLINE_HEIGHT = 30
+SPARKLINE_CAPTION = 12
+
 
 def get_para_with_style(
     text="",
@@ -113,55 +124,32 @@ class _TestInfo:
 
         self.combined = []
 
-        for test in self.test_suite:
-            short_id = test.id().split(".")[-1]
-            logger.debug("test with id %s in test_suite", test.id())
-            success = True
-            for result, trace in self.test_results.failures:
-                logger.debug("test with id %s in test_results", result.id())
-                logger.debug("test trace: %s", trace)
-                if test.id() == result.id():
-                    self._append_to_combined(
-                        test,
-                        "Failure",
-                        "red",
-                        trace,
-                        infos=test_suite.tests_infos[short_id],
-                    )
-                    success = False
-
-            for result, trace in self.test_results.errors:
+        # index outcomes by test id once, rather than scanning them per test
+        outcomes = {}
+        for flavour, color, tests in (
+            ("Skipped", "grey", self.test_results.skipped),
+            ("Error", "orange", self.test_results.errors),
+            ("Failure", "red", self.test_results.failures),
+            ("Not run", "orange", self.test_results.not_run),
+        ):
+            for result, trace in tests:
                 logger.debug("test with id %s in test_results", result.id())
                 logger.debug("test trace: %s", trace)
-                if test.id() == result.id():
-                    self._append_to_combined(
-                        test,
-                        "Error",
-                        "orange",
-                        trace,
-                        infos=test_suite.tests_infos[short_id],
-                    )
-                    success = False
+                outcomes[result.id()] = (flavour, color, trace)
 
-            for result, trace in self.test_results.skipped:
-                logger.debug("test with id %s in test_results", result.id())
-                logger.debug("test trace: %s", trace)
-                if test.id() == result.id():
-                    self._append_to_combined(
-                        test,
-                        "Skipped",
-                        "grey",
-                        infos=test_suite.tests_infos[short_id],
-                    )
-                    success = False
-
-            if success:
-                self._append_to_combined(
-                    test,
-                    "Success",
-                    "green",
-                    infos=test_suite.tests_infos[short_id],
-                )
+        for test in self.test_suite:
+            short_id = test.id().split(".")[-1]
+            logger.debug("test with id %s in test_suite", test.id())
+            flavour, color, trace = outcomes.get(test.id(), ("Success", "green", None))
+            if flavour in {"Skipped", "Not run"}:
+                trace = None
+            self._append_to_combined(
+                test,
+                flavour,
+                color,
+                trace,
+                infos=test_suite.tests_infos[short_id],
+            )
 
         # # Reorder results by their execution order
         # self.combined = sorted(self.combined, key=lambda k: k['id'])
@@ -334,6 +322,12 @@ class ReportGenerator:
                 ],
             )
 
+        # critical path of the scenarios run as dependency graphs
+        scenario_paths = critical_paths(
+            group_tests(self.test_suite),
+            self.test_results,
+        )
+
         # Create main table
         array = [
             [
@@ -361,6 +355,21 @@ class ReportGenerator:
                 array.append(
                     ["", get_para_with_style(scn_title, style="h2", bold=True), ""],
                 )
+                if scn_nb in scenario_paths:
+                    length, path, total = scenario_paths[scn_nb]
+                    array.append(
+                        [
+                            "",
+                            get_para_with_style(
+                                f"Critical path: {length:.3f}s "
+                                f"({path_titles(path)}), "
+                                f"tests took {total:.3f}s in total",
+                                style="Definition",
+                                italic=True,
+                            ),
+                            "",
+                        ],
+                    )
 
             # check for test change (then print test title and message)
             if prev_test_nb != test_nb:
@@ -406,6 +415,26 @@ class ReportGenerator:
                         italic=True,
                     ),
                 )
+            if test["infos"].retries:
+                middle_cell.append(
+                    get_para_with_style(
+                        f"Retried {test['infos'].retries} time(s), "
+                        f"during {test['infos'].retry_time:.3f}s",
+                        style="Definition",
+                        italic=True,
+                    ),
+                )
+            if (
+                test["infos"].delay_mode == ADAPTIVE
+                and test["infos"].settle_time is not None
+            ):
+                middle_cell.append(
+                    get_para_with_style(
+                        adaptive_delay_text(test["infos"]),
+                        style="Definition",
+                        italic=True,
+                    ),
+                )
             if test["trace"] is not None:
                 middle_cell.append(
                     get_para_with_style(
@@ -415,6 +444,8 @@ class ReportGenerator:
                         style="Italic",
                     ),
                 )
+                if test["infos"].capture is not None:
+                    middle_cell.append(capture_sparkline(test["infos"]))
 
             array.append(
                 [
@@ -465,10 +496,120 @@ class ReportGenerator:
         elements.append(date)
         elements.append(pv_table)
         elements.append(table)
+        if self.test_results.metrics is not None:
+            elements.append(self._load_table(self.test_results.metrics, list_style))
 
         # Build and save document:
         doc.build(elements)
 
+    def _load_table(self, metrics, style):
+        """Return the table of latencies measured in soak mode."""
+        headers = ("", "PV", "count", "ops/s", "p50", "p95", "p99", "max")
+        array = [
+            [
+                get_para_with_style(
+                    f"Ran {metrics.iterations} iterations in {metrics.elapsed:.3f}s, "
+                    f"{metrics.failed_iterations} with failures",
+                    bold=True,
+                ),
+                *[""] * (len(headers) - 1),
+            ],
+            [get_para_with_style(header, bold=True) for header in headers],
+        ]
+        for kind, pv_name, count, rate, *latencies in metrics.rows():
+            array.append(
+                [
+                    get_para_with_style(kind, bold=pv_name is None),
+                    get_para_with_style(pv_name or "(all)", bold=pv_name is None),
+                    get_para_with_style(str(count), align="right"),
+                    get_para_with_style(f"{rate:.1f}", align="right"),
+                    *[
+                        get_para_with_style(format_latency(latency), align="right")
+                        for latency in latencies
+                    ],
+                ],
+            )
+        return Table(
+            array,
+            style=style,
+            splitByRow=True,
+            colWidths=[35, 125, 40, 35, 50, 50, 50, 50],
+            spaceBefore=50,
+        )
+
+
+def adaptive_delay_text(test_data):
+    """Describe the delay learned by a subtest in adaptive delay mode."""
+    settled = f"settled in {test_data.settle_time:.3f}s"
+    if test_data.learned_delay is None:
+        return f"Learning the delay (whole {test_data.delay}s waited), {settled}"
+    return (
+        f"Learned delay {test_data.learned_delay:.3f}s "
+        f"instead of {test_data.delay}s, {settled}"
+    )
+
+
+def capture_sparkline(test_data):
+    """Draw the getter values captured during a subtest.
+
+    Values are drawn as steps, as they hold until the next monitor update,
+    the expected value as a dashed line.
+    """
+    times, values = test_data.capture
+    finite = np.isfinite(values)
+    times, values = times[finite], values[finite]
+    drawing = Drawing(SPARKLINE_WIDTH, SPARKLINE_HEIGHT + SPARKLINE_CAPTION)
+    if len(values) == 0:
+        drawing.add(String(0, 0, "No numeric value captured", fontSize=7))
+        return drawing
+
+    try:
+        expected = float(test_data.get_value)
+    except (TypeError, ValueError):
+        expected = None
+    low = min(values.min(), values.min() if expected is None else expected)
+    high = max(values.max(), values.max() if expected is None else expected)
+    span = float(high - low) or 1.0
+    duration = float(times[-1]) or 1.0
+
+    def point(time, value):
+        return (
+            float(time) / duration * SPARKLINE_WIDTH,
+            SPARKLINE_CAPTION + float(value - low) / span * SPARKLINE_HEIGHT,
+        )
+
+    if expected is not None:
+        start, end = point(0, expected), point(duration, expected)
+        drawing.add(
+            Line(
+                *start,
+                *end,
+                strokeColor=colors.green,
+                strokeWidth=0.5,
+                strokeDashArray=[2, 2],
+            ),
+        )
+    points = [point(times[0], values[0])]
+    for time, previous, value in zip(times[1:], values[:-1], values[1:]):
+        points += [point(time, previous), point(time, value)]
+    drawing.add(
+        PolyLine(
+            [coordinate for xy in points for coordinate in xy],
+            strokeColor=colors.red,
+            strokeWidth=0.75,
+        ),
+    )
+    drawing.add(
+        String(
+            0,
+            0,
+            f"{len(values)} value(s) of {test_data.getter} in {times[-1]:.3f}s, "
+            f"from {values.min():.3G} to {values.max():.3G}",
+            fontSize=7,
+        ),
+    )
+    return drawing
+
 
 def shorten_trace(trace):
     """Reduce trace text for specific expected exceptions.
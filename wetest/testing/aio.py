@@ -0,0 +1,399 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Run generated tests on an asyncio event loop.
+
+Puts and gets are turned into awaitables using pyepics callbacks, so that a
+single thread keeps many subtests in flight while they wait for their delay or
+for their getter to settle.
+"""
+
+# Asserts are used here, like in generated tests
+# ruff: noqa: S101
+
+import asyncio
+import functools
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import epics
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+from wetest.pvs.pool import PV_POOL
+from wetest.testing import control, dag, metrics
+from wetest.testing.capture import CAPTURE
+from wetest.testing.control import RunAbortedError
+from wetest.testing.generator import (
+    InvalidTestError,
+    SubtestExecutions,
+    check_test_consistency,
+    read_getter,
+    record_settle,
+    start_capture,
+    stop_capture,
+)
+from wetest.testing.metrics import METRICS
+from wetest.testing.reader import ADAPTIVE, FIXED, SETTLE
+from wetest.testing.runner import (
+    ConcurrentTestSuite,
+    log_critical_path,
+    log_dependencies,
+    release,
+)
+from wetest.testing.settle import SETTLE_HISTORY
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+# maximum time waited for a put completion (seconds), same as pyepics
+PUT_TIMEOUT = 30.0
+
+# threads used for the blocking Channel Access calls (connections, gets)
+EXECUTOR_WORKERS = 8
+
+
+def _set_result(future, value=None):
+    """Set future result, unless it is already done (cancelled, timed out)."""
+    if not future.done():
+        future.set_result(value)
+
+
+async def get_pv(pv_name):
+    """Return the pooled PV for pv_name, connecting without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, PV_POOL.get, pv_name)
+
+
+async def put(pv, value):
+    """Put value in pv and wait for the put completion callback.
+
+    Callers bound the wait, to PUT_TIMEOUT for the tests.
+    """
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    start_time = time.time()
+
+    def on_put_done(**_kws):
+        METRICS.record(metrics.PUT, pv.pvname, time.time() - start_time)
+        loop.call_soon_threadsafe(_set_result, done)
+
+    pv.put(value, callback=on_put_done)
+    await done
+
+
+async def get(test_data, pv, *, use_monitor=False):
+    """Read pv without blocking the loop, from a worker thread.
+
+    As with the other runners, a fresh value is read rather than the last
+    monitor update, unless use_monitor is set.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None,
+        functools.partial(read_getter, test_data, pv, use_monitor=use_monitor),
+    )
+
+
+async def wait_for_readback(test_data, getter):
+    """Asynchronous counterpart of generator.wait_for_readback.
+
+    Waits until the getter matches, callers bound the wait to the test delay.
+
+    :returns: the time waited for the getter to settle.
+    """
+    loop = asyncio.get_running_loop()
+    start_time = time.time()
+    changed = asyncio.Event()
+
+    def on_change(**_kws):
+        loop.call_soon_threadsafe(changed.set)
+
+    cb_index = getter.add_callback(on_change, with_ctrlvars=False)
+    try:
+        while True:
+            changed.clear()
+            try:
+                test_data.comparator.check(await get(test_data, getter))
+            except AssertionError:
+                await changed.wait()
+            else:
+                return time.time() - start_time
+    finally:
+        getter.remove_callback(cb_index)
+
+
+async def wait_settle(test_data, getter):
+    """Wait for the getter to match, at most for the test delay.
+
+    Records the settle time, raises AssertionError if it did not match.
+    """
+    try:
+        settle_time = await asyncio.wait_for(
+            wait_for_readback(test_data, getter),
+            test_data.delay,
+        )
+    except asyncio.TimeoutError:  # not the builtin one before Python 3.11
+        # last read, raises the comparator assertion
+        test_data.comparator.check(await get(test_data, getter))
+        settle_time = test_data.delay
+    record_settle(test_data, settle_time)
+
+
+async def wait_adaptive(test_data, getter):
+    """Asynchronous counterpart of generator.wait_adaptive."""
+    learned_delay = SETTLE_HISTORY.learned_delay(
+        test_data.setter,
+        test_data.getter,
+        test_data.delay,
+    )
+    test_data.learned_delay = learned_delay
+    start_time = time.time()
+    changes = []
+
+    def on_change(**_kws):
+        changes.append(time.time())
+
+    cb_index = getter.add_callback(on_change, with_ctrlvars=False)
+    try:
+        await control.async_sleep(
+            test_data.delay if learned_delay is None else learned_delay,
+        )
+        try:
+            test_data.comparator.check(await get(test_data, getter))
+        except AssertionError:
+            remaining = test_data.delay - (time.time() - start_time)
+            if learned_delay is None or remaining <= 0:
+                raise
+            logger.info("Learned delay too short for %s", test_data.id)
+            await control.async_sleep(remaining)
+            test_data.comparator.check(await get(test_data, getter))
+    finally:
+        getter.remove_callback(cb_index)
+    record_settle(test_data, changes[-1] - start_time if changes else 0.0)
+
+
+async def check_window(test_data, getter):
+    """Asynchronous counterpart of generator.check_window."""
+    if test_data.comparator.as_string:
+        msg = "A window needs a numeric getter value"
+        raise InvalidTestError(msg)
+    window = test_data.window
+    samples = window.new_buffer()
+
+    def on_change(value=None, **_kws):
+        samples.add(value)
+
+    cb_index = getter.add_callback(on_change, with_ctrlvars=False)
+    try:
+        samples.add(await get(test_data, getter, use_monitor=True))
+        await control.async_sleep(window.duration)
+    finally:
+        getter.remove_callback(cb_index)
+    window.check(test_data.getter, test_data.comparator, samples)
+
+
+async def execute_once(test_data, execution):
+    """Asynchronous counterpart of generator.execute_once."""
+    capture = None
+    try:
+        await control.async_checkpoint()
+        check_test_consistency(test_data)
+
+        # Monitor the getter from before the put, if asked to
+        if CAPTURE.applies(test_data):
+            capture = start_capture(test_data, await get_pv(test_data.getter))
+
+        # Set PV if required
+        execution.setter_error = True
+        if test_data.setter and test_data.set_value is not None:
+            setter = await get_pv(test_data.setter)
+            assert setter.connected, (
+                f"Unable to connect to setter PV {test_data.setter}"
+            )
+            await asyncio.wait_for(
+                put(setter, test_data.comparator.set_value),
+                PUT_TIMEOUT,
+            )
+
+        execution.setter_error = False
+
+        # Delay, in settle and adaptive modes the getter is monitored instead
+        if test_data.delay_mode == FIXED or test_data.getter is None:
+            await control.async_sleep(test_data.delay)
+        else:
+            await control.async_checkpoint()
+
+        # Get and test if required
+        execution.getter_error = True
+        if test_data.getter and test_data.get_value is not None:
+            getter = await get_pv(test_data.getter)
+            assert getter.connected, (
+                f"Unable to connect to getter PV {test_data.getter}"
+            )
+
+            if test_data.delay_mode == SETTLE:
+                await wait_settle(test_data, getter)
+            elif test_data.delay_mode == ADAPTIVE:
+                await wait_adaptive(test_data, getter)
+            elif test_data.window is None:
+                test_data.comparator.check(await get(test_data, getter))
+
+            # the window replaces the single read once the getter settled
+            if test_data.window is not None:
+                await check_window(test_data, getter)
+
+        execution.getter_error = False
+    finally:
+        stop_capture(test_data, capture)
+
+
+async def run_subtest(test_data):
+    """Asynchronous counterpart of the test function from test_generator.
+
+    Logs the same messages, raises AssertionError on failure.
+    """
+    execution = SubtestExecutions(test_data)
+    for _nb_exec in execution:
+        try:
+            await execute_once(test_data, execution)
+
+        # run aborted, neither a failure nor an error
+        except RunAbortedError:  # noqa: PERF203 one execution per retry
+            raise
+
+        # test fails, loop again if there are retries left
+        except AssertionError as e:
+            await control.async_sleep(execution.retry_wait(e))
+
+        # something is not right with this test (ignore retry)
+        except Exception as e:
+            execution.errored(e)
+            raise
+
+        else:
+            execution.succeeded()
+            break  # no exception then no need for retry
+
+
+class AsyncTestSuite(ConcurrentTestSuite):
+    """Run the tests on an asyncio event loop.
+
+    Subtests of a test are executed in order, and functional scenarios are
+    executed one test after the other, unless their tests have `after` fields
+    (see dag). Tests of unit scenarios are all in flight at the same time, but
+    never two tests using the same setter or getter PV.
+
+    Results are recorded in the RunResults of the run, as with the other
+    runners, skipped tests still go through their PlannedTest.
+
+    :param suite:   A TestPlan.
+    :param configs: Suite and scenarios config blocks, as from generate_tests.
+    :param jobs:    Maximum number of tests in flight at the same time,
+                    None or 0 for no limit.
+    :param scenarios: Indexes of the scenarios to run, None to run them all.
+    """
+
+    def __init__(self, suite, configs, jobs=None, scenarios=None) -> None:
+        super().__init__(suite, configs, 1, scenarios)
+        self.jobs = max(0, int(jobs or 0))
+
+    def run(self, result):
+        """Run the tests, scenario after scenario."""
+        asyncio.run(self._run(result))
+        return result
+
+    async def _run(self, result):
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(
+            max_workers=EXECUTOR_WORKERS,
+            thread_name_prefix="wetest-ca",
+            initializer=epics.ca.use_initial_context,
+        )
+        loop.set_default_executor(executor)
+
+        for groups in self.scenario_groups():
+            dependencies = dag.group_dependencies(groups)
+            if dependencies is not None:
+                log_dependencies(groups[0].scenario, dependencies)
+                await self._run_concurrently(groups, result, dependencies)
+                log_critical_path(groups, result)
+            elif self.scenario_type(groups[0].scenario) == "unit":
+                logger.info(
+                    "Running scenario %d on event loop (%s tests in flight)",
+                    groups[0].scenario,
+                    self.jobs or "unlimited",
+                )
+                await self._run_concurrently(groups, result)
+            else:
+                for group in groups:
+                    await self._run_group(group, result)
+
+    async def _run_concurrently(self, groups, result, dependencies=None):
+        """Run groups as tasks, waiting for the PVs they use to be free.
+
+        With dependencies, groups also wait for the groups they depend on.
+        """
+        pending = list(groups)
+        running = {}
+        pvs_in_use = set()
+        waiting = None
+        if dependencies is not None:
+            waiting = {group: set(after) for group, after in dependencies.items()}
+
+        while pending or running:
+            # start every test whose PVs are not already used
+            for group in self.startable_groups(
+                pending,
+                len(running),
+                pvs_in_use,
+                waiting,
+            ):
+                task = asyncio.create_task(self._run_group(group, result))
+                running[task] = group
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                group = running.pop(task)
+                pvs_in_use.difference_update(group.pvs)
+                release(waiting, group)
+                task.result()
+
+    async def _run_group(self, group, result):
+        """Run the subtests of a group one after the other."""
+        for test_case, test_data in group.subtests():
+            if result.shouldStop:
+                break
+            await control.async_checkpoint()
+            if result.skip_reason(test_data.id) is not None:
+                # skipped test only log and raise SkipTest
+                test_case(result)
+                continue
+
+            result.startTest(test_case)
+            try:
+                await run_subtest(test_data)
+            except RunAbortedError:
+                raise
+            except AssertionError:
+                result.addFailure(test_case, sys.exc_info())
+            except Exception:  # noqa: BLE001 reported as test error
+                result.addError(test_case, sys.exc_info())
+            else:
+                result.addSuccess(test_case)
+            finally:
+                result.stopTest(test_case)
@@ -0,0 +1,135 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Keep scenario files read and validated, for the next launches.
+
+An entry is the deserialized tree of a scenario file, macros substituted and
+included files read, once validated. It is looked up from the content of the
+file, the macros known before reading it, the WeTest version and its schema.
+It is only used while the content of each included file is unchanged too, and
+while each include still resolves to the same file (see ScenarioReader).
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+
+from pkg_resources import resource_filename
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+DEFAULT_CACHE_DIRECTORY = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "wetest"
+    / "scenarios"
+)
+
+
+def file_digest(file_path):
+    """Return the SHA-256 of the content of a file, None if it can not be read."""
+    try:
+        with Path(file_path).open("rb") as a_file:
+            return hashlib.sha256(a_file.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class ParseCache:
+    """Scenario files already read and validated.
+
+    :param directory: Where the entries are kept, None to neither read nor
+                      keep any.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY) -> None:
+        self.directory = directory
+        self._schema_digest = None
+
+    def key(self, file_path, digest, known_macros, propagate):
+        """Return the name of the entry of a file read with known_macros.
+
+        :param digest: The SHA-256 of the file content, from file_digest.
+        """
+        if self._schema_digest is None:
+            self._schema_digest = file_digest(
+                resource_filename("wetest", "resources/scenario_schema.yaml"),
+            )
+        key_data = json.dumps(
+            [
+                str(file_path),
+                digest,
+                {str(k): repr(v) for k, v in known_macros.items()},
+                bool(propagate),
+                importlib.metadata.version("WeTest"),
+                self._schema_digest,
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def load(self, key, file_path):
+        """Return the entry of a file, None if there is none or it is stale."""
+        if self.directory is None:
+            return None
+        entry_path = Path(self.directory) / f"{key}.pickle"
+        try:
+            with entry_path.open("rb") as entry_file:
+                entry = pickle.load(entry_file)  # noqa: S301 written by store
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logger.warning("Ignoring parse cache entry %s: %s", entry_path, e)
+            return None
+
+        for included_path, digest in entry["files"].items():
+            if file_digest(included_path) != digest:
+                logger.info("%s changed, reading %s again", included_path, file_path)
+                return None
+        logger.info("Read %s from parse cache", file_path)
+        return entry
+
+    def store(self, key, file_path, entry):
+        """Keep the entry of a file.
+
+        :param entry: A dict with, under `files`, the SHA-256 of each file
+                      read, by path, and under `includes`, the path each
+                      include resolved to.
+        """
+        if self.directory is None:
+            return
+        directory = Path(self.directory)
+        entry_path = directory / f"{key}.pickle"
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            temp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+            with temp_path.open("wb") as entry_file:
+                pickle.dump(entry, entry_file, protocol=pickle.HIGHEST_PROTOCOL)
+            temp_path.replace(entry_path)
+        except (OSError, pickle.PicklingError) as e:
+            logger.warning("Could not keep %s in parse cache: %s", file_path, e)
+            return
+        logger.debug("Kept %s in parse cache", file_path)
+
+
+# scenario files read by this process
+PARSE_CACHE = ParseCache()
@@ -0,0 +1,116 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Capture what the getter of a subtest does while the subtest waits for it.
+
+The getter is monitored from before the put until the subtest outcome, its
+value when the capture starts and each monitor update being kept, along with
+the time they were received. Only the latest samples are kept, up to a
+maximum number of them.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+# samples kept per subtest when the maximum is not given
+DEFAULT_MAX_SAMPLES = 500
+
+
+class Capture:
+    """Samples of a getter, the latest max_samples ones being kept.
+
+    :param getter:      The getter PV, monitored until stop is called.
+    :param max_samples: Number of samples kept.
+    """
+
+    def __init__(self, getter, max_samples) -> None:
+        self.getter = getter
+        self.start_time = time.time()
+        # (time, value) samples, the oldest ones dropped once full
+        self._samples = deque(maxlen=max(1, int(max_samples)))
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._cb_index = getter.add_callback(self._on_change, with_ctrlvars=False)
+        self.add(getter.get(use_monitor=True))
+
+    def _on_change(self, value=None, **_kws):
+        self.add(value)
+
+    def add(self, value):
+        """Keep a sample received now, dropping the oldest one if full."""
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            # not a number, still keep when it was received
+            value = float("NaN")
+        with self._lock:
+            if len(self._samples) == self._samples.maxlen:
+                self.dropped += 1
+            self._samples.append((time.time() - self.start_time, value))
+
+    def stop(self):
+        """Stop monitoring the getter.
+
+        :returns: the samples, as a 2-row float32 array of times since the
+                  start of the capture (seconds) and values.
+        """
+        self.getter.remove_callback(self._cb_index)
+        if self.dropped:
+            logger.debug(
+                "Dropped %d samples of %s",
+                self.dropped,
+                self.getter.pvname,
+            )
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float32)
+        return samples.reshape(-1, 2).T
+
+
+class CaptureSettings:
+    """Whether and how much subtests capture of their getter.
+
+    :param max_samples: Samples kept per subtest, 0 to capture nothing.
+    """
+
+    def __init__(self, max_samples=0) -> None:
+        self.max_samples = max_samples
+
+    def applies(self, test_data):
+        """Tell whether a subtest captures its getter."""
+        return (
+            self.max_samples > 0
+            and test_data.getter is not None
+            and test_data.get_value is not None
+            and not test_data.comparator.as_string
+            and not isinstance(test_data.get_value, list)
+        )
+
+    def start(self, getter):
+        """Start capturing a getter PV."""
+        return Capture(getter, self.max_samples)
+
+
+# captures of the tests of a process
+CAPTURE = CaptureSettings()
@@ -0,0 +1,236 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Compare read-back values to the ones expected by a test."""
+
+# Asserts are used here, like in generated tests
+# ruff: noqa: S101
+
+import logging
+
+import numpy as np
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER, to_string
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+# kinds of comparison
+STRING = "string"
+ARRAY = "array"
+EXACT = "exact"
+TOLERANCE = "tolerance"
+
+
+def convert_values(values):
+    """Return values as they are expected by pyepics.
+
+    pyepics expect single characters to be passed as integer,
+    convert string to int or float where possible.
+    """
+    converted = []
+    for v in values:
+        if isinstance(v, str):
+            if len(v) == 1:
+                converted.append(ord(v))
+            else:
+                try:
+                    converted.append(int(v))
+                except ValueError:
+                    converted.append(float(v))
+        else:
+            converted.append(v)
+    return converted
+
+
+class Comparator:
+    """What a subtest puts and expects to read, resolved once.
+
+    Values are converted, tolerances resolved and messages prepared when the
+    test is generated, a check is then a single comparison, vectorized for
+    arrays.
+
+    A value that cannot be converted is not an error until the subtest uses
+    it, so that the failure is reported by the subtest itself.
+
+    If margin is used, the comparison is not a strict equality, but more
+    or less the given percentage. For instance, if margin is used with a
+    value of 10%, all values between 9V and 11V will be considered as good
+    value.
+
+    :param test_data: The TestData to compile.
+    """
+
+    def __init__(self, test_data) -> None:
+        self.getter = test_data.getter
+        self.get_value = test_data.get_value
+        self.as_string = isinstance(test_data.get_value, str)
+
+        self._set_value = test_data.set_value
+        self._set_error = None
+        if isinstance(test_data.set_value, list):
+            try:
+                self._set_value = convert_values(test_data.set_value)
+            except ValueError as e:
+                self._set_error = e
+
+        self._get_error = None
+        try:
+            self._compile(test_data)
+        except (TypeError, ValueError) as e:
+            self._get_error = e
+
+    def _compile(self, test_data):
+        """Resolve expected value, tolerances and message parts."""
+        margin = test_data.margin
+        delta = test_data.delta
+
+        if self.as_string:
+            self.kind = STRING
+
+        elif isinstance(test_data.get_value, list):
+            self.kind = ARRAY
+            self.expected_list = convert_values(test_data.get_value)
+            self.expected = np.array(self.expected_list, dtype=float)
+
+            # tolerances, resolved element-wise
+            self.tolerance_str = ""
+            self.atol = 0.0
+            self.allowed = np.zeros(len(self.expected))
+            if margin is not None:
+                self.tolerance_str += f" ±{margin * 100:.3G}%"
+                self.allowed = np.abs(self.expected * margin).astype(float)
+            if margin is not None and delta is not None:
+                self.tolerance_str += " or"
+            if delta is not None:
+                self.tolerance_str += f" ±{delta:.3G}"
+                self.atol = float(delta)
+                self.allowed = np.maximum(self.allowed, self.atol)
+
+        elif not margin and not delta:
+            self.kind = EXACT
+
+        else:
+            self.kind = TOLERANCE
+            margin_value = (
+                abs(float(test_data.get_value) * float(margin))
+                if margin is not None
+                else 0
+            )
+            delta_value = abs(float(delta)) if delta is not None else 0
+
+            if margin_value > delta_value:
+                self.max_delta = margin_value
+                self.tolerance_str = f"±{margin * 100:.3G}%"
+            else:
+                self.max_delta = delta_value
+                self.tolerance_str = f"±{delta_value:.3G}"
+
+            self.expected = (
+                float("NaN")
+                if test_data.get_value is None
+                else float(test_data.get_value)
+            )
+            self.bounds_str = (
+                f"[{self.expected - self.max_delta:.3G},"
+                f"{self.expected + self.max_delta:.3G}]"
+            )
+
+    @property
+    def set_value(self):
+        """The value to put in the setter PV."""
+        if self._set_error is not None:
+            raise self._set_error
+        return self._set_value
+
+    def check(self, measured_value):
+        """Assert the measured value is the expected one.
+
+        :param measured_value: The value read from the getter PV.
+        """
+        if self._get_error is not None:
+            raise self._get_error
+
+        if self.kind == STRING:
+            assert self.get_value == measured_value, (
+                f"Expected {self.getter} to be {to_string(self.get_value)}, "
+                f"but got {to_string(measured_value)}"
+            )
+        elif self.kind == ARRAY:
+            self._check_array(measured_value)
+        elif self.kind == EXACT:
+            assert self.get_value == measured_value, (
+                f"Expected {self.getter} "
+                f"to be {to_string(self.get_value)}, "
+                f"but got {to_string(measured_value)}"
+            )
+        else:
+            measured_value = (
+                float("NaN") if measured_value is None else float(measured_value)
+            )
+            assert (
+                self.get_value == measured_value
+                or abs(self.expected - measured_value) <= self.max_delta
+            ), (
+                f"Expected {self.getter} to be {self.expected:.3G} "
+                f"{self.tolerance_str} (ie. within {self.bounds_str}), "
+                f"but got {measured_value:.3G}"
+            )
+
+    def _check_array(self, measured_value):
+        """Compare a table of values, allowing margin and delta."""
+        if not isinstance(measured_value, np.ndarray):
+            if len(self.expected) == 1:
+                # pyepics get does not return a list in case of
+                # a single-element waveform
+                measured_value = np.array([measured_value])
+            else:
+                msg = (
+                    f"Expected {self.getter} to be an array "
+                    f"but got {to_string(measured_value)}"
+                )
+                raise ValueError(msg)
+
+        # the measured value gives the length of the table to compare,
+        # add zero after the expected values
+        expected = self.expected
+        allowed = self.allowed
+        padding = len(measured_value) - len(expected)
+        if padding > 0:
+            expected = np.concatenate([expected, np.zeros(padding)])
+            allowed = np.concatenate([allowed, np.full(padding, self.atol)])
+
+        assert len(expected) == len(measured_value), (
+            f"Expected {self.getter} to be "
+            f"{len(expected)} elements long, "
+            f"and not {len(measured_value)}: "
+            f"{to_string(measured_value)}"
+        )
+
+        diff = np.abs(measured_value - expected)
+        isclose = np.logical_or(measured_value == expected, diff <= allowed)
+        if not np.all(isclose):
+            # show "OK" if close otherwise show difference
+            diff[isclose] = 0
+            diff_str = ["OK" if x == 0 else x for x in diff]
+            expected_list = self.expected_list + [0] * max(0, padding)
+            msg = (
+                f"Expected {self.getter} to be "
+                f"{to_string(expected_list)}{self.tolerance_str},\n"
+                f"but got {to_string(measured_value)},\n"
+                f"difference is {to_string(diff_str)}"
+            )
+            raise AssertionError(msg)
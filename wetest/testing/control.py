@@ -0,0 +1,212 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Pause, resume and abort a run from another process.
+
+The manager and the runner share a RunControl. Tests check it between
+Channel Access operations and while waiting (see `checkpoint` and `sleep`),
+blocking while the run is paused and raising RunAbortedError once it is aborted.
+The runner process then stays alive, ready to run the tests again.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+
+from wetest.common.constants import (
+    ABORT_FROM_TEST,
+    FILE_HANDLER,
+    PAUSE_FROM_TEST,
+    VERBOSE_FORMATTER,
+    WeTestError,
+)
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+# how often a paused or idle runner checks for abort and close (seconds)
+CHECK_PERIOD = 0.05
+
+
+class RunAbortedError(WeTestError):
+    """Raised in the runner when the run has been aborted."""
+
+
+class RunControl:
+    """Run control shared by the manager and the runner processes.
+
+    start:  set when the runner is requested to run the tests
+    resume: set while the run is not paused
+    abort:  set when the current run is aborted
+    close:  set when the runner process should leave
+
+    :param pausable: Whether tests may pause the run, a run nobody can resume,
+                     like a headless one, continues instead.
+    """
+
+    def __init__(self, *, pausable=True) -> None:
+        self.pausable = pausable
+        self._start = multiprocessing.Event()
+        self._resume = multiprocessing.Event()
+        self._resume.set()
+        self._abort = multiprocessing.Event()
+        self._close = multiprocessing.Event()
+
+    # manager side
+
+    def request_start(self):
+        """Request the runner to run the tests, not paused."""
+        self._resume.set()
+        self._start.set()
+
+    def pause(self):
+        """Pause the run before next Channel Access operation."""
+        self._resume.clear()
+
+    def resume(self):
+        """Resume a paused run."""
+        self._resume.set()
+
+    def abort(self):
+        """Abort the current run, the runner then waits for next start."""
+        self._abort.set()
+
+    def request(self, run_control):
+        """Apply the run control requested by a failing test.
+
+        Done by the runner itself, the run is paused or aborted before the
+        manager even hears about it.
+        """
+        if run_control == PAUSE_FROM_TEST:
+            if self.pausable:
+                self.pause()
+            else:
+                logger.warning("Run cannot be paused, continuing.")
+        elif run_control == ABORT_FROM_TEST:
+            self.abort()
+
+    def close(self):
+        """Abort the current run and let the runner process leave."""
+        self._close.set()
+        self._abort.set()
+
+    @property
+    def paused(self):
+        return not self._resume.is_set()
+
+    @property
+    def aborted(self):
+        return self._abort.is_set()
+
+    @property
+    def closed(self):
+        return self._close.is_set()
+
+    # runner side
+
+    def wait_start(self):
+        """Wait for a start request, return False if closed meanwhile."""
+        while not self._start.wait(CHECK_PERIOD):
+            if self.closed:
+                return False
+        self._start.clear()
+        self._abort.clear()
+        return not self.closed
+
+    def checkpoint(self):
+        """Block while the run is paused, raise RunAbortedError once aborted."""
+        while not self._resume.wait(CHECK_PERIOD):
+            if self._abort.is_set():
+                break
+        if self._abort.is_set():
+            raise RunAbortedError
+
+    def sleep(self, duration):
+        """Wait for duration, then like checkpoint, raise as soon as aborted."""
+        if duration > 0 and self._abort.wait(duration):
+            raise RunAbortedError
+        self.checkpoint()
+
+    async def async_checkpoint(self):
+        """Same as checkpoint, without blocking the event loop.
+
+        A paused task waits for resume or abort in a worker thread.
+        """
+        if self._resume.is_set() and not self._abort.is_set():
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.checkpoint)
+
+    async def async_sleep(self, duration):
+        """Same as sleep, without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        while not self._abort.is_set():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, CHECK_PERIOD))
+        await self.async_checkpoint()
+
+
+# run control of the runner of this process, tests run uncontrolled without it
+_CONTROL = None
+
+
+def set_run_control(run_control):
+    """Make the tests of this process (and its children) follow run_control."""
+    global _CONTROL  # noqa: PLW0603 one control per runner process
+    _CONTROL = run_control
+
+
+def get_run_control():
+    """Return the run control of this process, None if there is none."""
+    return _CONTROL
+
+
+def request(run_control):
+    """Apply the run control requested by a failing test."""
+    if _CONTROL is not None:
+        _CONTROL.request(run_control)
+
+
+def checkpoint():
+    """Block while paused, raise RunAbortedError once aborted."""
+    if _CONTROL is not None:
+        _CONTROL.checkpoint()
+
+
+def sleep(duration):
+    """Sleep for duration, following run control."""
+    if _CONTROL is None:
+        time.sleep(duration)
+    else:
+        _CONTROL.sleep(duration)
+
+
+async def async_sleep(duration):
+    """Sleep for duration on the event loop, following run control."""
+    if _CONTROL is None:
+        await asyncio.sleep(duration)
+    else:
+        await _CONTROL.async_sleep(duration)
+
+
+async def async_checkpoint():
+    """Block the task while paused, raise RunAbortedError once aborted."""
+    if _CONTROL is not None:
+        await _CONTROL.async_checkpoint()
@@ -0,0 +1,164 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Dependencies between the tests of functional scenarios.
+
+A test of a functional scenario waits for the test just before it, unless it
+has an `after` field naming the previous tests it waits for instead, an empty
+list starting a new chain. Tests that do not wait for each other, directly or
+not, are run at the same time, so that a scenario lasts as long as its
+critical path rather than as long as all its tests.
+"""
+
+import logging
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER, WeTestError
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+
+class InvalidDependencyError(WeTestError):
+    """A test is after a test that is not before it in the scenario."""
+
+
+def resolve_after(tests, has_subtests):
+    """Return the indexes of the tests each test waits for.
+
+    Tests without subtests (ignored, finally only) are not waited for, tests
+    after them wait for what they would have waited for instead.
+
+    :param tests:        The `tests` block of a functional scenario.
+    :param has_subtests: Whether each test has subtests to run.
+
+    :returns: A frozenset of test indexes per test,
+              None if no test has an `after` field.
+    """
+    if not any("after" in test for test in tests):
+        return None
+
+    indexes_by_name = {}
+    prerequisites = []
+    for index, test in enumerate(tests):
+        after = test.get("after")
+        if after is None:
+            waited = [index - 1] if index > 0 else []
+        else:
+            if isinstance(after, str):
+                after = [after]
+            waited = []
+            for name in after:
+                if name not in indexes_by_name:
+                    msg = (
+                        f"Test `{test['name']}` is after `{name}`, "
+                        "which is not a previous test of the scenario."
+                    )
+                    raise InvalidDependencyError(msg)
+                waited += indexes_by_name[name]
+
+        resolved = set()
+        for waited_index in waited:
+            if has_subtests[waited_index]:
+                resolved.add(waited_index)
+            else:
+                resolved.update(prerequisites[waited_index])
+        prerequisites.append(frozenset(resolved))
+        indexes_by_name.setdefault(test["name"], []).append(index)
+
+    return prerequisites
+
+
+def group_dependencies(groups):
+    """Return the groups each group waits for, in the order of groups.
+
+    :param groups: The TestGroup of a scenario, in file order.
+
+    :returns: A set of TestGroup by TestGroup,
+              None if the scenario runs in file order.
+    """
+    if not groups or groups[0].after is None:
+        return None
+    groups_by_test = {group.test: group for group in groups}
+    return {
+        group: {groups_by_test[test] for test in group.after if test in groups_by_test}
+        for group in groups
+    }
+
+
+def critical_path(dependencies, duration):
+    """Return the length and the groups of the longest chain of groups.
+
+    :param dependencies: The groups each group waits for, prerequisites first.
+    :param duration:     Function returning the time taken by a group.
+
+    :returns: The length of the critical path (seconds), and its groups.
+    """
+    finish = {}
+    previous = {}
+    for group, prerequisites in dependencies.items():
+        start, previous[group] = max(
+            ((finish[prerequisite], prerequisite) for prerequisite in prerequisites),
+            key=lambda item: item[0],
+            default=(0.0, None),
+        )
+        finish[group] = start + duration(group)
+
+    if not finish:
+        return 0.0, []
+    group = max(finish, key=finish.get)
+    length = finish[group]
+    path = []
+    while group is not None:
+        path.append(group)
+        group = previous[group]
+    return length, path[::-1]
+
+
+def planned_duration(group):
+    """Return the delays of the subtests of a group (seconds)."""
+    return group.delay
+
+
+def critical_paths(groups, result):
+    """Return the critical path of the scenarios run as dependency graphs.
+
+    :param groups: TestGroup of the plan, as from group_tests.
+    :param result: RunResults of the run.
+
+    :returns: By scenario index, the length of the critical path (seconds),
+              its groups and the time taken by all the tests of the scenario.
+    """
+
+    def run_duration(group):
+        return sum(result.durations[index] for index in group.indexes)
+
+    groups_by_scenario = {}
+    for group in groups:
+        groups_by_scenario.setdefault(group.scenario, []).append(group)
+
+    paths = {}
+    for scenario, scenario_groups in groups_by_scenario.items():
+        dependencies = group_dependencies(scenario_groups)
+        if dependencies is not None:
+            length, path = critical_path(dependencies, run_duration)
+            total = sum(run_duration(group) for group in scenario_groups)
+            paths[scenario] = (length, path, total)
+    return paths
+
+
+def path_titles(path):
+    """Return the titles of the tests of a path, as a single string."""
+    return " > ".join(str(group.title) for group in path)
@@ -0,0 +1,278 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Typed events sent by the runner about the progress of the tests.
+
+Each event is packed in a fixed size binary header: kind, status, scenario,
+test and subtest numbers and duration, optionally followed by a UTF-8
+message, and sent as one message over a pipe. Runner threads and shard
+processes share the writing end, the manager reads the other one.
+
+Headless runs write the events as JSON lines instead, see JsonLinesWriter.
+
+Tests only send events, formatting them is left to whoever receives them:
+the manager logs them as test results lines (see log_event) and updates the
+GUI, JsonLinesWriter formats them as JSON.
+"""
+
+import json
+import logging
+import multiprocessing
+import struct
+import time
+from typing import NamedTuple, Optional, Tuple  # noqa: UP035
+
+from wetest.common.constants import (
+    ABORT_FROM_TEST,
+    CONTINUE_FROM_TEST,
+    FILE_HANDLER,
+    LVL_RUN_CONTROL,
+    LVL_TEST_ERRORED,
+    LVL_TEST_FAILED,
+    LVL_TEST_RUNNING,
+    LVL_TEST_SKIPPED,
+    LVL_TEST_SUCCESS,
+    PAUSE_FROM_TEST,
+    TERSE_FORMATTER,
+    VERBOSE_FORMATTER,
+)
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+## logger to share test results
+tr_logger = logging.getLogger("_wetest_tests_results")
+tr_logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(TERSE_FORMATTER)
+stream_handler.setLevel(logging.WARNING)
+tr_logger.addHandler(stream_handler)
+tr_logger.addHandler(FILE_HANDLER)
+
+# event kinds
+STARTED = 1
+RETRY = 2
+RESULT = 3
+SKIP = 4
+CONTROL = 5
+END = 6
+
+# status of RESULT events
+SUCCESS = 1
+FAILURE = 2
+ERROR = 3
+SKIPPED = 4
+
+# status of CONTROL events, the run control requested by a test
+CONTROLS = {CONTINUE_FROM_TEST: 1, PAUSE_FROM_TEST: 2, ABORT_FROM_TEST: 3}
+CONTROLS_BY_STATUS = {status: control for control, status in CONTROLS.items()}
+
+# names used in JSON lines
+KIND_NAMES = {
+    STARTED: "started",
+    RETRY: "retry",
+    RESULT: "result",
+    SKIP: "skip",
+    CONTROL: "control",
+    END: "end",
+}
+STATUS_NAMES = {
+    SUCCESS: "success",
+    FAILURE: "failure",
+    ERROR: "error",
+    SKIPPED: "skipped",
+}
+
+# kind, status, scenario, test, subtest, duration
+HEADER = struct.Struct("<BBIIId")
+# largest status, RETRY events count executions up to it
+MAX_STATUS = 255
+NO_TEST = (0, 0, 0)
+
+
+class Event(NamedTuple):
+    """An event received from the runner.
+
+    kind:       STARTED, RETRY, RESULT, SKIP, CONTROL or END
+    status:     RESULT status, CONTROL status, execution number of RETRY
+                events (at most MAX_STATUS), 0 otherwise
+    numbers:    scenario, test and subtest numbers of the subtest
+    duration:   time spent in the subtest (seconds)
+    message:    failure message or traceback, None if there is none
+    """
+
+    kind: int
+    status: int
+    numbers: Tuple[int, int, int]  # noqa: UP006
+    duration: float
+    message: Optional[str]  # noqa: FA100
+
+    @property
+    def test_id(self):
+        """Return the subtest id (test-S-T-ST)."""
+        return "test-{}-{}-{}".format(*self.numbers)
+
+    @property
+    def control(self):
+        """Return the run control requested by a CONTROL event."""
+        return CONTROLS_BY_STATUS.get(self.status)
+
+
+class EventChannel:
+    """One way pipe carrying events from the runner to the manager.
+
+    Sending is serialized by a lock shared by the writing threads and
+    processes. The receiving side counts events, see `rate`.
+    """
+
+    def __init__(self) -> None:
+        self._reader, self._writer = multiprocessing.Pipe(duplex=False)
+        self._lock = multiprocessing.Lock()
+        self.nb_received = 0
+        self.first_time = None
+        self.last_time = None
+
+    def send(self, kind, numbers=NO_TEST, status=0, duration=0.0, message=None):
+        """Pack and send an event."""
+        data = HEADER.pack(kind, status, *numbers, duration)
+        if message is not None:
+            data += str(message).encode("utf-8", "replace")
+        with self._lock:
+            self._writer.send_bytes(data)
+
+    def recv(self):
+        """Wait for the next event and unpack it."""
+        data = self._reader.recv_bytes()
+        kind, status, scenario, test, subtest, duration = HEADER.unpack_from(data)
+        message = None
+        if len(data) > HEADER.size:
+            message = data[HEADER.size :].decode("utf-8", "replace")
+
+        self.last_time = time.time()
+        if self.first_time is None:
+            self.first_time = self.last_time
+        self.nb_received += 1
+        return Event(kind, status, (scenario, test, subtest), duration, message)
+
+    def rate(self):
+        """Return the number of events received per second so far."""
+        if self.nb_received < 2:  # noqa: PLR2004 need an interval
+            return 0.0
+        elapsed = self.last_time - self.first_time
+        return self.nb_received / elapsed if elapsed > 0 else float("inf")
+
+    def log_stats(self):
+        """Log how many events were received and at which rate."""
+        logger.info(
+            "EventChannel: %d events received, %.0f events/s",
+            self.nb_received,
+            self.rate(),
+        )
+
+
+class JsonLinesWriter:
+    """Write events as JSON lines, in place of an EventChannel.
+
+    Each event is written and flushed as a single line, under a lock shared
+    with forked shard processes, so that lines never interleave.
+
+    :param stream: A text file object, like sys.stdout.
+    """
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self._lock = multiprocessing.Lock()
+
+    def send(self, kind, numbers=NO_TEST, status=0, duration=0.0, message=None):
+        """Write an event."""
+        record = {"event": KIND_NAMES[kind], "time": time.time()}
+        if kind not in (CONTROL, END):
+            record["test"] = "test-{}-{}-{}".format(*numbers)
+        if kind == RESULT:
+            record["status"] = STATUS_NAMES.get(status, status)
+        elif kind == RETRY:
+            record["execution"] = status
+        elif kind == CONTROL:
+            record["control"] = CONTROLS_BY_STATUS.get(status)
+        if duration:
+            record["duration"] = duration
+        if message is not None:
+            record["message"] = str(message)
+        self.write(record)
+
+    def write(self, record):
+        """Write a dict as a JSON line."""
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+
+# channel the runner of this process sends events to, if any
+_CHANNEL = None
+
+
+def set_channel(channel):
+    """Send the events of this process (and its children) to channel."""
+    global _CHANNEL  # noqa: PLW0603 one channel per runner process
+    _CHANNEL = channel
+
+
+def emit(kind, test_data=None, status=0, duration=0.0, message=None):
+    """Send an event about test_data, if a channel is set."""
+    if _CHANNEL is None:
+        return
+    numbers = NO_TEST if test_data is None else test_data.numbers
+    _CHANNEL.send(kind, numbers, status, duration, message)
+
+
+# test results lines of each RESULT status: level and format
+RESULT_LINES = {
+    SUCCESS: (LVL_TEST_SUCCESS, "Success of %s    (in %.3fs) %s"),
+    FAILURE: (LVL_TEST_FAILED, "Failure of %s    (in %.3fs) %s"),
+    ERROR: (LVL_TEST_ERRORED, "Error   of %s    (in %.3fs) %s"),
+}
+
+
+def log_event(event, test_data=None):
+    """Log a received event as a line of the test results.
+
+    :param event:     The Event.
+    :param test_data: The TestData of the subtest, for its description and
+                      retries, None if unknown.
+    """
+    desc = "" if test_data is None else test_data.desc
+    if event.kind == STARTED:
+        tr_logger.log(LVL_TEST_RUNNING, "")
+        tr_logger.log(LVL_TEST_RUNNING, "Running    %s    %s", event.test_id, desc)
+    elif event.kind == SKIP:
+        tr_logger.log(LVL_TEST_SKIPPED, "")
+        tr_logger.log(LVL_TEST_SKIPPED, "Skipping   %s    %s", event.test_id, desc)
+    elif event.kind == RETRY:
+        tr_logger.log(
+            LVL_TEST_RUNNING,
+            "Retry (%d/%s) %s    (in %.3fs) %s",
+            event.status,
+            "?" if test_data is None else test_data.retry,
+            event.test_id,
+            event.duration,
+            event.message,
+        )
+    elif event.kind == RESULT and event.status in RESULT_LINES:
+        level, line = RESULT_LINES[event.status]
+        tr_logger.log(level, line, event.test_id, event.duration, event.message or "")
+    elif event.kind == CONTROL:
+        tr_logger.log(LVL_RUN_CONTROL, "%s", event.control)
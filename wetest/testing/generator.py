@@ -15,31 +15,32 @@
 # TODO(minijackson): maybe in the future we'll migrate to raising exceptions
 # ruff: noqa: S101
 
+import functools
 import logging
 import random
+import threading
 import time
-import unittest
 
-import epics
 import numpy as np
 
 from wetest.common.constants import (
     ABORT_FROM_TEST,
     CONTINUE_FROM_TEST,
     FILE_HANDLER,
-    LVL_RUN_CONTROL,
-    LVL_TEST_ERRORED,
-    LVL_TEST_FAILED,
-    LVL_TEST_RUNNING,
-    LVL_TEST_SKIPPED,
-    LVL_TEST_SUCCESS,
     PAUSE_FROM_TEST,
-    TERSE_FORMATTER,
     VERBOSE_FORMATTER,
     WeTestError,
-    to_string,
 )
-from wetest.testing.reader import ABORT, CONTINUE, PAUSE
+from wetest.pvs.pool import PV_POOL
+from wetest.testing import control, dag, events, metrics
+from wetest.testing.capture import CAPTURE
+from wetest.testing.comparator import Comparator
+from wetest.testing.control import RunAbortedError
+from wetest.testing.metrics import METRICS
+from wetest.testing.reader import ABORT, ADAPTIVE, CONTINUE, FIXED, PAUSE, SETTLE
+from wetest.testing.retry import RetryPolicy
+from wetest.testing.settle import SETTLE_HISTORY
+from wetest.testing.window import WindowCheck
 
 NO_KIND = "Missing test kind (values, range or commands)"
 
@@ -51,15 +52,6 @@ stream_handler.setFormatter(VERBOSE_FORMATTER)
 logger.addHandler(stream_handler)
 logger.addHandler(FILE_HANDLER)
 
-## logger to share test results
-tr_logger = logging.getLogger("_wetest_tests_results")
-tr_logger.setLevel(logging.DEBUG)
-stream_handler = logging.StreamHandler()
-stream_handler.setFormatter(TERSE_FORMATTER)
-stream_handler.setLevel(logging.WARNING)
-tr_logger.addHandler(stream_handler)
-tr_logger.addHandler(FILE_HANDLER)
-
 
 class EmptyTestError(WeTestError):
     """Test does not do anything.
@@ -101,10 +93,13 @@ class TestData:
         set_value=None,
         prefix="",
         delay=0,
+        delay_mode=FIXED,
         margin=None,
         delta=None,
         test_message=None,
         subtest_message=None,
+        retry_policy=None,
+        window=None,
     ) -> None:
         """Initialize a TestData structure.
 
@@ -119,10 +114,15 @@ class TestData:
         :param set_value: Value to send.
         :param prefix: Commands prefix (prefix of getter and setter).
         :param delay: Delay between two commands (a float in seconds).
+        :param delay_mode: Whether to wait for the whole delay (fixed),
+                           until the getter matches (settle) or for the
+                           learned settle time (adaptive).
         :param margin: Allowed percentage of margin of read-back value.
         :param delta: Allowed interval around read-back value.
         :param test_message: If any a test message.
         :param subtest_message: If any a subtest message.
+        :param retry_policy: The `retry_policy` block, how to wait between retries.
+        :param window: The `window` block, how to check the getter over time.
         """
         if on_failure.lower() not in [ABORT, PAUSE, CONTINUE]:
             logger.critical("Unexpected on_failure value: %s", on_failure)
@@ -132,6 +132,11 @@ class TestData:
         self.test_title = test_title
         self.subtest_title = subtest_title
         self.id = test_id
+        # scenario, test and subtest numbers, set along with the id
+        self.numbers = events.NO_TEST
+        # indexes of the tests of the scenario this one waits for,
+        # None when the scenario runs in file order (see dag)
+        self.after = None
         self.skip = skip
         self.retry = float(retry)
         self.getter = getter
@@ -140,6 +145,7 @@ class TestData:
         self.set_value = set_value
         self.prefix = prefix
         self.delay = delay
+        self.delay_mode = delay_mode
         self.margin = margin
         self.delta = delta
         self.test_message = test_message
@@ -153,6 +159,18 @@ class TestData:
         if self.retry < 0:
             self.retry = float("inf")
 
+        self.retry_policy = RetryPolicy.from_data(self.retry, retry_policy)
+        self.window = WindowCheck.from_data(window)
+
+        # filled in by the runners, from the last execution
+        self.retries = 0
+        self.retry_time = 0.0
+        # time taken by the getter to settle, and delay learned (adaptive)
+        self.settle_time = None
+        self.learned_delay = None
+        # getter samples during the subtest, as from capture.Capture.stop
+        self.capture = None
+
         if self.setter is not None and self.prefix is not None:
             self.setter = self.prefix + self.setter
 
@@ -165,6 +183,9 @@ class TestData:
             + str(self.subtest_title).replace("\n", " ")
         )
 
+        # values and tolerances resolved once for all executions
+        self.comparator = Comparator(self)
+
         logger.debug("%s", self)
 
     def __str__(self) -> str:
@@ -174,12 +195,15 @@ class TestData:
         output += "\n\tid: %s" % self.id
         output += "\n\ton_failure: %s" % self.on_failure
         output += "\n\tretry: %s" % self.retry
+        output += "\n\tretry_policy: %s" % self.retry_policy
+        output += "\n\twindow: %s" % self.window
         output += "\n\tgetter: %s" % self.getter
         output += "\n\tsetter: %s" % self.setter
         output += "\n\tget_value: %s" % self.get_value
         output += "\n\tset_value: %s" % self.set_value
         output += "\n\tprefix: %s" % self.prefix
         output += "\n\tdelay: %s" % self.delay
+        output += "\n\tdelay_mode: %s" % self.delay_mode
         output += "\n\tmargin: %s" % self.margin
         output += "\n\tdelta: %s" % self.delta
         output += "\n\ttest_message: %s" % self.test_message
@@ -188,6 +212,136 @@ class TestData:
         return output
 
 
+class SubtestSweep:
+    """The subtests of a `range` or `values` test, created when first used.
+
+    Only the values and the TestData fields shared by the subtests are kept,
+    a sweep over many values then costs little until its subtests are run or
+    shown. A created subtest is kept, to share what runners record in it.
+    Subtests appended (the `finally` one) come after those of the values.
+
+    :param values: The value of each subtest, in execution order.
+    :param fields: TestData arguments shared by the subtests, the value being
+                   set if there is a `setter` and read back if a `getter`.
+    """
+
+    def __init__(self, values, **fields) -> None:
+        self.values = values
+        self.fields = fields
+        # scenario and test numbers, once located
+        self.numbers = None
+        # set on each subtest, see TestData
+        self.after = None
+        self._get_test_id = None
+        self._appended = []
+        self._created = {}
+
+    def __len__(self) -> int:
+        return len(self.values) + len(self._appended)
+
+    def __iter__(self):
+        for subtest in range(len(self)):
+            yield self[subtest]
+
+    def __getitem__(self, subtest):
+        test_data = self._created.get(subtest)
+        if test_data is not None:
+            return test_data
+        if not 0 <= subtest < len(self):
+            raise IndexError(subtest)
+        if subtest < len(self.values):
+            test_data = self._create(self.values[subtest])
+        else:
+            test_data = self._appended[subtest - len(self.values)]
+        self._locate(subtest, test_data)
+        self._created[subtest] = test_data
+        return test_data
+
+    def __repr__(self) -> str:
+        return f"<SubtestSweep {self.fields['test_title']!r} ({len(self)})>"
+
+    def append(self, test_data):
+        """Add a subtest after those of the values."""
+        self._appended.append(test_data)
+
+    def locate(self, get_test_id, scenario, test):
+        """Number the subtests as those of the test of index test in scenario.
+
+        :param get_test_id: Returns the id of a subtest from its numbers.
+        """
+        self.numbers = (scenario, test)
+        self._get_test_id = get_test_id
+        for subtest, test_data in self._created.items():
+            self._locate(subtest, test_data)
+
+    def test_id(self, subtest):
+        """Return the id of a subtest, without creating it."""
+        scenario, test = self.numbers
+        return self._get_test_id(scenario=scenario, test=test, subtest=subtest)
+
+    def is_skipped(self, subtest):
+        """Tell whether a subtest is skipped from file, without creating it."""
+        test_data = self._created.get(subtest)
+        if test_data is None and subtest >= len(self.values):
+            test_data = self._appended[subtest - len(self.values)]
+        if test_data is None:
+            return bool(self.fields["skip"])
+        return bool(test_data.skip)
+
+    def pv_names(self):
+        """Return the names of the setter and getter PVs of the subtests."""
+        pv_names = set()
+        if len(self.values):
+            pv_names.update(self.values_pvs())
+        for test_data in self._appended:
+            pv_names.update((test_data.setter, test_data.getter))
+        pv_names.discard(None)
+        return pv_names
+
+    def values_pvs(self):
+        """Return the setter and getter PV names of the subtests of the values.
+
+        Names are prefixed like in TestData, None if there is no such PV.
+        """
+        prefix = self.fields["prefix"]
+        return tuple(
+            pv_name if prefix is None or pv_name is None else prefix + pv_name
+            for pv_name in (self.fields["setter"], self.fields["getter"])
+        )
+
+    def delay(self):
+        """Return the sum of the delays of the subtests (seconds)."""
+        return self.fields["delay"] * len(self.values) + sum(
+            test_data.delay for test_data in self._appended
+        )
+
+    def _create(self, value):
+        # use value only if setter or getter
+        set_value = value if self.fields["setter"] is not None else None
+        get_value = value if self.fields["getter"] is not None else None
+        if set_value is not None and get_value is not None:
+            subtest_title = str(set_value)
+        elif set_value is not None:
+            subtest_title = " set " + str(set_value)
+        elif get_value is not None:
+            subtest_title = " get " + str(get_value)
+        else:
+            subtest_title = "no setter nor getter"
+
+        return TestData(
+            subtest_title=subtest_title,
+            set_value=set_value,
+            get_value=get_value,
+            **self.fields,
+        )
+
+    def _locate(self, subtest, test_data):
+        test_data.after = self.after
+        if self.numbers is not None:
+            test_data.id = self.test_id(subtest)
+            test_data.numbers = (*self.numbers, subtest)
+
+
 def add_doc(value):
     """Add docstring programmatically to a function via a decorator.
 
@@ -204,99 +358,11 @@ def add_doc(value):
     return _doc
 
 
-def skipped_test_factory(test_data, reason):
-    def skipped_test(self):  # noqa: ARG001
-        tr_logger.log(LVL_TEST_SKIPPED, "")
-        tr_logger.log(
-            LVL_TEST_SKIPPED,
-            "Skipping   %s    %s",
-            test_data.id,
-            test_data.desc,
-        )
-        raise unittest.SkipTest(reason)
-
-    return skipped_test
-
-
-class SelectableTestCase(unittest.TestCase):
-    """A unittest.TestCase to be filled with skippable test methods."""
-
-    test_data = {}
-    func_backup = {}
-
-    @classmethod
-    def add_test(cls, test_data, func):
-        """Add a test method, mark the test as selected."""
-        cls.test_data[test_data.id] = test_data
-        cls.func_backup[test_data.id] = func
-        cls.select(test_data.id)
-
-    @classmethod
-    def skip(cls, test_id, reason):
-        """Skip the test method `test_id`."""
-        setattr(cls, test_id, skipped_test_factory(cls.test_data[test_id], reason))
-
-    @classmethod
-    def select(cls, test_id):
-        """Unskip the test method `test_id`."""
-        setattr(cls, test_id, cls.func_backup[test_id])
-
-
-class SelectableTestSuite(unittest.TestSuite):
-    """A unittest.TestSuite with conveniency method to skip and unskip tests."""
-
-    def __init__(self, *args, **kargs) -> None:
-        unittest.TestSuite.__init__(self, *args, **kargs)
-        self._tests_data = {}
-        self._skipped_tests = {}
-        self._selected_tests = {}
-
-    @property
-    def tests_infos(self):
-        """Keep test data available for later."""
-        return self._tests_data
-
-    def add_skipped_test(self, test_case, test_id, reason):
-        """Add a test to and its data to the suite and reference it as skipped."""
-        self._skipped_tests[test_id] = test_case
-        test_case.skip(test_id, reason)
-        self.addTest(test_case(test_id))
-        self._tests_data[test_id] = test_case.test_data[test_id]
-
-    def add_selected_test(self, test_case, test_id):
-        """Add a test to and its data to the suite and reference it as selected."""
-        self._selected_tests[test_id] = test_case
-        test_case.select(test_id)
-        self.addTest(test_case(test_id))
-        self._tests_data[test_id] = test_case.test_data[test_id]
-
-    def select(self, test_id):
-        """Ensure test is selected."""
-        if test_id in self._skipped_tests:
-            test_case = self._skipped_tests.pop(test_id)
-            test_case.select(test_id)
-            self._selected_tests[test_id] = test_case
-
-    def skip(self, test_id, reason):
-        """Ensure test is skipped."""
-        if test_id in self._selected_tests:
-            test_case = self._selected_tests.pop(test_id)
-            test_case.skip(test_id, reason)
-            self._skipped_tests[test_id] = test_case
-
-    def apply_selection(self, selection, reason):
-        """Test and skip tests, based on test ids in selection list."""
-        already_selected = dict(self._selected_tests)
-        already_skipped = dict(self._skipped_tests)
-        for test_id in already_selected:
-            if test_id not in selection:
-                self.skip(test_id, reason)
-        for test_id in selection:
-            if test_id in already_skipped:
-                self.select(test_id)
-
-
-# TODO(gohierf): Move this method to TestData
+def log_skipping(test_data):
+    """Share that a test is skipped."""
+    events.emit(events.SKIP, test_data)
+
+
 def get_margin(data):
     """Get allowed margin between setter and getter values.
 
@@ -339,341 +405,455 @@ def get_key(preferred, backup, key):
     return preferred.get(key, backup.get(key))
 
 
-def test_generator(test_data):
-    """Generates a test function from test's data.
+def range_values(range_data):
+    """Return the values of a `range` block, in test order.
 
-    :param test_data: a TestData instance (usually extracted from a YAML file).
-    :param description: the test's docstring.
+    :param range_data: The `range` block of a test.
 
-    :returns: a test function, to be add to a unittest.TestCase.
+    :returns: a numpy array of the values, each value once.
     """
-    logger.info("Generating test: %s", test_data.desc)
+    start = range_data["start"]
+    stop = range_data["stop"]
+    step = abs(range_data.get("step", 0))
+    lin = abs(range_data.get("lin", 0))
+    geom = abs(range_data.get("geom", 0))
+    include_start = range_data.get("include_start", True)
+    include_stop = range_data.get("include_stop", True)
+    sort = str(range_data.get("sort", True))
+
+    # default to step of 1 in case of nothing defined
+    if step == 0 and lin == 0 and geom == 0:
+        step = 1
+
+    # add more values in between if start is not included
+    if not include_start:
+        lin, geom = (count + 1 if count != 0 else 0 for count in (lin, geom))
+
+    # generate the values from step, lin and geom
+    values = []
+    if step != 0:
+        values.append(np.arange(start, stop, step))
+    if lin != 0:
+        values.append(np.linspace(start, stop, lin, endpoint=include_stop))
+    if geom != 0:
+        values.append(np.geomspace(start, stop, geom, endpoint=include_stop))
+    values = np.concatenate(values)
+
+    # check if stop and start values should be tested or not
+    for bound, included in ((stop, include_stop), (start, include_start)):
+        values = np.append(values, bound) if included else values[values != bound]
+
+    # sort or randomize the values
+    values = np.unique(values)
+    if sort.lower() in ["reverse"]:
+        values = values[::-1]
+    elif sort.lower() in ["false", "random"]:
+        np.random.default_rng().shuffle(values)
+    elif sort.lower() not in ["true"]:
+        logger.error("Unexpected value for `sort` field: %s", sort)
+    return values
+
+
+def check_test_consistency(test_data):
+    """Raise an exception if test is empty or inconsistent."""
+    if test_data.subtest_title == NO_KIND:
+        msg = "Test has no range, values nor commands."
+        raise EmptyTestError(msg)
+
+    if test_data.setter is None and test_data.getter is None:
+        msg = "No setter nor getter set for this test."
+        raise EmptyTestError(msg)
+
+    if test_data.setter is not None and test_data.set_value is None:
+        msg = "[setter error] No value associated to setter."
+        raise InconsistentTestError(msg)
+
+    if test_data.getter is not None and test_data.get_value is None:
+        msg = "[getter error] No value associated to getter."
+        raise InconsistentTestError(msg)
+
+    if test_data.set_value is not None and test_data.setter is None:
+        msg = "[setter error] No setter associated to set value."
+        raise InconsistentTestError(msg)
+
+    if test_data.get_value is not None and test_data.getter is None:
+        msg = "[getter error] No getter associated to get value."
+        raise InconsistentTestError(msg)
+
+
+def on_failure_request(test_data):
+    """Return the run control message matching test on_failure."""
+    if test_data.on_failure == CONTINUE:
+        return CONTINUE_FROM_TEST
+    if test_data.on_failure == PAUSE:
+        return PAUSE_FROM_TEST
+    return ABORT_FROM_TEST
+
+
+def read_getter(test_data, getter, *, use_monitor=False):
+    """Return the getter value, as a string if a string is expected."""
+    start_time = time.time()
+    if test_data.comparator.as_string:
+        value = getter.get(as_string=True, use_monitor=use_monitor)
+    else:
+        value = getter.get(use_monitor=use_monitor)
+    METRICS.record(metrics.GET, test_data.getter, time.time() - start_time)
+    return value
 
-    def _check_test_consistency(test_data):
-        # Check for empty or inconsistent test
-        if test_data.subtest_title == NO_KIND:
-            msg = "Test has no range, values nor commands."
-            raise EmptyTestError(msg)
 
-        if test_data.setter is None and test_data.getter is None:
-            msg = "No setter nor getter set for this test."
-            raise EmptyTestError(msg)
+def check_getter(test_data, getter):
+    """Read getter and assert its value is the one expected by the test."""
+    test_data.comparator.check(read_getter(test_data, getter))
 
-        if test_data.setter is not None and test_data.set_value is None:
-            msg = "[setter error] No value associated to setter."
-            raise InconsistentTestError(msg)
 
-        if test_data.getter is not None and test_data.get_value is None:
-            msg = "[getter error] No value associated to getter."
-            raise InconsistentTestError(msg)
+def wait_for_readback(getter, check, timeout):
+    """Monitor getter until check passes, or until timeout is elapsed.
 
-        if test_data.set_value is not None and test_data.setter is None:
-            msg = "[setter error] No setter associated to set value."
-            raise InconsistentTestError(msg)
+    The check is run once right away and then every time the getter value
+    changes. A last check is done when reaching the timeout, its failure is
+    the one reported.
 
-        if test_data.get_value is not None and test_data.getter is None:
-            msg = "[getter error] No getter associated to get value."
-            raise InconsistentTestError(msg)
+    :param getter:  The getter PV.
+    :param check:   A function asserting the getter value, raising AssertionError.
+    :param timeout: Maximum wait time (a float in seconds).
 
-    @add_doc(test_data.desc)
-    def test(self):
-        """A test case generated from test's data.
+    :returns: the time waited for the getter to settle.
+    """
+    start_time = time.time()
+    deadline = start_time + timeout
+    changed = threading.Event()
+
+    def on_change(**_kws):
+        changed.set()
+
+    cb_index = getter.add_callback(on_change, with_ctrlvars=False)
+    try:
+        while True:
+            changed.clear()
+            try:
+                check(getter)
+            except AssertionError:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise
+                changed.wait(remaining)
+            else:
+                return time.time() - start_time
+    finally:
+        getter.remove_callback(cb_index)
+
+
+def wait_adaptive(test_data, getter, check):
+    """Wait for the delay learned for the subtest PVs, then check the getter.
+
+    The whole delay is waited while still learning. If the check fails before
+    the whole delay is elapsed, the rest of it is waited before checking again.
+    The getter is monitored meanwhile, the time of its last change since the
+    put being its settle time.
+
+    :param getter:  The getter PV.
+    :param check:   A function asserting the getter value, raising AssertionError.
+    """
+    learned_delay = SETTLE_HISTORY.learned_delay(
+        test_data.setter,
+        test_data.getter,
+        test_data.delay,
+    )
+    test_data.learned_delay = learned_delay
+    start_time = time.time()
+    changes = []
+
+    def on_change(**_kws):
+        changes.append(time.time())
+
+    cb_index = getter.add_callback(on_change, with_ctrlvars=False)
+    try:
+        control.sleep(test_data.delay if learned_delay is None else learned_delay)
+        try:
+            check(getter)
+        except AssertionError:
+            remaining = test_data.delay - (time.time() - start_time)
+            if learned_delay is None or remaining <= 0:
+                raise
+            logger.info("Learned delay too short for %s", test_data.id)
+            control.sleep(remaining)
+            check(getter)
+    finally:
+        getter.remove_callback(cb_index)
+    record_settle(test_data, changes[-1] - start_time if changes else 0.0)
 
-        If margin is used, the comparison is not a strict equality, but more
-        or less the given percentage. For instance, if margin is used with a
-        value of 10%, all values between 9V and 11V will be considered as good
-        value.
 
+def check_window(test_data, getter):
+    """Monitor getter for the window of a subtest, then check its samples.
+
+    The first sample is the getter value when the window opens, the others
+    come from its monitor updates.
+    """
+    if test_data.comparator.as_string:
+        msg = "A window needs a numeric getter value"
+        raise InvalidTestError(msg)
+    window = test_data.window
+    samples = window.new_buffer()
+
+    def on_change(value=None, **_kws):
+        samples.add(value)
+
+    cb_index = getter.add_callback(on_change, with_ctrlvars=False)
+    try:
+        samples.add(read_getter(test_data, getter, use_monitor=True))
+        control.sleep(window.duration)
+    finally:
+        getter.remove_callback(cb_index)
+    window.check(test_data.getter, test_data.comparator, samples)
+
+
+def record_settle(test_data, settle_time):
+    """Keep the time the getter of a subtest took to settle, and learn it."""
+    test_data.settle_time = settle_time
+    SETTLE_HISTORY.record(test_data.setter, test_data.getter, settle_time)
+    METRICS.record(metrics.SETTLE, test_data.getter, settle_time)
+
+
+def start_capture(test_data, getter):
+    """Start capturing the getter of a subtest, unless it is not connected."""
+    if not getter.connected:
+        logger.debug("Not capturing %s, not connected", test_data.getter)
+        return None
+    return CAPTURE.start(getter)
+
+
+def stop_capture(test_data, capture):
+    """Keep what was captured of the getter during a subtest execution."""
+    if capture is not None:
+        test_data.capture = capture.stop()
+
+
+def record_retries(test_data, nb_exec, retry_start):
+    """Keep how many retries a subtest needed and the time spent retrying.
+
+    :param nb_exec:     number of executions of the subtest.
+    :param retry_start: when the first failure occurred, None if none did.
+    """
+    test_data.retries = nb_exec - 1
+    test_data.retry_time = 0.0 if retry_start is None else time.time() - retry_start
+
+
+def log_running(test_data):
+    """Share that a test is starting."""
+    events.emit(events.STARTED, test_data)
+
+
+def log_success(test_data, elapsed):
+    """Share that a test succeeded."""
+    events.emit(events.RESULT, test_data, events.SUCCESS, elapsed)
+
+
+def log_retry(test_data, nb_exec, elapsed, error):
+    """Share that a test failed and is going to be executed again."""
+    events.emit(
+        events.RETRY,
+        test_data,
+        min(nb_exec, events.MAX_STATUS),
+        elapsed,
+        error,
+    )
+
+
+def log_failure(test_data, elapsed, error):
+    """Share that a test failed."""
+    events.emit(events.RESULT, test_data, events.FAILURE, elapsed, error)
+
+
+def log_error(test_data, elapsed, error, *, setter_error=False, getter_error=False):
+    """Share that a test could not be executed properly."""
+    message = (
+        f"{'[setter error] ' * setter_error}{'[getter error] ' * getter_error}{error}"
+    )
+    events.emit(events.RESULT, test_data, events.ERROR, elapsed, message)
+
+
+def log_run_control(on_failure):
+    """Apply and share the run control requested by a test."""
+    control.request(on_failure)
+    events.emit(events.CONTROL, status=events.CONTROLS[on_failure])
+
+
+class SubtestExecutions:
+    """The executions of a subtest, retried as its retry policy allows.
+
+    Keeps what the runners record of the executions and shares their outcome.
+    Iterating over an instance starts each execution, until one ends the
+    subtest.
+
+    :param test_data: The TestData of the subtest.
+    """
+
+    def __init__(self, test_data) -> None:
+        self.test_data = test_data
+        self.on_failure = on_failure_request(test_data)
+        self.nb_exec = 0
+        self.first_start = time.time()
+        self.start_time = None
+        # when the first failure occurred, None if none did
+        self.retry_start = None
+        # whether the current execution is setting or getting, for errors
+        self.setter_error = False
+        self.getter_error = False
+        log_running(test_data)
+
+    def __iter__(self):
+        while self.nb_exec <= self.test_data.retry:
+            self.start_time = time.time()
+            self.nb_exec += 1
+            yield self.nb_exec
+
+    def succeeded(self):
+        """Share that the current execution succeeded."""
+        record_retries(self.test_data, self.nb_exec, self.retry_start)
+        log_success(self.test_data, time.time() - self.start_time)
+
+    def retry_wait(self, error):
+        """Share that the current execution failed.
+
+        :param error: The AssertionError it failed with.
+
+        :returns: the time to wait before executing the subtest again,
+                  raises error if it should not be executed again.
         """
-        if test_data.on_failure == CONTINUE:
-            on_failure = CONTINUE_FROM_TEST
-        elif test_data.on_failure == PAUSE:
-            on_failure = PAUSE_FROM_TEST
-        else:
-            on_failure = ABORT_FROM_TEST
-        tr_logger.log(LVL_TEST_RUNNING, "")
-        tr_logger.log(
-            LVL_TEST_RUNNING,
-            "Running    %s    %s",
-            test_data.id,
-            test_data.desc,
+        elapsed = time.time() - self.first_start
+        if not self.test_data.retry_policy.should_retry(self.nb_exec, elapsed):
+            record_retries(self.test_data, self.nb_exec, self.retry_start)
+            log_failure(self.test_data, time.time() - self.start_time, error)
+            log_run_control(self.on_failure)
+            raise error
+
+        log_retry(self.test_data, self.nb_exec, time.time() - self.start_time, error)
+        if self.retry_start is None:
+            self.retry_start = time.time()
+        if self.on_failure != CONTINUE_FROM_TEST:
+            # pause or abort before retrying
+            log_run_control(self.on_failure)
+        return self.test_data.retry_policy.wait_time(self.nb_exec, elapsed)
+
+    def errored(self, error):
+        """Share that the current execution could not be done properly."""
+        record_retries(self.test_data, self.nb_exec, self.retry_start)
+        log_error(
+            self.test_data,
+            time.time() - self.start_time,
+            error,
+            setter_error=self.setter_error,
+            getter_error=self.getter_error,
         )
+        log_run_control(self.on_failure)
 
-        nb_exec = 0
-        setter_error = False
-        getter_error = False
-        while nb_exec <= test_data.retry:
-            start_time = time.time()
-            nb_exec += 1
-            try:
-                _check_test_consistency(test_data)
-
-                # Set PV if required
-
-                setter_error = True
-                if test_data.setter and test_data.set_value is not None:
-                    setter = epics.PV(test_data.setter)
-                    assert (
-                        setter.status is not None
-                    ), f"Unable to connect to setter PV {setter.pvname}"
-
-                    # pyepics expect single characters to be passed as integer
-                    # convert string to int or float where possible
-                    if isinstance(test_data.set_value, list):
-                        set_value = []
-                        for v in test_data.set_value:
-                            if isinstance(v, str):
-                                if len(v) == 1:
-                                    set_value.append(ord(v))
-                                else:
-                                    try:
-                                        set_value.append(int(v))
-                                    except ValueError:
-                                        set_value.append(float(v))
-                            else:
-                                set_value.append(v)
-                    else:
-                        set_value = test_data.set_value
-
-                    setter.put(set_value)
-
-                setter_error = False
-
-                # Delay
-                time.sleep(test_data.delay)
-
-                # Get and test if required
-                getter_error = True
-                if test_data.getter and test_data.get_value is not None:
-                    getter = epics.PV(test_data.getter)
-                    assert getter.status is not None, (
-                        "Unable to connect to getter PV %s" % getter.pvname
-                    )
 
-                    # check a string value
-                    if isinstance(test_data.get_value, str):
-                        expected_value = test_data.get_value
-                        measured_value = getter.get(as_string=True)
-
-                        assert (
-                            expected_value == measured_value
-                        ), f"Expected {getter.pvname} to be {to_string(expected_value)}, but got {to_string(measured_value)}"
-
-                    # check a table of values
-                    elif isinstance(test_data.get_value, list):
-                        # get the measured value to know the length of the table to compare
-                        measured_value = getter.get()
-                        if not isinstance(measured_value, np.ndarray):
-                            if len(test_data.get_value) == 1:
-                                # pyepics get does not return a list in case of
-                                # a single-element waveform
-                                measured_value = np.array([measured_value])
-                            else:
-                                raise ValueError(
-                                    f"Expected {getter.pvname} to be an array but got {to_string(measured_value)}",
-                                )
-
-                        # pyepics expect single characters to be passed as integer
-                        # convert string to int or float where possible
-                        expected_value = []
-                        for v in test_data.get_value:
-                            if isinstance(v, str):
-                                if len(v) == 1:
-                                    expected_value.append(ord(v))
-                                else:
-                                    try:
-                                        expected_value.append(int(v))
-                                    except ValueError:
-                                        expected_value.append(float(v))
-                            else:
-                                expected_value.append(v)
-
-                        # add zero after the expected values
-                        expected_value += [0] * (
-                            len(measured_value) - len(test_data.get_value)
-                        )
-
-                        assert len(expected_value) == len(measured_value), (
-                            f"Expected {getter.pvname} to be "
-                            f"{len(expected_value)} elements long, "
-                            f"and not {len(measured_value)}: "
-                            f"{to_string(measured_value)}"
-                        )
-
-                        # recover margin and delta
-                        margin_delta_str = ""
-                        rtol = None
-                        atol = None
-                        if test_data.margin is not None:
-                            margin_delta_str += " ±%.3G%%" % (test_data.margin * 100)
-                            rtol = test_data.margin
-                        if test_data.margin is not None and test_data.delta is not None:
-                            margin_delta_str += " or"
-                        if test_data.delta is not None:
-                            margin_delta_str += " ±%.3G" % test_data.delta
-                            atol = test_data.delta
-
-                        # compare and allow margin and delta
-                        isclose = np.equal(measured_value, expected_value)
-                        if rtol is not None:
-                            isclose_margin = np.isclose(
-                                measured_value,
-                                expected_value,
-                                rtol=rtol,
-                                atol=0,
-                            )
-                            isclose = np.logical_or(isclose, isclose_margin)
-                        if atol is not None:
-                            isclose_delta = np.isclose(
-                                measured_value,
-                                expected_value,
-                                rtol=0,
-                                atol=atol,
-                            )
-                            isclose = np.logical_or(isclose, isclose_delta)
-
-                        # show "OK" if close otherwise show difference
-                        all_close = np.all(isclose)
-                        if not all_close:  # compute diff only if not OK
-                            diff = np.abs(measured_value - expected_value)
-                            diff[isclose is True] = 0
-                            diff_str = ["OK" if x == 0 else x for x in diff]
-
-                            assert all_close, (
-                                f"Expected {getter.pvname} to be "
-                                f"{to_string(expected_value)}{margin_delta_str},\n"
-                                f"but got {to_string(measured_value)},\n"
-                                f"difference is {to_string(diff_str)}"
-                            )
-
-                    # check a number or boolean without margin or delta
-                    elif not test_data.margin and not test_data.delta:
-                        expected_value = test_data.get_value
-                        measured_value = getter.get()
-                        assert expected_value == measured_value, (
-                            f"Expected {getter.pvname} "
-                            f"to be {to_string(expected_value)}, "
-                            f"but got {to_string(measured_value)}"
-                        )
-
-                    # check a number or boolean with margin or delta
-                    else:
-                        if test_data.margin is not None:
-                            margin = abs(
-                                float(test_data.get_value) * float(test_data.margin),
-                            )
-                        else:
-                            margin = 0
-                        if test_data.delta is not None:
-                            delta = abs(float(test_data.delta))
-                        else:
-                            delta = 0
-
-                        if margin > delta:
-                            max_delta = margin
-                            margin_delta_str = "±%.3G%%" % (test_data.margin * 100)
-                        else:
-                            max_delta = delta
-                            margin_delta_str = "±%.3G" % delta
-
-                        expected_value = (
-                            float("NaN")
-                            if test_data.get_value is None
-                            else float(test_data.get_value)
-                        )
-                        measured_value = (
-                            float("NaN")
-                            if getter.get() is None
-                            else float(getter.get())
-                        )
-
-                        self.assertAlmostEqual(
-                            test_data.get_value,
-                            measured_value,
-                            delta=max_delta,
-                            msg="Expected {} to be {:.3G} {} "
-                            "(ie. within [{:.3G},{:.3G}]), "
-                            "but got {:.3G}".format(
-                                getter.pvname,
-                                expected_value,
-                                margin_delta_str,
-                                expected_value - max_delta,
-                                expected_value + max_delta,
-                                measured_value,
-                            ),
-                        )
-
-                getter_error = False
-                elapsed = time.time() - start_time
-                tr_logger.log(
-                    LVL_TEST_SUCCESS,
-                    "Success of %s    (in %.3fs) ",
-                    test_data.id,
-                    elapsed,
+def execute_once(test_data, execution):
+    """Execute a subtest once: set its setter, wait and check its getter.
+
+    :param execution: The SubtestExecutions of the subtest.
+
+    Raises AssertionError if the getter value is not the one expected.
+    """
+    capture = None
+    try:
+        control.checkpoint()
+        check_test_consistency(test_data)
+
+        # Monitor the getter from before the put, if asked to
+        if CAPTURE.applies(test_data):
+            capture = start_capture(test_data, PV_POOL.get(test_data.getter))
+
+        # Set PV if required
+        execution.setter_error = True
+        if test_data.setter and test_data.set_value is not None:
+            setter = PV_POOL.get(test_data.setter)
+            assert setter.connected, (
+                f"Unable to connect to setter PV {test_data.setter}"
+            )
+            metrics.put(setter, test_data.comparator.set_value)
+
+        execution.setter_error = False
+
+        # Delay, in settle and adaptive modes the getter is monitored instead
+        if test_data.delay_mode == FIXED or test_data.getter is None:
+            control.sleep(test_data.delay)
+        else:
+            control.checkpoint()
+
+        # Get and test if required
+        execution.getter_error = True
+        if test_data.getter and test_data.get_value is not None:
+            getter = PV_POOL.get(test_data.getter)
+            assert getter.connected, (
+                "Unable to connect to getter PV %s" % test_data.getter
+            )
+
+            if test_data.delay_mode == SETTLE:
+                settle_time = wait_for_readback(
+                    getter,
+                    functools.partial(check_getter, test_data),
+                    test_data.delay,
                 )
-                break  # no exception then no need for retry
+                record_settle(test_data, settle_time)
+            elif test_data.delay_mode == ADAPTIVE:
+                wait_adaptive(
+                    test_data,
+                    getter,
+                    functools.partial(check_getter, test_data),
+                )
+            elif test_data.window is None:
+                check_getter(test_data, getter)
 
-            # test fails
-            except AssertionError as e:
-                # loop again if they are retries left
-                if nb_exec <= test_data.retry:
-                    elapsed = time.time() - start_time
-                    tr_logger.log(
-                        LVL_TEST_RUNNING,
-                        "Retry (%d/%s) %s    (in %.3fs) %s",
-                        nb_exec,
-                        test_data.retry,
-                        test_data.id,
-                        elapsed,
-                        e,
-                    )
+            # the window replaces the single read once the getter settled
+            if test_data.window is not None:
+                check_window(test_data, getter)
 
-                    if on_failure != CONTINUE:
-                        tr_logger.log(LVL_RUN_CONTROL, "%s", on_failure)
-                        # give time to pause or abort runner before retrying
-                        time.sleep(0.1)
+        execution.getter_error = False
+    finally:
+        stop_capture(test_data, capture)
 
-                    continue
 
-                # otherwise mark as failed
-                elapsed = time.time() - start_time
-                tr_logger.log(
-                    LVL_TEST_FAILED,
-                    "Failure of %s    (in %.3fs) %s",
-                    test_data.id,
-                    elapsed,
-                    e,
-                )
-                tr_logger.log(LVL_RUN_CONTROL, "%s", on_failure)
-                if on_failure != CONTINUE:
-                    # give time to pause or abort runner before running next test
-                    time.sleep(0.1)
+def test_generator(test_data):
+    """Generates a test function from test's data.
 
+    :param test_data: a TestData instance (usually extracted from a YAML file).
+    :param description: the test's docstring.
+
+    :returns: a test function, called by a PlannedTest.
+    """
+    logger.info("Generating test: %s", test_data.desc)
+
+    @add_doc(test_data.desc)
+    def test(self):  # noqa: ARG001
+        """A test case generated from test's data."""
+        execution = SubtestExecutions(test_data)
+        for _nb_exec in execution:
+            try:
+                execute_once(test_data, execution)
+
+            # run aborted, neither a failure nor an error
+            except RunAbortedError:  # noqa: PERF203 one execution per retry
                 raise
 
+            # test fails, loop again if there are retries left
+            except AssertionError as e:
+                control.sleep(execution.retry_wait(e))
+
             # something is not right with this test (ignore retry)
-            except (EmptyTestError, InconsistentTestError, Exception) as e:
-                elapsed = time.time() - start_time
-                tr_logger.log(
-                    LVL_TEST_ERRORED,
-                    "Error   of %s    (in %.3fs) %s%s%s",
-                    test_data.id,
-                    elapsed,
-                    "[setter error] " * setter_error,
-                    "[getter error] " * getter_error,
-                    e,
-                )
-                tr_logger.log(LVL_RUN_CONTROL, "%s", on_failure)
-                if on_failure != CONTINUE:
-                    # give time to pause or abort runner before running next test
-                    time.sleep(0.1)
+            except Exception as e:
+                execution.errored(e)
                 raise
 
+            else:
+                execution.succeeded()
+                break  # no exception then no need for retry
+
     return test, test_data
 
 
 class TestsGenerator:
-    """TestGenerator generates unittest test cases from a YAML file."""
+    """TestGenerator generates the tests of a scenario from a YAML file."""
 
     def __init__(self, tests_data) -> None:
         """Initialize a TestsGenerator object.
@@ -685,9 +865,33 @@ class TestsGenerator:
         self.data = tests_data
 
         self._create_tests_list()
+        self._resolve_after()
 
         logger.debug("Initialized TestGenerator.")
 
+    def _resolve_after(self):
+        """Set the tests each subtest waits for, from the `after` fields."""
+        if str(self.get_config("type")).lower() != "functional":
+            if any("after" in test for test in self.data["tests"]):
+                logger.warning("`after` is ignored in unit scenarios.")
+            return
+
+        prerequisites = dag.resolve_after(
+            self.data["tests"],
+            [bool(subtests) for subtests in self.tests_list],
+        )
+        if prerequisites is None:
+            return
+        assert len(prerequisites) == len(self.tests_list), (
+            "One set of prerequisites should be resolved per test"
+        )
+        for subtests, after in zip(self.tests_list, prerequisites):
+            if isinstance(subtests, SubtestSweep):
+                subtests.after = after
+                continue
+            for test_data in subtests or []:
+                test_data.after = after
+
     def _create_tests_list(self):
         """Create a list of TestData objects from deserialized file."""
         # TODO(gohierf): use functions that return a subtestlist instead.
@@ -706,10 +910,18 @@ class TestsGenerator:
 
             # get value or fall back to default
             delay = test_raw_data.get("delay", self.get_config("delay"))
+            delay_mode = test_raw_data.get(
+                "delay_mode",
+                self.get_config("delay_mode"),
+            )
             ignore = test_raw_data.get("ignore", self.get_config("ignore"))
             skip = test_raw_data.get("skip", self.get_config("skip"))
             on_failure = test_raw_data.get("on_failure", self.get_config("on_failure"))
             retry = test_raw_data.get("retry", self.get_config("retry"))
+            retry_policy = {
+                **self.get_config().get("retry_policy", {}),
+                **test_raw_data.get("retry_policy", {}),
+            }
 
             # generate subtests
             subtests_list = []
@@ -720,7 +932,7 @@ class TestsGenerator:
                 # hence adding it in the test list as empty
                 subtests_list = None
 
-            elif "range" in test_raw_data:
+            elif "range" in test_raw_data or "values" in test_raw_data:
                 try:
                     setter = test_raw_data["setter"]
                 except KeyError:
@@ -731,137 +943,29 @@ class TestsGenerator:
                     logger.info("No getter in : %s", test_raw_data)
 
                 # Define the values (range) that will be tested
-                start = test_raw_data["range"]["start"]
-                stop = test_raw_data["range"]["stop"]
-                step = abs(test_raw_data["range"].get("step", 0))
-                lin = abs(test_raw_data["range"].get("lin", 0))
-                geom = abs(test_raw_data["range"].get("geom", 0))
-                include_start = test_raw_data["range"].get("include_start", True)
-                include_stop = test_raw_data["range"].get("include_stop", True)
-                sort = str(test_raw_data["range"].get("sort", True))
-
-                # default to step of 1 in case of nothing defined
-                if step == 0 and lin == 0 and geom == 0:
-                    step = 1
-
-                # add more values in between if start is not included
-                if not include_start:
-                    if lin != 0:
-                        lin += 1
-                    if geom != 0:
-                        geom += 1
-
-                # generate the list from step, lin and geom
-                value_list = set()
-                if step != 0:
-                    value_list.update(np.arange(start, stop, step))
-                if lin != 0:
-                    value_list.update(
-                        np.linspace(start, stop, lin, endpoint=include_stop),
-                    )
-                if geom != 0:
-                    value_list.update(
-                        np.geomspace(start, stop, geom, endpoint=include_stop),
-                    )
-
-                # check if stop value should be tested or not
-                if include_stop and stop not in value_list:
-                    value_list.add(stop)
-                if not include_stop and stop in value_list:
-                    value_list.remove(stop)
-
-                # check if start value should be tested or not
-                if include_start and start not in value_list:
-                    value_list.add(start)
-                if not include_start and start in value_list:
-                    value_list.remove(start)
-
-                ordered_values = list(value_list)
-                # sort or randomize the values
-                if sort.lower() in ["true"]:
-                    ordered_values = sorted(value_list)
-                elif sort.lower() in ["reverse"]:
-                    ordered_values = sorted(value_list, reverse=True)
-                elif sort.lower() in ["false", "random"]:
-                    random.shuffle(ordered_values)
+                if "range" in test_raw_data:
+                    values = range_values(test_raw_data["range"])
                 else:
-                    logging.error("Unexpected value for `sort` field: %s", sort)
-
-                for value in ordered_values:
-                    # use value only if setter or getter
-                    set_value = value if setter is not None else None
-                    get_value = value if getter is not None else None
-                    if set_value is not None and get_value is not None:
-                        subtest_title = str(set_value)
-                    elif set_value is not None:
-                        subtest_title = " set " + str(set_value)
-                    elif get_value is not None:
-                        subtest_title = " get " + str(get_value)
-                    else:
-                        subtest_title = "no setter nor getter"
-
-                    logger.debug("adding new range subtest")
-                    test_data = TestData(
-                        on_failure=on_failure,
-                        retry=retry,
-                        test_title=test_raw_data["name"],
-                        subtest_title=subtest_title,
-                        skip=skip,
-                        getter=getter,
-                        setter=setter,
-                        get_value=get_value,
-                        set_value=set_value,
-                        prefix=prefix,
-                        delay=delay,
-                        margin=get_margin(test_raw_data),
-                        delta=get_delta(test_raw_data),
-                        test_message=test_raw_data.get("message", None),
-                    )
+                    values = test_raw_data["values"]
 
-                    subtests_list.append(test_data)
-
-            elif "values" in test_raw_data:
-                try:
-                    setter = test_raw_data["setter"]
-                except KeyError:
-                    logger.info("No setter in : %s", test_raw_data)
-                try:
-                    getter = test_raw_data["getter"]
-                except KeyError:
-                    logger.info("No setter in : %s", test_raw_data)
-
-                for value in test_raw_data["values"]:
-                    # use value only if setter or getter
-                    set_value = value if setter is not None else None
-                    get_value = value if getter is not None else None
-                    if set_value is not None and get_value is not None:
-                        subtest_title = str(set_value)
-                    elif set_value is not None:
-                        subtest_title = " set " + str(set_value)
-                    elif get_value is not None:
-                        subtest_title = " get " + str(get_value)
-                    else:
-                        subtest_title = "no setter nor getter"
-
-                    logger.debug("adding new value subtest")
-                    test_data = TestData(
-                        on_failure=on_failure,
-                        retry=retry,
-                        test_title=test_raw_data["name"],
-                        subtest_title=subtest_title,
-                        skip=skip,
-                        getter=getter,
-                        setter=setter,
-                        get_value=get_value,
-                        set_value=set_value,
-                        prefix=prefix,
-                        delay=delay,
-                        margin=get_margin(test_raw_data),
-                        delta=get_delta(test_raw_data),
-                        test_message=test_raw_data.get("message", None),
-                    )
-
-                    subtests_list.append(test_data)
+                logger.debug("adding %d range or value subtests", len(values))
+                subtests_list = SubtestSweep(
+                    values,
+                    on_failure=on_failure,
+                    retry=retry,
+                    retry_policy=retry_policy,
+                    test_title=test_raw_data["name"],
+                    skip=skip,
+                    getter=getter,
+                    setter=setter,
+                    prefix=prefix,
+                    delay=delay,
+                    delay_mode=delay_mode,
+                    margin=get_margin(test_raw_data),
+                    delta=get_delta(test_raw_data),
+                    test_message=test_raw_data.get("message", None),
+                    window=test_raw_data.get("window"),
+                )
 
             elif "commands" in test_raw_data:
                 for command in test_raw_data["commands"]:
@@ -897,6 +1001,13 @@ class TestsGenerator:
                         "delay",
                         test_raw_data.get("delay", self.get_config("delay")),
                     )
+                    delay_mode = command.get(
+                        "delay_mode",
+                        test_raw_data.get(
+                            "delay_mode",
+                            self.get_config("delay_mode"),
+                        ),
+                    )
                     skip = command.get(
                         "skip",
                         test_raw_data.get("skip", self.get_config("skip")),
@@ -909,11 +1020,16 @@ class TestsGenerator:
                         "retry",
                         test_raw_data.get("retry", self.get_config("retry")),
                     )
+                    command_retry_policy = {
+                        **retry_policy,
+                        **command.get("retry_policy", {}),
+                    }
 
                     logger.debug("adding new command subtest")
                     test_data = TestData(
                         on_failure=on_failure,
                         retry=retry,
+                        retry_policy=command_retry_policy,
                         test_title=test_raw_data["name"],
                         subtest_title=command["name"],
                         skip=skip,
@@ -923,10 +1039,12 @@ class TestsGenerator:
                         set_value=set_value,
                         prefix=prefix,
                         delay=delay,
+                        delay_mode=delay_mode,
                         margin=get_margin(command),
                         delta=get_delta(command),
                         test_message=test_raw_data.get("message", None),
                         subtest_message=command.get("message", None),
+                        window=command.get("window", test_raw_data.get("window")),
                     )
 
                     subtests_list.append(test_data)
@@ -970,6 +1088,7 @@ class TestsGenerator:
                 finally_data = TestData(
                     on_failure=on_failure,
                     retry=test_raw_data.get("retry", self.get_config("retry")),
+                    retry_policy=retry_policy,
                     test_title=test_raw_data["name"],
                     subtest_title="Final statement",
                     skip=skip,
@@ -1020,49 +1139,57 @@ class TestsGenerator:
 
         return self.data["config"][field]
 
-    def append_to_suite(self, tests_suite, scenario_index=0):
-        """Generate `unittest` tests from configuration file.
+    def generate_tests(self, scenario_index=0):
+        """Yield the TestData and test function of each subtest, in run order.
+
+        Range and values tests are yielded as their SubtestSweep, with no test
+        function, their subtests being created when used.
 
-        :param tests_suite:      A TestSuite to add the tests to
         :param scenario_index:   Index of the scenario, usefull when running a
                                 suite with multiple scenarios.
         """
         order = self._randomize_order()
 
-        # add each test with the new id to define the order
-        test_case = SelectableTestCase
-
         for idx in order:
             if self.tests_list[idx] is None:
                 # None when test is ignored
                 continue
-            for test_data in self.tests_list[idx]:
-                test_id = self.get_test_id(
+            if isinstance(self.tests_list[idx], SubtestSweep):
+                self.tests_list[idx].locate(self.get_test_id, scenario_index, idx)
+                logger.debug("Add sweep %s", self.tests_list[idx])
+                yield self.tests_list[idx], None
+                continue
+            for subtest_idx, test_data in enumerate(self.tests_list[idx]):
+                test_data.id = self.get_test_id(
                     scenario=scenario_index,
                     test=idx,
-                    subtest=self.tests_list[idx].index(test_data),
+                    subtest=subtest_idx,
                 )
-                test_data.id = test_id
+                test_data.numbers = (scenario_index, idx, subtest_idx)
 
-                # generate test case
+                # generate test function
                 test_func, test_data = test_generator(test_data)
-                skip = test_data.skip
 
                 logger.debug(
                     'Add test named "%s", with description "%s": %s',
-                    test_id,
+                    test_data.id,
                     test_data.desc,
                     test_func,
                 )
+                yield test_data, test_func
 
-                test_case.add_test(test_data, test_func)
+    def append_to_plan(self, test_plan, scenario_index=0):
+        """Add the tests generated from configuration file to a TestPlan.
 
-                # add test case to test suite
-                if skip:
-                    tests_suite.add_skipped_test(
-                        test_case,
-                        test_id,
-                        "Test skipped from file.",
-                    )
-                else:
-                    tests_suite.add_selected_test(test_case, test_id)
+        Range and values tests are added as a whole, their subtests being
+        created when the plan uses them.
+
+        :param test_plan:        A TestPlan to add the tests to
+        :param scenario_index:   Index of the scenario, usefull when running a
+                                suite with multiple scenarios.
+        """
+        for test_data, test_func in self.generate_tests(scenario_index):
+            if isinstance(test_data, SubtestSweep):
+                test_plan.add_sweep(test_data)
+            else:
+                test_plan.add(test_data, test_func)
@@ -0,0 +1,242 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Put, get and settle latencies of each PV, measured in soak mode.
+
+Latencies are counted in histograms with logarithmic bins, so that recording
+is cheap and memory stays the same however long the soak run. Percentiles are
+then accurate to a bin, about 5%.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+# operation kinds
+PUT = "put"
+GET = "get"
+SETTLE = "settle"
+KINDS = (PUT, GET, SETTLE)
+
+# upper edges of the histogram bins, 50 per decade from 1us to 100s (seconds)
+BIN_EDGES = np.logspace(-6, 2, 401)
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Latencies counted in logarithmic bins."""
+
+    def __init__(self) -> None:
+        # last bin counts latencies above the last edge
+        self.counts = np.zeros(len(BIN_EDGES) + 1, dtype=np.int64)
+        self.max = 0.0
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def add(self, latency):
+        """Count a latency (seconds)."""
+        self.counts[np.searchsorted(BIN_EDGES, latency)] += 1
+        self.max = max(self.max, latency)
+
+    def merge(self, other):
+        """Add the latencies counted by another histogram."""
+        self.counts += other.counts
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """Return the upper edge of the bin of a percentile, None if empty."""
+        count = self.count
+        if count == 0:
+            return None
+        rank = max(1, int(np.ceil(percent / 100 * count)))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        if index >= len(BIN_EDGES):
+            return self.max
+        return min(float(BIN_EDGES[index]), self.max)
+
+
+class LoadMetrics:
+    """Latency histograms by operation kind and PV, recorded when enabled.
+
+    iterations:        number of runs of the tests
+    failed_iterations: number of runs with failed subtests
+    elapsed:           time spent running the tests (seconds)
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.histograms = {}
+        self.iterations = 0
+        self.failed_iterations = 0
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def record(self, kind, pv_name, latency):
+        """Count the latency of an operation on a PV, if enabled."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get((kind, pv_name))
+            if histogram is None:
+                histogram = self.histograms[kind, pv_name] = LatencyHistogram()
+            histogram.add(latency)
+
+    def take(self):
+        """Return the histograms recorded so far, and start afresh."""
+        with self._lock:
+            histograms, self.histograms = self.histograms, {}
+        return histograms
+
+    def merge(self, histograms):
+        """Add histograms, as from take in another process."""
+        with self._lock:
+            for key, other in histograms.items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = LatencyHistogram()
+                histogram.merge(other)
+
+    def reset(self):
+        """Forget everything recorded."""
+        with self._lock:
+            self.histograms = {}
+        self.iterations = 0
+        self.failed_iterations = 0
+        self.elapsed = 0.0
+
+    def snapshot(self):
+        """Return a copy, that is not recording."""
+        copy = LoadMetrics()
+        with self._lock:
+            copy.merge(self.histograms)
+        copy.iterations = self.iterations
+        copy.failed_iterations = self.failed_iterations
+        copy.elapsed = self.elapsed
+        return copy
+
+    def rows(self):
+        """Return (kind, PV, count, ops/s, p50, p95, p99, max) of each histogram.
+
+        Rows are sorted by kind then PV, totals of each kind come first with
+        PV set to None.
+        """
+        rows = []
+        for kind in KINDS:
+            histograms = {
+                pv_name: histogram
+                for (hist_kind, pv_name), histogram in self.histograms.items()
+                if hist_kind == kind
+            }
+            if not histograms:
+                continue
+            total = LatencyHistogram()
+            for histogram in histograms.values():
+                total.merge(histogram)
+            rows.append(self._row(kind, None, total))
+            rows += [
+                self._row(kind, pv_name, histograms[pv_name])
+                for pv_name in sorted(histograms)
+            ]
+        return rows
+
+    def _row(self, kind, pv_name, histogram):
+        count = histogram.count
+        rate = count / self.elapsed if self.elapsed > 0 else 0.0
+        return (
+            kind,
+            pv_name,
+            count,
+            rate,
+            *(histogram.percentile(percent) for percent in PERCENTILES),
+            histogram.max,
+        )
+
+    def as_dict(self):
+        """Return the metrics as plain data, for JSON."""
+        return {
+            "iterations": self.iterations,
+            "failed_iterations": self.failed_iterations,
+            "elapsed": self.elapsed,
+            "operations": [
+                dict(
+                    zip(
+                        ("kind", "pv", "count", "rate", "p50", "p95", "p99", "max"),
+                        row,
+                    ),
+                )
+                for row in self.rows()
+            ],
+        }
+
+    def table(self):
+        """Return the metrics as text, one line per row."""
+        lines = [
+            (
+                f"Ran {self.iterations} iterations in {self.elapsed:.3f}s, "
+                f"{self.failed_iterations} with failures"
+            ),
+            (
+                f"{'':8}{'PV':40}{'count':>8}{'ops/s':>10}"
+                f"{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+            ),
+        ]
+        for kind, pv_name, count, rate, *latencies in self.rows():
+            lines.append(
+                f"{kind:8}{pv_name or '(all)':40}{count:>8}{rate:>10.1f}"
+                + "".join(f"{format_latency(latency):>10}" for latency in latencies),
+            )
+        return "\n".join(lines)
+
+
+def format_latency(latency):
+    """Return a latency in ms as text."""
+    return "-" if latency is None else f"{latency * 1000:.2f}ms"
+
+
+def put(pv, value):
+    """Put value in pv, recording the put completion time if enabled."""
+    if not METRICS.enabled:
+        pv.put(value)
+        return
+
+    start_time = time.time()
+
+    def on_put_done(**_kws):
+        METRICS.record(PUT, pv.pvname, time.time() - start_time)
+
+    pv.put(value, callback=on_put_done)
+
+
+# latencies measured by the tests of a process
+METRICS = LoadMetrics()
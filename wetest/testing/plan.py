@@ -0,0 +1,449 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Generated tests and the results of their runs.
+
+The TestPlan is filled once when generating the tests and only read
+afterwards: runs do not copy it, skipping and selecting tests only changes
+the skip reasons given to a run. Each run records its outcomes in its own
+RunResults.
+
+The subtests of range and values tests are kept as their SubtestSweep, each
+subtest and its test function being only created once used, by a run, the
+GUI or the report.
+"""
+
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from array import array
+from collections.abc import Mapping
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+from wetest.testing import control
+from wetest.testing.control import RunAbortedError
+from wetest.testing.events import ERROR, FAILURE, SKIPPED, SUCCESS
+from wetest.testing.generator import log_skipping, test_generator
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+# outcomes of a subtest, same as in result events
+NOT_RUN = 0
+
+FILE_SKIP_REASON = "Test skipped from file."
+
+
+class PlannedTest:
+    """A subtest of the plan, called with a RunResults to run it.
+
+    id:     subtest id (test-S-T-ST)
+    index:  position in the plan
+    data:   the TestData
+    func:   the test function, from test_generator
+    """
+
+    __slots__ = ("data", "func", "index", "test_id")
+
+    def __init__(self, index, test_data, func) -> None:
+        self.index = index
+        self.test_id = test_data.id
+        self.data = test_data
+        self.func = func
+
+    def id(self):
+        """Return the subtest id, like unittest.TestCase.id."""
+        return self.test_id
+
+    def __repr__(self) -> str:
+        return f"<PlannedTest {self.test_id}>"
+
+    def __call__(self, result):
+        """Run the subtest, or skip it, recording its outcome in result.
+
+        Raise RunAbortedError, without recording any outcome, if the run is aborted.
+        """
+        control.checkpoint()
+        result.startTest(self)
+        try:
+            reason = result.skip_reason(self.test_id)
+            if reason is not None:
+                log_skipping(self.data)
+                result.addSkip(self, reason)
+                return result
+            self.func(None)
+        except RunAbortedError:
+            raise
+        except AssertionError:
+            result.addFailure(self, sys.exc_info())
+        except Exception:  # noqa: BLE001 reported as test error
+            result.addError(self, sys.exc_info())
+        else:
+            result.addSuccess(self)
+        finally:
+            result.stopTest(self)
+        return result
+
+
+class _PlannedSweep:
+    """The subtests of a SubtestSweep in the plan, from index start."""
+
+    __slots__ = ("planned_tests", "start", "sweep")
+
+    def __init__(self, start, sweep) -> None:
+        self.start = start
+        self.sweep = sweep
+        self.planned_tests = {}
+
+    def __len__(self) -> int:
+        return len(self.sweep)
+
+    def planned_test(self, index):
+        """Return the PlannedTest at index in the plan, creating it if needed."""
+        planned_test = self.planned_tests.get(index)
+        if planned_test is None:
+            test_data = self.sweep[index - self.start]
+            planned_test = PlannedTest(index, test_data, test_generator(test_data)[0])
+            self.planned_tests[index] = planned_test
+        return planned_test
+
+
+class TestsInfos(Mapping):
+    """TestData of the subtests of a plan, by subtest id.
+
+    The TestData of a sweep subtest is created when first looked up.
+    """
+
+    def __init__(self, plan) -> None:
+        self._plan = plan
+
+    def __getitem__(self, test_id):
+        return self._plan.test_data(self._plan.index(test_id))
+
+    def __contains__(self, test_id) -> bool:
+        try:
+            self._plan.index(test_id)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return self._plan.test_ids()
+
+    def __len__(self) -> int:
+        return len(self._plan)
+
+
+class TestPlan:
+    """The generated subtests, in execution order.
+
+    Runners iterate over its subtests, and use `tests_infos` and
+    `countTestCases`.
+    """
+
+    def __init__(self) -> None:
+        # PlannedTest, or _PlannedSweep of the subtests of a sweep
+        self._entries = []
+        # plan index of the first subtest of each entry
+        self._starts = array("q")
+        self._length = 0
+        # plan index of the subtests not in a sweep, by id
+        self._index = {}
+        # _PlannedSweep, by scenario and test numbers
+        self._sweeps = {}
+        self._tests_data = TestsInfos(self)
+
+    @property
+    def tests_infos(self):
+        """TestData of the subtests, by subtest id."""
+        return self._tests_data
+
+    def add(self, test_data, func):
+        """Append a subtest, to be called only while generating tests."""
+        planned_test = PlannedTest(self._length, test_data, func)
+        self._index[test_data.id] = planned_test.index
+        self._append(planned_test, 1)
+
+    def add_sweep(self, sweep):
+        """Append the subtests of a located SubtestSweep, as for add."""
+        if not len(sweep):
+            return
+        planned_sweep = _PlannedSweep(self._length, sweep)
+        self._sweeps[sweep.numbers] = planned_sweep
+        self._append(planned_sweep, len(sweep))
+
+    def _append(self, entry, length):
+        self._entries.append(entry)
+        self._starts.append(self._length)
+        self._length += length
+
+    def __iter__(self):
+        for entry in self._entries:
+            if isinstance(entry, PlannedTest):
+                yield entry
+                continue
+            for index in range(entry.start, entry.start + len(entry)):
+                yield entry.planned_test(index)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        entry = self._entry(index)
+        if isinstance(entry, PlannedTest):
+            return entry
+        return entry.planned_test(index)
+
+    def _entry(self, index):
+        if not 0 <= index < self._length:
+            msg = f"plan index out of range: {index}"
+            raise IndexError(msg)
+        return self._entries[bisect.bisect_right(self._starts, index) - 1]
+
+    def countTestCases(self):  # noqa: N802 same as unittest
+        return self._length
+
+    def test_data(self, index):
+        """Return the TestData of the subtest at index, without its test function."""
+        entry = self._entry(index)
+        if isinstance(entry, PlannedTest):
+            return entry.data
+        return entry.sweep[index - entry.start]
+
+    def test_ids(self):
+        """Yield the id of each subtest, in execution order."""
+        for entry in self._entries:
+            if isinstance(entry, PlannedTest):
+                yield entry.test_id
+            else:
+                yield from map(entry.sweep.test_id, range(len(entry)))
+
+    def _skips(self):
+        """Yield the id of each subtest, with whether it is skipped from file."""
+        for entry in self._entries:
+            if isinstance(entry, PlannedTest):
+                yield entry.test_id, entry.data.skip
+                continue
+            for subtest in range(len(entry)):
+                yield entry.sweep.test_id(subtest), entry.sweep.is_skipped(subtest)
+
+    def entries(self):
+        """Yield the plan index of the first subtest of each entry, and the entry.
+
+        Entries are a PlannedTest, or the SubtestSweep of the subtests of a
+        range or values test, whose subtests are not created.
+        """
+        for start, entry in zip(self._starts, self._entries):
+            yield start, entry if isinstance(entry, PlannedTest) else entry.sweep
+
+    def pv_names(self):
+        """Return the names of the setter and getter PVs of the subtests."""
+        pv_names = set()
+        for entry in self._entries:
+            if isinstance(entry, PlannedTest):
+                pv_names.update((entry.data.setter, entry.data.getter))
+            else:
+                pv_names.update(entry.sweep.pv_names())
+        pv_names.discard(None)
+        return pv_names
+
+    def index(self, test_id):
+        """Return the position of a subtest in the plan."""
+        index = self._index.get(test_id)
+        if index is not None:
+            return index
+        try:
+            scenario, test, subtest = (int(n) for n in test_id.split("-")[1:])
+        except ValueError:
+            raise KeyError(test_id) from None
+        planned_sweep = self._sweeps.get((scenario, test))
+        if (
+            planned_sweep is None
+            or not 0 <= subtest < len(planned_sweep)
+            or planned_sweep.sweep.test_id(subtest) != test_id
+        ):
+            raise KeyError(test_id)
+        return planned_sweep.start + subtest
+
+    def skip_reasons(self, selection=None, reason="Skipped from GUI."):
+        """Return the skipped subtests of a run, by subtest id.
+
+        :param selection: ids of the subtests to run, those not in selection
+                          are skipped, even if not skipped from file.
+                          None to only skip the subtests skipped from file.
+        :param reason:    reason for skipping subtests not in selection.
+        """
+        if selection is None:
+            return {
+                test_id: FILE_SKIP_REASON for test_id, skip in self._skips() if skip
+            }
+
+        selection = set(selection)
+        return {
+            test_id: (FILE_SKIP_REASON if skip else reason)
+            for test_id, skip in self._skips()
+            if test_id not in selection
+        }
+
+
+class RunResults:
+    """Outcome of each subtest of a run, in compact form.
+
+    Status and duration of the subtests are kept in arrays following the plan
+    order, only failures, errors and skips keep a message. Failures keep the
+    assertion message rather than the whole traceback.
+
+    Offers what runners and report use from a unittest.TestResult.
+
+    :param plan:         The TestPlan being run.
+    :param skip_reasons: Subtests to skip, by subtest id, see TestPlan.skip_reasons.
+    """
+
+    def __init__(self, plan, skip_reasons=None) -> None:
+        self.plan = plan
+        self.skip_reasons = {} if skip_reasons is None else skip_reasons
+        self.status = bytearray(len(plan))
+        self.durations = array("d", [0.0]) * len(plan)
+        self.messages = {}
+        self.testsRun = 0
+        self.shouldStop = False
+        # set when the run is aborted on purpose, its remaining subtests
+        # not running is then expected
+        self.aborted = False
+        self.start_time = time.time()
+        self.stop_time = None
+        # latencies measured in soak mode, a LoadMetrics
+        self.metrics = None
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def skip_reason(self, test_id):
+        """Return why a subtest is skipped, None if it is not."""
+        return self.skip_reasons.get(test_id)
+
+    # unittest.TestResult like interface, test is a PlannedTest
+
+    def startTest(self, test):  # noqa: N802 same as unittest
+        with self._lock:
+            self.testsRun += 1
+            self._started[test.index] = time.time()
+
+    def stopTest(self, test, duration=None):  # noqa: N802 same as unittest
+        """Record the subtest duration, measured since startTest unless given."""
+        with self._lock:
+            start_time = self._started.pop(test.index, None)
+            if duration is not None:
+                self.durations[test.index] = duration
+            elif start_time is not None:
+                self.durations[test.index] = time.time() - start_time
+
+    def addSuccess(self, test):  # noqa: N802 same as unittest
+        self.record(test.index, SUCCESS)
+
+    def addFailure(self, test, err):  # noqa: N802 same as unittest
+        message = "".join(traceback.format_exception_only(err[0], err[1]))
+        self.record(test.index, FAILURE, message)
+
+    def addError(self, test, err):  # noqa: N802 same as unittest
+        self.record(test.index, ERROR, "".join(traceback.format_exception(*err)))
+
+    def addSkip(self, test, reason):  # noqa: N802 same as unittest
+        self.record(test.index, SKIPPED, reason)
+
+    def stop(self):
+        """Ask runners to stop before next subtest."""
+        self.shouldStop = True
+
+    def wasSuccessful(self):  # noqa: N802 same as unittest
+        lost = not (self.aborted or self.shouldStop) and self.count(NOT_RUN)
+        return not (self.count(FAILURE) or self.count(ERROR) or lost)
+
+    def record(self, index, status, message=None, duration=None):
+        """Record the outcome of the subtest at index in the plan."""
+        with self._lock:
+            self.status[index] = status
+            if message is not None:
+                self.messages[index] = message
+            if duration is not None:
+                self.durations[index] = duration
+
+    def add_tests_run(self, nb_tests):
+        """Count subtests run elsewhere, like in another process."""
+        with self._lock:
+            self.testsRun += nb_tests
+
+    def count(self, status):
+        """Return the number of subtests with status."""
+        return self.status.count(status)
+
+    def _with_status(self, status):
+        return [
+            (self.plan[index], self.messages.get(index, ""))
+            for index, value in enumerate(self.status)
+            if value == status
+        ]
+
+    @property
+    def failures(self):
+        """(PlannedTest, assertion message) of failed subtests, in plan order."""
+        return self._with_status(FAILURE)
+
+    @property
+    def errors(self):
+        """(PlannedTest, traceback) of subtests in error, in plan order."""
+        return self._with_status(ERROR)
+
+    @property
+    def skipped(self):
+        """(PlannedTest, reason) of skipped subtests, in plan order."""
+        return self._with_status(SKIPPED)
+
+    @property
+    def not_run(self):
+        """(PlannedTest, "") of subtests that did not run, in plan order.
+
+        Empty if the run was stopped or aborted on purpose, so that only the
+        subtests lost otherwise, like with a runner process dying, are listed.
+        """
+        if self.aborted or self.shouldStop:
+            return []
+        return self._with_status(NOT_RUN)
+
+    def summary(self):
+        """Return a summary of the run, like the one of unittest."""
+        stop_time = time.time() if self.stop_time is None else self.stop_time
+        details = [
+            f"{name}={self.count(status)}"
+            for name, status in (
+                ("failures", FAILURE),
+                ("errors", ERROR),
+                ("skipped", SKIPPED),
+                ("not_run", NOT_RUN),
+            )
+            if self.count(status)
+        ]
+        outcome = "OK" if self.wasSuccessful() else "FAILED"
+        if details:
+            outcome += " (" + ", ".join(details) + ")"
+        return (
+            f"Ran {self.testsRun} tests in {stop_time - self.start_time:.3f}s\n\n"
+            f"{outcome}"
+        )
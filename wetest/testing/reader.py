@@ -15,7 +15,10 @@
 # check are not validated (aka safe run)
 # TODO(gohierf): margin should only be used with numbers
 
+import collections
+import concurrent.futures
 import contextlib
+import functools
 import importlib.metadata
 import logging
 import os
@@ -27,6 +30,7 @@ from packaging.version import Version as PyPIVersion
 from pkg_resources import resource_filename
 from pykwalify import errors
 from pykwalify.core import Core
+from pykwalify.rule import Rule
 from semver import Version
 
 from wetest.common.constants import (
@@ -35,6 +39,12 @@ from wetest.common.constants import (
     TERSE_FORMATTER,
     WeTestError,
 )
+from wetest.testing.cache import file_digest
+
+try:  # libyaml bindings, much faster on large files
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
 
 # configure logging
 logging.getLogger("pykwalify").setLevel(
@@ -58,6 +68,7 @@ fv_logger.addHandler(FILE_HANDLER)
 
 WETEST_METADATA = importlib.metadata.metadata("WeTest")
 
+
 def _convert2semver(ver: PyPIVersion) -> Version:
     if ver.epoch != 0:
         err = "Can't convert an epoch to semver"
@@ -69,6 +80,7 @@ def _convert2semver(ver: PyPIVersion) -> Version:
     pre = None if not ver.pre else "".join([str(i) for i in ver.pre])
     return Version(*ver.release, prerelease=pre, build=ver.dev)
 
+
 # Maximum file version supported
 VERSION = _convert2semver(PyPIVersion(importlib.metadata.version("WeTest")))
 # ignore pre-releases when comparing versions
@@ -80,6 +92,14 @@ REPOSITORY = WETEST_METADATA["Home-page"]
 ABORT = "abort"
 PAUSE = "pause"
 CONTINUE = "continue"
+FIXED = "fixed"
+SETTLE = "settle"
+ADAPTIVE = "adaptive"
+
+# files from this size (bytes) are read streaming their tests
+STREAMED_FILE_SIZE = 8 * 2**20
+# processes reading included files, from the command line
+DEFAULT_READ_JOBS = os.cpu_count() or 1
 
 
 class FileNotFound(WeTestError):
@@ -112,6 +132,195 @@ class MacroError(WeTestError):
     """Something went wrong when parsing the macros."""
 
 
+# a macro opening, or a character ending or not allowed in a macro name
+MACRO_SYNTAX = re.compile(r"\$[({]|[${}()]")
+# a macro name, as written between the brackets
+MACRO_NAME = re.compile(r"\s*([^\s${}()]+)\s*")
+# strings YAML does not read as a single plain scalar, but as a collection,
+# a quoted string, an alias, with a comment...
+NOT_PLAIN_SCALAR = re.compile(
+    r"""^(?:[-?:](?:\s|$)|[\[\]{}#&*!|>'"%@`,]|---|\.\.\.)|:\s|\s#|[\r\n]""",
+)
+# different substitutions of the same string remembered
+SUBSTITUTION_VARIANTS = 8
+# strings whose tokens, or substitutions, are remembered, the least recent
+# ones are forgotten
+TOKENIZED_STRINGS = 2**16
+SUBSTITUTED_STRINGS = 2**16
+# scenario files whose template is kept, by content
+KEPT_TEMPLATES = 256
+
+_UNDEFINED = object()
+_YAML_RESOLVER = yaml.resolver.Resolver()
+_YAML_CONSTRUCTOR = yaml.constructor.SafeConstructor()
+
+
+class MacroReference:
+    """A macro in a string, like `$(name)` or `${name}`.
+
+    :param opener: The opening bracket.
+    :param name:   The parts of the name, as returned by tokenize_macros.
+    :param closer: The closing bracket.
+    """
+
+    __slots__ = ("closer", "name", "opener")
+
+    def __init__(self, opener, name, closer) -> None:
+        self.opener = opener
+        self.name = name
+        self.closer = closer
+
+
+def _add_text(parts, text):
+    """Append text to parts, joined with the previous text if any."""
+    if not text:
+        return
+    if parts and isinstance(parts[-1], str):
+        parts[-1] += text
+    else:
+        parts.append(text)
+
+
+@functools.lru_cache(maxsize=TOKENIZED_STRINGS)
+def tokenize_macros(text):
+    """Split a string into text and macros, once per string.
+
+    A macro name can not contain any of `${}()` nor space, unless it is a
+    macro itself, like in `$(A$(B))`. An opening bracket without a valid name
+    and closing bracket after it is kept as text.
+
+    :returns: a tuple of strings and MacroReference, whose names are such
+              tuples too.
+    """
+    # opening bracket, start and parts of the macros being read, and the text
+    frames = [(None, 0, [])]
+    position = 0
+    while True:
+        match = MACRO_SYNTAX.search(text, position)
+        end = len(text) if match is None else match.start()
+        _add_text(frames[-1][2], text[position:end])
+        syntax = "" if match is None else match.group()
+
+        if len(frames) == 1 and not syntax:
+            return tuple(frames[0][2])
+        if syntax.startswith("$") and len(syntax) > 1:  # opening bracket
+            frames.append((syntax[1], end, []))
+        elif len(frames) == 1:
+            _add_text(frames[-1][2], syntax)
+        elif syntax and syntax in ")}":
+            opener, _, name = frames.pop()
+            frames[-1][2].append(MacroReference(opener, tuple(name), syntax))
+        else:
+            # not a macro, its opening is text and what follows is read again
+            _, start, _ = frames.pop()
+            _add_text(frames[-1][2], text[start : start + 2])
+            position = start + 2
+            continue
+        position = end + len(syntax)
+
+
+def typed_value(text):
+    """Return text as YAML reads it: boolean, number, list, dict...
+
+    Single plain scalars, the most common, are typed with the YAML resolver
+    directly, without parsing text as a document. Strings are kept as they
+    are, line breaks included, unless they are numbers YAML does not read,
+    like in exponential notation.
+    """
+    output = text
+    # if a string ends with a colon it would be a dict, we want to keep a string
+    if not text.endswith(":"):
+        scalar = text.strip()
+        construct = None
+        if NOT_PLAIN_SCALAR.search(scalar) is None:
+            tag = _YAML_RESOLVER.resolve(yaml.ScalarNode, scalar, (True, False))
+            construct = _YAML_CONSTRUCTOR.yaml_constructors.get(tag)
+        if construct is not None:
+            output = construct(_YAML_CONSTRUCTOR, yaml.ScalarNode(tag, scalar))
+        else:
+            try:
+                output = yaml.load(text, Loader=SafeLoader)
+            except (ValueError, yaml.YAMLError) as e:
+                # we get a ScannerError when substituting with a macro that
+                # ends by a colon, in a multiline string:
+                # "mapping values are not allowed here"
+                logger.debug(e)
+                logger.debug("in: %s\n", text)
+
+    # however we can not rely on yaml to parse an int or a float
+    # especially for exponential notation or infinity or NAN
+    # they might endup being read as string
+    if isinstance(output, str):
+        # go back to raw text, in order to maintain linebreaks
+        output = text
+
+        # is it a float ?
+        with contextlib.suppress(ValueError):
+            output = float(text)
+
+        # or even better is it an integer ?
+        with contextlib.suppress(ValueError):
+            output = int(text)
+
+    return output
+
+
+class _MacroLookups:
+    """Macros looked up while substituting a string."""
+
+    def __init__(self) -> None:
+        # (name, value) of each macro looked up, _UNDEFINED if unknown
+        self.values = []
+        self.used = []
+        self.unknown = []
+        self.errors = []
+
+
+class _Substitution:
+    """A string substituted, to do again while the same macros have the same values."""
+
+    def __init__(self, lookups, output) -> None:
+        self.lookups = lookups
+        self.output = output
+
+    def applies(self, known_macros):
+        """Tell whether the macros looked up still have the same values."""
+        for name, value in self.lookups.values:
+            known = known_macros.get(name, _UNDEFINED)
+            if known is not value and (
+                type(known) is not type(value) or known != value
+            ):
+                return False
+        return True
+
+
+# substitutions of each string, the most recent last, and the strings in
+# order of use, the least recent first
+_SUBSTITUTIONS = collections.OrderedDict()
+
+
+def _find_substitution(text, known_macros):
+    """Return a substitution of text done with known_macros, None if none."""
+    variants = _SUBSTITUTIONS.get(text)
+    if variants is None:
+        return None
+    _SUBSTITUTIONS.move_to_end(text)
+    for substitution in reversed(variants):
+        if substitution.applies(known_macros):
+            return substitution
+    return None
+
+
+def _keep_substitution(text, substitution):
+    """Remember a substitution of text, forgetting the oldest ones."""
+    variants = _SUBSTITUTIONS.setdefault(text, [])
+    variants.append(substitution)
+    del variants[:-SUBSTITUTION_VARIANTS]
+    _SUBSTITUTIONS.move_to_end(text)
+    if len(_SUBSTITUTIONS) > SUBSTITUTED_STRINGS:
+        _SUBSTITUTIONS.popitem(last=False)
+
+
 class MacrosManager:
     """A class to keep track of known, used and unknown variable.
 
@@ -193,121 +402,590 @@ class MacrosManager:
         returns an appropriately typed value (not necessarily a string)
         if macros have been substituted in it
         """
+        return self._substitute(a_value, trace_unknown, chain=())
+
+    def _substitute(self, a_value, trace_unknown, chain):
+        """Substitute macros in a_value, within the values of the macros in chain."""
         # recurse for lists and dictionaries
         if isinstance(a_value, list):
-            return [self.substitute_macros(x, trace_unknown) for x in a_value]
+            return [self._substitute(x, trace_unknown, chain) for x in a_value]
         if isinstance(a_value, dict):
-            output = {}
-            for k, v in list(a_value.items()):
-                output[k] = self.substitute_macros(v, trace_unknown=trace_unknown)
-            return output
+            return {
+                k: self._substitute(v, trace_unknown, chain)
+                for k, v in list(a_value.items())
+            }
 
-        # return same value if not a string
+        # return same value if not a string, or without any macro
         if not isinstance(a_value, str):
             return a_value
+        parts = tokenize_macros(a_value)
+        if not any(isinstance(part, MacroReference) for part in parts):
+            return a_value
 
-        # old regex was r"(\${.*?}|\$\(.*?\))" it was non greedy but incompatible with imbricated macros
-        # new is non geedy because forbiding '${}()' characters in the macro name
-        # and works with imbricated macros
-        self._trace_unknown = trace_unknown
-        new_str, nb_sub = re.subn(
-            r"\$[({]{1}[^${}()]*[)}]{1}",
-            self.corresponding_macro,
-            a_value,
-        )
-        self._trace_unknown = True
+        substitution = None
+        if not chain:
+            substitution = _find_substitution(a_value, self.known_macros)
+        if substitution is None:
+            lookups = _MacroLookups()
+            output = self._substitute_parts(parts, trace_unknown, chain, lookups)
+            logger.debug("substitute `%s` with %r", a_value, output)
+            substitution = _Substitution(lookups, output)
+            if not chain and not isinstance(output, (list, dict)):
+                _keep_substitution(a_value, substitution)
+
+        self._record(substitution.lookups, trace_unknown)
+        return substitution.output
+
+    def _substitute_parts(self, parts, trace_unknown, chain, lookups):
+        """Return the value of a tokenized string, macros substituted."""
+        if len(parts) > 1:
+            return typed_value(self._expand(parts, chain, lookups))
+
+        # the whole string is a macro, its value is kept as it is typed
+        body, name, value = self._resolve(parts[0], chain, lookups)
+        if value is _UNDEFINED:
+            return typed_value(f"${parts[0].opener}{body}{parts[0].closer}")
+        if isinstance(value, str):
+            text = self._expand(tokenize_macros(value), (*chain, name), lookups)
+            return typed_value(text)
+        if isinstance(value, (list, dict)):
+            return self._substitute(value, trace_unknown, (*chain, name))
+        return value
+
+    def _expand(self, parts, chain, lookups):
+        """Return the text of tokenized parts, macros substituted."""
+        text = []
+        for part in parts:
+            if isinstance(part, str):
+                text.append(part)
+                continue
+            body, name, value = self._resolve(part, chain, lookups)
+            if value is _UNDEFINED:
+                text.append(f"${part.opener}{body}{part.closer}")
+            else:
+                text.append(
+                    self._expand(tokenize_macros(str(value)), (*chain, name), lookups),
+                )
+        return "".join(text)
 
-        # try to type the returned value (boolean, int, float, dict, list... instead of a string)
-        # but only if we did a substitution, otherwise give it back as it is
-        if nb_sub == 0:
-            return a_value
+    def _resolve(self, reference, chain, lookups):
+        """Look up the macro of a reference.
 
-        logger.debug("substitute found: `%s`", new_str)
-        # fallback value
-        output = new_str
+        :param chain: The names of the macros whose values are being
+                      substituted, a macro of chain is not substituted again.
+        :returns: the text between the brackets, nested macros substituted, the
+                  macro name and its value, _UNDEFINED if it is not substituted.
+        """
+        body = self._expand(reference.name, chain, lookups)
+        name_match = MACRO_NAME.fullmatch(body)
+        if name_match is None:  # Cannot workout the macro name
+            return body, None, _UNDEFINED
+
+        name = name_match.group(1)
+        value = self.known_macros.get(name, _UNDEFINED)
+        lookups.values.append((name, value))
+        if value is _UNDEFINED:  # the macro is not defined
+            lookups.unknown.append(name)
+        elif name in chain:
+            lookups.errors.append(
+                "- Recusivity issue with macros:\n%s" % " -> ".join((*chain, name)),
+            )
+            return body, name, _UNDEFINED
+        else:
+            lookups.used.append(name)
+        return body, name, value
 
-        # we can use yaml load to convert a string into a list, a dict, or a boolean
-        # however if a string ends with a colon it will be considered as a
-        # dict by yaml load, but we want to keep it a string
-        if not new_str.endswith(":"):
-            try:
-                output = yaml.safe_load(new_str)
-            except (ValueError, yaml.scanner.ScannerError) as e:
-                # we get a ScannerError when substituting with a macro that
-                # ends by a colon, in a multiline string:
-                # "mapping values are not allowed here"
-                logger.debug(e)
-                logger.debug("in: %s\n", new_str)
+    def _record(self, lookups, trace_unknown):
+        """Update used_macros, unknown_macros and read_errors after a substitution."""
+        self.used_macros.update(lookups.used)
+        if trace_unknown:
+            for name in lookups.unknown:
+                self.unknown_macros[name] = self.unknown_macros.get(name, 0) + 1
+        self.read_errors.extend(lookups.errors)
+
+    def raise_errors(self):
+        """Raise a MacroError exception if self.read_errors is not empty."""
+        if self.read_errors:
+            logger.critical("Issue when dealing with macros:")
+            for error_txt in self.read_errors:
+                logger.critical(error_txt)
+            raise MacroError
 
-        # however we can not rely on yaml load to parse an int or a float
-        # especially for exponential notation or infinity or NAN
-        # they might endup being read as string
-        if isinstance(output, str):
-            # go back to raw new_str if yaml.safe_load returned a string,
-            # in order to maintain linebreaks
-            output = new_str
 
-            # is it a float ?
-            with contextlib.suppress(ValueError):
-                output = float(new_str)
+# schema keywords checking the content of strings other than with enum
+STRING_RULES = ("pattern", "length", "unique", "func", "assert")
+# stands for the strings the schema does not tell apart in signatures
+ANY_STRING = ("str",)
 
-            # or even better is it an integer ?
-            with contextlib.suppress(ValueError):
-                output = int(new_str)
 
-        logger.debug("cast into %s (%s)", output, type(output))
+class _CompiledCore(Core):
+    """A pykwalify Core validating against a schema compiled beforehand."""
 
-        # call substitute macro again on the result if it changed
-        # in order to substitute imbricated macros
-        if isinstance(output, str) and output != a_value:
-            try:
-                return self.substitute_macros(new_str, trace_unknown=trace_unknown)
-            except RuntimeError:
-                self.read_errors.append(
-                    "- Recusivity issue with macros:\n%s" % output,
-                )
+    def __init__(self, source_data, compiled) -> None:
+        super().__init__(source_data=source_data, schema_data=compiled.schema)
+        self.compiled = compiled
+        self.root_rule = compiled.root_rule
 
-        return output
+    def _start_validate(self, value=None):
+        # same as Core, without building the rules again,
+        # the scenario schema has no partial schema (`schema;` keys)
+        self.errors = []
+        signature = self.compiled.signature(value)
+        if signature in self.compiled.valid_signatures:
+            return
+        self._validate(value, self.root_rule, "", [])
+        if not self.errors:
+            self.compiled.valid_signatures.add(signature)
+
+
+class CompiledSchema:
+    """A pykwalify schema, read and turned into rules once.
+
+    Data known to be valid are remembered by signature, so that the instances
+    of a template that only differ by their strings, like the PV names of
+    several devices, are checked once.
+
+    :param schema_path: The YAML schema file.
+    """
+
+    def __init__(self, schema_path) -> None:
+        with open(schema_path) as schema_file:
+            self.schema = yaml.load(schema_file, Loader=SafeLoader)
+        self.root_rule = Rule(schema=self.schema)
+
+        self.valid_signatures = set()
+        # strings that the schema may tell apart, None if any may be
+        self.enum_strings = set()
+        self._collect_strings(self.schema)
+
+    def _collect_strings(self, schema):
+        """Add the strings of the enums of a schema to enum_strings."""
+        if self.enum_strings is None:
+            return
+        if isinstance(schema, dict):
+            if any(keyword in schema for keyword in STRING_RULES) or (
+                "range" in schema and schema.get("type") in ("str", "text")
+            ):
+                self.enum_strings = None
+                return
+            self.enum_strings.update(
+                value for value in schema.get("enum", []) if isinstance(value, str)
+            )
+            for value in schema.values():
+                self._collect_strings(value)
+        elif isinstance(schema, list):
+            for value in schema:
+                self._collect_strings(value)
 
-    def corresponding_macro(self, match):
-        """Return the string to substitute for regex match.
+    def signature(self, data):
+        """Return what the validation of data depends on, as a hashable value.
 
-        :param match: substring match
-        :returns: replacement string
+        Keys, types and numbers are kept, strings only when an enum has them.
         """
-        # extract the match
-        match = match.group(0)
+        if isinstance(data, dict):
+            return tuple((key, self.signature(value)) for key, value in data.items())
+        if isinstance(data, list):
+            return ("seq", *(self.signature(value) for value in data))
+        if (
+            isinstance(data, str)
+            and self.enum_strings is not None
+            and data not in self.enum_strings
+        ):
+            return ANY_STRING
+        return (type(data).__name__, data)
+
+    def core(self, data):
+        """Return a pykwalify Core checking data, without any file."""
+        return _CompiledCore(data, self)
+
+
+@functools.lru_cache(maxsize=KEPT_TEMPLATES)
+def read_template(file_path, digest):  # noqa: ARG001 part of the cache key
+    """Return the content of a scenario file, macros not substituted.
+
+    A file is parsed once per content, each file including it substitutes
+    its own macros in the same template. Templates are shared, substituting
+    macros makes a copy to be modified instead.
+
+    :param digest: The SHA-256 of the file content, it is parsed again if it
+                   changed.
+    """
+    logger.debug("Parsing %s", file_path)
+    with open(file_path) as yaml_file:
+        return yaml.load(yaml_file, Loader=SafeLoader)
+
+
+def _event_node(loader, event):
+    """Return the node starting with a scalar or collection start event."""
+    node_class = {
+        yaml.ScalarEvent: yaml.ScalarNode,
+        yaml.SequenceStartEvent: yaml.SequenceNode,
+        yaml.MappingStartEvent: yaml.MappingNode,
+    }[type(event)]
+    tag = event.tag
+    if node_class is yaml.ScalarNode:
+        if tag is None or tag == "!":
+            tag = loader.resolve(node_class, event.value, event.implicit)
+        return node_class(
+            tag,
+            event.value,
+            event.start_mark,
+            event.end_mark,
+            style=event.style,
+        )
+    if tag is None or tag == "!":
+        tag = loader.resolve(node_class, None, event.implicit)
+    return node_class(tag, [], event.start_mark, None, flow_style=event.flow_style)
 
-        repl = match  # default return
 
-        macro_match = re.match(r"\$[({]\s*(?P<macro_name>\S+)\s*[)}]", match)
+def _compose_node(loader, anchors):
+    """Compose the next node from the events of a loader, like its composer.
 
-        if not macro_match:  # Cannot workout the macro name
-            logger.debug("invalid macro syntax: %s", match)
+    :param anchors: The nodes of the anchors met so far in the document.
+    """
+    # collections being composed, with the key waiting for its value if any
+    stack = []
+    while True:
+        event = loader.get_event()
+        if isinstance(event, yaml.AliasEvent):
+            if event.anchor not in anchors:
+                msg = f"found undefined alias {event.anchor}"
+                raise yaml.composer.ComposerError(None, None, msg, event.start_mark)
+            node = anchors[event.anchor]
+        elif isinstance(event, yaml.CollectionEndEvent):
+            node = stack.pop()[0]
+            node.end_mark = event.end_mark
+        else:
+            node = _event_node(loader, event)
+            if event.anchor is not None:
+                anchors[event.anchor] = node
+            if isinstance(event, yaml.CollectionStartEvent):
+                stack.append([node, None])
+                continue
 
-        else:  # the macro is valid
-            macro_name = macro_match.group("macro_name")
+        if not stack:
+            return node
+        parent = stack[-1]
+        if isinstance(parent[0], yaml.SequenceNode):
+            parent[0].value.append(node)
+        elif parent[1] is None:
+            parent[1] = node
+        else:
+            parent[0].value.append((parent[1], node))
+            parent[1] = None
 
-            if macro_name not in self.known_macros:  # the macro is not defined
-                logger.debug("unknown macro: %s", match)
-                if self._trace_unknown:
-                    if macro_name in self.unknown_macros:
-                        self.unknown_macros[macro_name] += 1
-                    else:
-                        self.unknown_macros[macro_name] = 1
 
-            else:  # the macro is defined
-                repl = self.known_macros[macro_name]
-                self.used_macros.add(macro_name)
-        return str(repl)
+def iter_scenario(file_path):
+    """Read a scenario file block by block, its tests one by one.
 
-    def raise_errors(self):
-        """Raise a MacroError exception if self.read_errors is not empty."""
-        if self.read_errors:
-            logger.critical("Issue when dealing with macros:")
-            for error_txt in self.read_errors:
-                logger.critical(error_txt)
-            raise MacroError
+    :yields: (name, content) for each top-level block, in the file order, the
+             content of `tests` being an iterator over the tests. It is read
+             from the file as it is iterated, before the next block.
+    """
+    with open(file_path) as yaml_file:
+        loader = SafeLoader(yaml_file)
+        try:
+            anchors = {}
+
+            def next_value():
+                return loader.construct_document(_compose_node(loader, anchors))
+
+            def tests():
+                while not loader.check_event(yaml.SequenceEndEvent):
+                    yield next_value()
+                loader.get_event()
+
+            loader.get_event()  # stream start
+            if loader.check_event(yaml.StreamEndEvent):
+                return
+            loader.get_event()  # document start
+            if not loader.check_event(yaml.MappingStartEvent):
+                msg = f"{file_path} is not a mapping of blocks."
+                raise InvalidFileContentError(msg)
+            loader.get_event()
+            while not loader.check_event(yaml.MappingEndEvent):
+                block = next_value()
+                if block == "tests" and loader.check_event(yaml.SequenceStartEvent):
+                    loader.get_event()
+                    block_tests = tests()
+                    yield block, block_tests
+                    # tests not iterated are skipped
+                    for _ in block_tests:
+                        pass
+                else:
+                    yield block, next_value()
+        finally:
+            loader.dispose()
+
+
+@functools.cache
+def compiled_schema():
+    """Return the scenario schema, compiled on first use."""
+    return CompiledSchema(
+        resource_filename("wetest", "resources/scenario_schema.yaml"),
+    )
+
+
+def full_path(file_path, including_file):
+    """Return the absolute path of a file included, see get_full_path.
+
+    :param file_path: absolute or relative file path.
+    :param including_file: absolute path of the file including it.
+    """
+    if os.path.isfile(
+        os.path.abspath(file_path),
+    ):  # absolute or relative to current location
+        return os.path.abspath(file_path)
+
+    current_file_location = os.path.dirname(including_file)
+    abs_path = os.path.abspath(os.path.join(current_file_location, file_path))
+
+    if os.path.isfile(abs_path):
+        return abs_path
+
+    raise FileNotFound(
+        "Could not find either of these files:"
+        "\n- " + os.path.abspath(file_path) + "\n- " + abs_path,
+    )
+
+
+def read_include(scenario_path, macros_mgr, suite_macros, stream):
+    """Read an included file.
+
+    :returns: its scenarios, the files read with their SHA-256, the includes
+              resolved and the macros it used.
+    """
+    new_sc = ScenarioReader(
+        scenario_path,
+        macros_mgr=macros_mgr,
+        suite_macros=suite_macros,
+        stream=stream,
+    )
+    return (
+        new_sc.deserialized_scenarios,
+        new_sc.files,
+        new_sc.includes,
+        new_sc.macros_mgr.used_macros,
+    )
+
+
+class _RecordsHandler(logging.Handler):
+    """Keep log records, to be handled in another process."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # kept once, not again by the loggers it is propagated to
+        if getattr(record, "kept_for_parent", False):
+            return
+        record.kept_for_parent = True
+        # arguments and exceptions may not be sent to another process
+        record.msg = self.format(record)
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+@contextlib.contextmanager
+def _kept_records(records):
+    """Keep the records logged by WeTest meanwhile in records, not handling them.
+
+    :param records: A list where to append the records.
+    """
+    handler = _RecordsHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler.records = records
+    wetest_loggers = [
+        logging.getLogger(name)
+        for name in list(logging.root.manager.loggerDict)
+        if name.startswith(("wetest", "_wetest"))
+    ]
+    handlers = {}
+    for wetest_logger in wetest_loggers:
+        handlers[wetest_logger] = wetest_logger.handlers
+        wetest_logger.handlers = [handler]
+    try:
+        yield records
+    finally:
+        for wetest_logger, logger_handlers in handlers.items():
+            wetest_logger.handlers = logger_handlers
+
+
+def _handle_records(records):
+    """Handle records kept by _kept_records, possibly in another process."""
+    for record in records:
+        logging.getLogger(record.name).handle(record)
+
+
+def _read_include_logged(include):
+    """Read an included file in a worker process, keeping its logs.
+
+    :returns: what read_include returns, None if the file could not be read,
+              and the log records of WeTest while reading.
+    """
+    with _kept_records([]) as records:
+        try:
+            read = read_include(*include)
+        except (Exception, SystemExit):  # noqa: BLE001 read again by the including file
+            read = None
+    return read, records
+
+
+def _read_includes_logged(includes):
+    """Read includes of the same file one after the other, see _read_include_logged.
+
+    The file is then parsed once by the worker process (see read_template).
+    """
+    return [_read_include_logged(include) for include in includes]
+
+
+class IncludesPool:
+    """Read the files included by one or several scenario files together.
+
+    Scenario files register the files they include, which are then all read
+    at once, by jobs processes if there are several. The includes of a same
+    file are read by a single process, for the file to be parsed once. Each
+    scenario file is then given its included files, in registration order,
+    as if read one by one, logs included. A file failing in a worker process
+    is read again in this one, for its error to be logged and raised just
+    like when reading it here.
+
+    :param jobs: number of processes reading the files, the files they
+                 include being read by the same process.
+    """
+
+    def __init__(self, jobs=1) -> None:
+        self.jobs = jobs
+        # scenario files with their includes, and log records to handle first
+        self._steps = []
+
+    def add(self, reader, includes):
+        """Register the includes of a ScenarioReader, to be given once read.
+
+        :param includes: ScenarioReader arguments of each file, None for
+                         local tests.
+        """
+        self._steps.append((reader, includes))
+
+    def add_records(self, records):
+        """Register log records, handled once the readers before them end."""
+        self._steps.append((None, records))
+
+    def read(self):
+        """Read the included files, and end each reader with its own."""
+        steps, self._steps = self._steps, []
+        groups = {}
+        for reader, includes in steps:
+            for include in includes if reader is not None else ():
+                if include is not None:
+                    groups.setdefault(include[0], []).append(include)
+
+        if self.jobs <= 1 or len(groups) <= 1:
+            for reader, includes in steps:
+                if reader is None:
+                    _handle_records(includes)
+                    continue
+                reader.add_includes(
+                    None if include is None else read_include(*include)
+                    for include in includes
+                )
+            return
+
+        workers = min(self.jobs, len(groups))
+        logger.debug("Reading %d files on %d processes", len(groups), workers)
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            # files included the most first, for processes to end together
+            futures = {
+                path: pool.submit(_read_includes_logged, group)
+                for path, group in sorted(
+                    groups.items(),
+                    key=lambda group: len(group[1]),
+                    reverse=True,
+                )
+            }
+            reads = {}
+            for reader, includes in steps:
+                if reader is None:
+                    _handle_records(includes)
+                    continue
+                reader.add_includes(self._reads(includes, futures, reads))
+
+    @staticmethod
+    def _reads(includes, futures, reads):
+        """Yield the files included by a reader, once read by the pool.
+
+        :param futures: The future reads of the includes, by file.
+        :param reads: The reads of the includes by file, as taken so far.
+        """
+        for include in includes:
+            if include is None:
+                yield None
+                continue
+            if include[0] not in reads:
+                reads[include[0]] = iter(futures[include[0]].result())
+            read, records = next(reads[include[0]])
+            if read is None:
+                yield read_include(*include)
+                continue
+            _handle_records(records)
+            yield read
+
+
+def read_scenarios(
+    scenario_files,
+    *,
+    macros_mgr=None,
+    propagate=False,
+    cache=None,
+    jobs=1,
+):
+    """Read scenario files given together, like from the command line.
+
+    The files share macros_mgr, each file adding its own macros for the next
+    ones. All the files they include are read at once on jobs processes,
+    logs and errors being the same as when reading the files one by one.
+
+    :returns: a ScenarioReader of each file.
+    """
+    if jobs <= 1:
+        return [
+            ScenarioReader(
+                scenario_file,
+                macros_mgr=macros_mgr,
+                propagate=propagate,
+                cache=cache,
+            )
+            for scenario_file in scenario_files
+        ]
+
+    pool = IncludesPool(jobs)
+    readers = []
+    error = None
+    for scenario_file in scenario_files:
+        # logged once the files before are read
+        records = []
+        pool.add_records(records)
+        with _kept_records(records):
+            try:
+                readers.append(
+                    ScenarioReader(
+                        scenario_file,
+                        macros_mgr=macros_mgr,
+                        propagate=propagate,
+                        cache=cache,
+                        pool=pool,
+                    ),
+                )
+            except (Exception, SystemExit) as e:  # noqa: BLE001 raised once logged
+                error = e
+        if error is not None:
+            break
+    pool.read()
+    if error is not None:
+        raise error
+    return readers
 
 
 class ScenarioReader:
@@ -319,6 +997,14 @@ class ScenarioReader:
                         not necessarily for this scenario, should not be checked
                         when looking for unused macros
     :param propagate: a boolean, whether or not to share all macros with included files
+    :param cache: a ParseCache where to look for the file already read and
+                  validated, and to keep it once read and validated
+    :param stream: whether to read the tests of the file one by one, None to
+                   do so for files of STREAMED_FILE_SIZE or more
+    :param jobs: number of processes reading the files included, their own
+                 included files being read by the same process
+    :param pool: an IncludesPool where to register the files included, the
+                 file being read once the pool read them, instead of jobs
     """
 
     def __init__(
@@ -327,21 +1013,96 @@ class ScenarioReader:
         macros_mgr=None,
         suite_macros=None,
         propagate=False,
+        cache=None,
+        stream=None,
+        jobs=1,
+        *,
+        pool=None,
     ) -> None:
         """Initialize Reader."""
         self.file_path = os.path.abspath(yaml_file)
-        try:
-            self.file = open(self.file_path)
-        except OSError as exc:
-            raise FileNotFound from exc
+
+        # files read, included ones too, with the SHA-256 of their content
+        self.files = {self.file_path: file_digest(self.file_path)}
+        if self.files[self.file_path] is None:
+            raise FileNotFound(self.file_path)
+        # full path of each include, by including file and include path
+        self.includes = {}
 
         self.macros_mgr = macros_mgr if macros_mgr is not None else MacrosManager()
         self.suite_macros = suite_macros if suite_macros is not None else []
         self.propagate = propagate
+        self.stream = stream
+
+        self._cache = cache
+        self._cache_key = None
+        if cache is not None and cache.directory is not None:
+            self._cache_key = cache.key(
+                self.file_path,
+                self.files[self.file_path],
+                self.macros_mgr.known_macros,
+                propagate,
+            )
+            entry = cache.load(self._cache_key, self.file_path)
+            if entry is not None and self._includes_unchanged(entry):
+                self._restore(entry)
+                return
 
         self.deserialized_scenarios = []
-        self.deserialized = self._deserialize()
+        includes = self._deserialize()
+        if pool is None:
+            pool = IncludesPool(jobs)
+            pool.add(self, includes)
+            pool.read()
+        else:
+            pool.add(self, includes)
+
+    def add_includes(self, reads):
+        """Add the files included once read, then validate the file.
+
+        :param reads: the scenarios, files, includes and used macros of each
+                      file included, in declaration order, None for local
+                      tests (see read_include).
+        """
+        for include in reads:
+            if include is None:
+                self.deserialized_scenarios.append(self._local_tests)
+                continue
+            scenarios, files, includes, used_macros = include
+            self.deserialized_scenarios += scenarios
+            self.files.update(files)
+            self.includes.update(includes)
+
+            # mark macro used in scenario as used for wetest_file
+            self.macros_mgr.mark_as_used(used_macros)
+
+        logger.debug("Read scenario file(s).")
+        self._local_tests = None
 
+        self._read_version()
+
+        # Check YAML file schema and other validation
+        self.file_is_valid = self._validate_file()
+
+        self.deserialized["scenarios"] = self.deserialized_scenarios
+
+        if self._cache_key is not None and self.file_is_valid:
+            self._cache.store(
+                self._cache_key,
+                self.file_path,
+                {
+                    "files": self.files,
+                    "includes": self.includes,
+                    "deserialized": self.deserialized,
+                    "macros": (
+                        self.macros_mgr.known_macros,
+                        self.macros_mgr.used_macros,
+                    ),
+                },
+            )
+
+    def _read_version(self):
+        """Check the version of the file is supported."""
         self.major = self.deserialized["version"]["major"]
         self.minor = self.deserialized["version"]["minor"]
         self.bugfix = self.deserialized["version"]["bugfix"]
@@ -351,21 +1112,52 @@ class ScenarioReader:
             int(self.major), int(self.minor), int(self.bugfix)
         )
 
-        # Check YAML file schema and other validation
-        tempo_file_path = "/tmp/no_macros.yml"
-        with open(tempo_file_path, "w") as yml_wo_macros:
-            yaml.dump(self.deserialized, yml_wo_macros, default_flow_style=False)
-        self.file_is_valid = self._validate_file(tempo_file_path)
+    def _includes_unchanged(self, entry):
+        """Return whether each include still resolves to the file read then.
 
-        self.deserialized["scenarios"] = self.deserialized_scenarios
+        Includes are looked for from the current directory first, the same
+        include path may lead to another file from another directory.
+        """
+        if "includes" not in entry:  # kept before includes were recorded
+            return False
+        for (including_file, include_path), recorded in entry["includes"].items():
+            try:
+                resolved = full_path(include_path, including_file)
+            except FileNotFound:
+                resolved = None
+            if resolved != recorded:
+                logger.info(
+                    "%s now resolves to %s, reading %s again",
+                    include_path,
+                    resolved,
+                    self.file_path,
+                )
+                return False
+        return True
+
+    def _restore(self, entry):
+        """Take the file as it was read and validated, from a ParseCache entry."""
+        self.files = entry["files"]
+        self.includes = entry["includes"]
+        self.deserialized = entry["deserialized"]
+        self.deserialized_scenarios = self.deserialized["scenarios"]
+
+        # macros defined and used while reading the file
+        known_macros, used_macros = entry["macros"]
+        self.macros_mgr.known_macros.update(known_macros)
+        self.macros_mgr.mark_as_used(used_macros)
+
+        self._read_version()
+        self.file_is_valid = True
 
     def _deserialize(self):
-        """Deserialize the YAML file and its included scenarios.
+        """Deserialize the YAML file, its included scenarios are read after.
 
-        :returns: The deserialized file and scenarios.
+        :returns: the arguments of read_include of each file included, None
+                  for local tests.
         """
         logger.info("Reading file...")
-        wetest_file = self._substitute_macros(yaml.safe_load(self.file))
+        wetest_file = self._read_file()
         logger.info("Read file.")
 
         # initialise include, tests and config block if not defined
@@ -383,6 +1175,7 @@ class ScenarioReader:
             wetest_file["config"].setdefault("prefix", "")
             wetest_file["config"].setdefault("use_prefix", True)
             wetest_file["config"].setdefault("delay", 1)
+            wetest_file["config"].setdefault("delay_mode", FIXED)
             wetest_file["config"].setdefault("ignore", False)
             wetest_file["config"].setdefault("skip", False)
             wetest_file["config"].setdefault(
@@ -390,6 +1183,7 @@ class ScenarioReader:
                 CONTINUE if wetest_file["config"]["type"] == "unit" else PAUSE,
             )
             wetest_file["config"].setdefault("retry", 0)
+            wetest_file["config"].setdefault("retry_policy", {})
 
         # transform local tests into something similar to an imported scenario
         local_tests = {
@@ -402,7 +1196,20 @@ class ScenarioReader:
         logger.info("Reading scenario file(s)...")
         self.deserialized_scenarios = []
 
-        for scenario in wetest_file["include"]:
+        self.deserialized = wetest_file
+        self._local_tests = local_tests
+
+        # resolve the files to include first, to read them all at once
+        return self._resolve_includes(wetest_file["include"])
+
+    def _resolve_includes(self, include_block):
+        """Return the ScenarioReader arguments of each file included.
+
+        :param include_block: The include block of the file.
+        :returns: the arguments of read_include, None for local tests.
+        """
+        includes = []
+        for scenario in include_block:
             if self.propagate:
                 sc_macros_mgr = self.macros_mgr.deep_copy()
             else:
@@ -410,7 +1217,7 @@ class ScenarioReader:
 
             logger.debug("Processing: %s", scenario)
             if isinstance(scenario, str) and scenario == "tests":
-                self.deserialized_scenarios.append(local_tests)
+                includes.append(None)
                 continue
 
             if isinstance(scenario, list):
@@ -429,24 +1236,20 @@ class ScenarioReader:
             else:  # case with no macros
                 scenario_path = scenario
 
-            scenario_path = self.get_full_path(scenario_path)
+            resolved_path = self.get_full_path(scenario_path)
+            self.includes[self.file_path, scenario_path] = resolved_path
+            scenario_path = resolved_path
             logger.debug("Reading: %s", scenario_path)
             logger.debug("with macros: %s", sc_macros_mgr.known_macros)
-
-            # deserialize scenario and append
-            new_sc = ScenarioReader(
-                scenario_path,
-                macros_mgr=sc_macros_mgr,
-                suite_macros=self.macros_mgr.known_macros,
+            includes.append(
+                (
+                    scenario_path,
+                    sc_macros_mgr,
+                    self.macros_mgr.known_macros,
+                    self.stream,
+                ),
             )
-            self.deserialized_scenarios += new_sc.deserialized_scenarios
-
-            # mark macro used in scenario as used for wetest_file
-            self.macros_mgr.mark_as_used(new_sc.macros_mgr.used_macros)
-
-        logger.debug("Read scenario file(s).")
-
-        return wetest_file
+        return includes
 
     def get_full_path(self, file_path):
         """Return the absolute path of a file.
@@ -460,43 +1263,22 @@ class ScenarioReader:
 
         :returns: absolute path or raise a FileNotFoundError if nothings match.
         """
-        if os.path.isfile(
-            os.path.abspath(file_path),
-        ):  # absolute or relative to current location
-            return os.path.abspath(file_path)
-
-        current_file_location = os.path.dirname(self.file_path)
-        abs_path = os.path.abspath(os.path.join(current_file_location, file_path))
+        return full_path(file_path, self.file_path)
 
-        if os.path.isfile(abs_path):
-            return abs_path
-
-        raise FileNotFound(
-            "Could not find either of these files:"
-            "\n- " + os.path.abspath(file_path) + "\n- " + abs_path,
-        )
-
-    def _validate_file(self, file_path=None):
+    def _validate_file(self):
         """Check if YAML file format is valid. Check if all found macro was defined.
 
-        :param file_path: Specify the path of the file to check (should be
-                          useful for testing only).
+        The deserialized file is validated, macros substituted.
 
         :returns: a boolean on whether it succeeded or not.
         """
-        file_path = file_path or self.file_path
-        # we actually validate file_path and not self.filepath,
-        # but self.file_path holds more useful information to display
         fv_logger.log(
             LVL_FORMAT_VAL,
             "Validation of YAML scenario file: %s",
             self.file_path,
         )
 
-        schema_path = resource_filename("wetest", "resources/scenario_schema.yaml")
-        config = Core(source_file=file_path, schema_files=[schema_path])
-
-        return self.validate_file(config)
+        return self.validate_file(compiled_schema().core(self.deserialized))
 
     def mandatory_validation(self):
         """Additional tests not possible through schema.
@@ -573,6 +1355,18 @@ class ScenarioReader:
                     "but got: {}".format(config["delay"]),
                 )
 
+            if "delay_mode" in config and config["delay_mode"] not in [
+                FIXED,
+                SETTLE,
+                ADAPTIVE,
+            ]:
+                errors.append(
+                    "`delay_mode` in `config` is supposed to be "
+                    "either `fixed`, `settle` or `adaptive` but got: {}".format(
+                        config["delay_mode"],
+                    ),
+                )
+
             if "ignore" in config and not isinstance(config["ignore"], bool):
                 errors.append(
                     "`ignore` in `config` is supposed to be a boolean but got: {}".format(
@@ -773,6 +1567,72 @@ class ScenarioReader:
 
         return deserialized
 
+    def _read_file(self):
+        """Return the content of the file, macros substituted."""
+        stream = self.stream
+        if stream is None:
+            stream = os.path.getsize(self.file_path) >= STREAMED_FILE_SIZE
+        if stream:
+            return self._read_streaming()
+        return self._substitute_macros(
+            read_template(self.file_path, self.files[self.file_path]),
+        )
+
+    def _read_streaming(self):
+        """Read the file tests one by one, substituting macros in each as read.
+
+        Unlike templates, the file is never held as a whole YAML document,
+        nor kept once read, only its tests once substituted. Should the macros
+        block of the file come after its tests, the file is read again, with
+        its macros known from the start.
+
+        :returns: The deserialized file.
+        """
+        logger.debug("Streaming %s", self.file_path)
+        macros_mgr = self.macros_mgr.deep_copy()
+        read_errors = list(self.macros_mgr.read_errors)
+        deserialized, late_macros = self._stream_blocks()
+        if late_macros is not None:
+            logger.debug("Macros after the tests, streaming %s again", self.file_path)
+            self.macros_mgr.known_macros = macros_mgr.known_macros
+            self.macros_mgr.used_macros = macros_mgr.used_macros
+            self.macros_mgr.unknown_macros = macros_mgr.unknown_macros
+            self.macros_mgr.read_errors = read_errors
+            deserialized, _ = self._stream_blocks(late_macros)
+
+        for block, content in deserialized.items():
+            if block != "tests":
+                deserialized[block] = self.macros_mgr.substitute_macros(content)
+
+        self.macros_mgr.raise_errors()
+
+        return deserialized
+
+    def _stream_blocks(self, macros=None):
+        """Read the file blocks, substituting macros in tests as they are read.
+
+        :param macros: The macros block of the file, added before reading it
+                       and then skipped.
+        :returns: The blocks read, others than tests not substituted, and the
+                  macros block if it came after the tests, the file being
+                  then only read up to it.
+        """
+        deserialized = {}
+        if macros is not None:
+            self.macros_mgr.add_new_macros(macros)
+        for block, content in iter_scenario(self.file_path):
+            if block == "tests":
+                deserialized[block] = [
+                    self.macros_mgr.substitute_macros(test) for test in content
+                ]
+            elif block != "macros":
+                deserialized[block] = content
+            elif macros is None and "tests" in deserialized:
+                return deserialized, content
+            elif macros is None:
+                self.macros_mgr.add_new_macros(content)
+        return deserialized, None
+
     def validate_file(self: "ScenarioReader", config: Core) -> bool:
         """Run the schema, non-compulsory and compylsory validation.
 
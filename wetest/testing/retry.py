@@ -0,0 +1,114 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Decide when and how long to wait before retrying a failed subtest."""
+
+import logging
+import math
+import random
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+# backoff kinds
+FIXED_BACKOFF = "fixed"
+EXPONENTIAL_BACKOFF = "exponential"
+JITTER_BACKOFF = "jitter"
+
+# defaults of the retry_policy block
+DEFAULT_INTERVAL = 0.1
+DEFAULT_FACTOR = 2.0
+# time budget of a subtest retrying forever, when none is given (seconds)
+INFINITE_RETRY_MAX_TIME = 600.0
+
+
+class RetryPolicy:
+    """How a subtest is executed again after a failure.
+
+    retry:          number of retries allowed (may be infinite)
+    backoff:        `fixed` waits interval between attempts,
+                    `exponential` multiplies the wait by factor after each one,
+                    `jitter` waits a random time up to the exponential one
+    interval:       first wait between two attempts (seconds)
+    factor:         multiplier of exponential and jitter backoffs
+    max_interval:   maximum wait between two attempts (seconds)
+    max_time:       maximum time spent in a subtest, retries included (seconds)
+                    retrying stops once reached, infinite retries default to
+                    INFINITE_RETRY_MAX_TIME
+    """
+
+    def __init__(
+        self,
+        retry=0,
+        backoff=FIXED_BACKOFF,
+        interval=DEFAULT_INTERVAL,
+        factor=DEFAULT_FACTOR,
+        max_interval=None,
+        max_time=None,
+    ) -> None:
+        self.retry = retry
+        if backoff not in [FIXED_BACKOFF, EXPONENTIAL_BACKOFF, JITTER_BACKOFF]:
+            logger.critical("Unexpected backoff value: %s", backoff)
+            backoff = FIXED_BACKOFF
+        self.backoff = backoff
+        self.interval = max(0.0, float(interval))
+        self.factor = float(factor)
+        self.max_interval = None if max_interval is None else float(max_interval)
+        self.max_time = None if max_time is None else float(max_time)
+        if self.max_time is None and math.isinf(self.retry):
+            self.max_time = INFINITE_RETRY_MAX_TIME
+
+    @classmethod
+    def from_data(cls, retry, policy_data):
+        """Create a policy from a retry number and a `retry_policy` block."""
+        return cls(retry=retry, **(policy_data or {}))
+
+    def __str__(self) -> str:
+        return (
+            f"{self.backoff} backoff, interval {self.interval}s, "
+            f"factor {self.factor}, max interval {self.max_interval}s, "
+            f"max time {self.max_time}s"
+        )
+
+    def should_retry(self, nb_exec, elapsed):
+        """Tell whether a subtest failing its nb_exec-th execution is retried.
+
+        :param nb_exec: number of executions so far.
+        :param elapsed: time spent in the subtest so far (seconds).
+        """
+        if nb_exec > self.retry:
+            return False
+        return self.max_time is None or elapsed < self.max_time
+
+    def wait_time(self, nb_exec, elapsed):
+        """Return how long to wait before the next execution (seconds).
+
+        :param nb_exec: number of executions so far.
+        :param elapsed: time spent in the subtest so far (seconds).
+        """
+        wait = self.interval
+        if self.backoff != FIXED_BACKOFF:
+            # avoid overflows with long lasting retries
+            wait *= self.factor ** min(nb_exec - 1, 100)
+        if self.max_interval is not None:
+            wait = min(wait, self.max_interval)
+        if self.backoff == JITTER_BACKOFF:
+            wait = random.uniform(0, wait)  # noqa: S311 not for cryptography
+        if self.max_time is not None:
+            wait = min(wait, max(0.0, self.max_time - elapsed))
+        return wait
@@ -0,0 +1,398 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Run generated tests."""
+
+# Asserts are used here, like in generated tests
+# ruff: noqa: S101
+
+import logging
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import epics
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+from wetest.pvs.pool import PV_POOL, normalize_pv_name
+from wetest.testing import control, dag, metrics
+from wetest.testing.capture import CAPTURE
+from wetest.testing.generator import (
+    SubtestSweep,
+    check_test_consistency,
+    log_error,
+    log_failure,
+    log_run_control,
+    log_running,
+    log_success,
+    on_failure_request,
+)
+from wetest.testing.metrics import METRICS
+from wetest.testing.reader import CONTINUE, FIXED
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+
+class TestGroup:
+    """Subtests of a same test, to be executed in order.
+
+    The subtests of a sweep are only created once the group runs.
+
+    scenario:   scenario index
+    test:       test index in the scenario
+    indexes:    plan indexes of the subtests
+    title:      title of the test
+    after:      indexes of the tests it waits for, see TestData
+    delay:      sum of the delays of the subtests (seconds)
+    pvs:        normalized names of the PVs used by the subtests
+    """
+
+    def __init__(self, plan, scenario, test, start) -> None:
+        self.plan = plan
+        self.scenario = scenario
+        self.test = test
+        self.indexes = range(start, start)
+        self.title = None
+        self.after = None
+        self.delay = 0.0
+        self.pvs = set()
+
+    def __len__(self) -> int:
+        return len(self.indexes)
+
+    def add(self, entry):
+        """Append the subtests of a plan entry, as from TestPlan.entries."""
+        if isinstance(entry, SubtestSweep):
+            length = len(entry)
+            title = entry.fields["test_title"]
+            after = entry.after
+            delay = entry.delay()
+            pv_names = entry.pv_names()
+        else:
+            length = 1
+            title = entry.data.test_title
+            after = entry.data.after
+            delay = entry.data.delay
+            pv_names = (entry.data.setter, entry.data.getter)
+
+        if not self.indexes:
+            self.title = title
+            self.after = after
+        self.indexes = range(self.indexes.start, self.indexes.stop + length)
+        self.delay += delay
+        for pv_name in pv_names:
+            if pv_name is not None:
+                self.pvs.add(normalize_pv_name(pv_name))
+
+    def subtests(self):
+        """Yield the PlannedTest and TestData of each subtest, creating them."""
+        for index in self.indexes:
+            planned_test = self.plan[index]
+            yield planned_test, planned_test.data
+
+    def run(self, result):
+        """Run the subtests one after the other."""
+        for test_case, _test_data in self.subtests():
+            test_case(result)
+        return result
+
+
+def group_tests(suite):
+    """Split suite in TestGroup, keeping execution order.
+
+    Groups are built from the entries of the plan, without creating subtests.
+    """
+    groups = []
+    for start, entry in suite.entries():
+        if isinstance(entry, SubtestSweep):
+            scenario, test = entry.numbers
+        else:
+            scenario, test, _subtest = entry.data.numbers
+        if not groups or (groups[-1].scenario, groups[-1].test) != (scenario, test):
+            groups.append(TestGroup(suite, scenario, test, start))
+        groups[-1].add(entry)
+    return groups
+
+
+def is_batchable(test_data):
+    """Tell whether a subtest can be read along with its neighbours.
+
+    Only getter-only subtests with a fixed delay, no retry, no window and no
+    capture, that do not pause nor abort the run on failure, are batched.
+    """
+    return (
+        test_data.setter is None
+        and test_data.set_value is None
+        and test_data.getter is not None
+        and test_data.get_value is not None
+        and test_data.retry == 0
+        and test_data.delay_mode == FIXED
+        and test_data.window is None
+        and not CAPTURE.applies(test_data)
+        and test_data.on_failure == CONTINUE
+    )
+
+
+def run_batch(batch, result):
+    """Run getter-only subtests with a single read of all their getters.
+
+    The longest delay of the batch is waited once, then all the getters are
+    read in one Channel Access round trip and compared one after the other.
+    The duration of each subtest is the time actually waited for its value,
+    the shared delay and read.
+
+    :param batch:  list of (test_case, test_data) of batchable subtests.
+    :param result: the RunResults to record outcomes in.
+    """
+    control.checkpoint()
+    start_time = time.time()
+    for _test_case, test_data in batch:
+        log_running(test_data)
+
+    control.sleep(max(test_data.delay for _test_case, test_data in batch))
+    get_start = time.time()
+    values = PV_POOL.get_values(
+        [(test_data.getter, test_data.comparator.as_string) for _, test_data in batch],
+    )
+    assert len(values) == len(batch), "One value should be read per batched subtest"
+    get_time = time.time() - get_start
+    elapsed = time.time() - start_time
+    for _test_case, test_data in batch:
+        METRICS.record(metrics.GET, test_data.getter, get_time)
+
+    for (test_case, test_data), value in zip(batch, values):
+        on_failure = on_failure_request(test_data)
+        result.startTest(test_case)
+        try:
+            check_test_consistency(test_data)
+            assert value is not None, f"Unable to read getter PV {test_data.getter}"
+            test_data.comparator.check(value)
+        except AssertionError as e:
+            log_failure(test_data, elapsed, e)
+            log_run_control(on_failure)
+            result.addFailure(test_case, sys.exc_info())
+        except Exception as e:  # noqa: BLE001 reported as test error
+            log_error(test_data, elapsed, e, getter_error=True)
+            log_run_control(on_failure)
+            result.addError(test_case, sys.exc_info())
+        else:
+            log_success(test_data, elapsed)
+            result.addSuccess(test_case)
+        finally:
+            result.stopTest(test_case, duration=elapsed)
+
+
+def release(waiting, group):
+    """Remove a finished group from the groups waited for, if any."""
+    if waiting:
+        for groups in waiting.values():
+            groups.discard(group)
+
+
+def log_dependencies(scenario, dependencies):
+    """Log how a scenario run as a dependency graph is expected to go."""
+    length, path = dag.critical_path(dependencies, dag.planned_duration)
+    logger.info(
+        "Running scenario %d as %d chains, critical path of %.3fs of delays "
+        "out of %.3fs: %s",
+        scenario,
+        sum(1 for groups in dependencies.values() if not groups),
+        length,
+        sum(dag.planned_duration(group) for group in dependencies),
+        dag.path_titles(path),
+    )
+
+
+def log_critical_path(groups, result):
+    """Log the critical path of a scenario run as a dependency graph."""
+    for scenario, (length, path, total) in dag.critical_paths(groups, result).items():
+        logger.info(
+            "Scenario %d critical path took %.3fs, its tests %.3fs: %s",
+            scenario,
+            length,
+            total,
+            dag.path_titles(path),
+        )
+
+
+class ConcurrentTestSuite:
+    """Run the tests of unit scenarios on a pool of workers.
+
+    Tests from unit scenarios are independent, several of them are executed at
+    the same time, but never two tests using the same setter or getter PV.
+    Subtests of a test are still executed in order, and functional scenarios
+    are executed sequentially as usual, unless their tests have `after` fields:
+    tests that do not wait for each other are then executed at the same time
+    (see dag).
+
+    When unit scenarios are executed sequentially, back to back getter-only
+    subtests are batched (see is_batchable and run_batch). Functional
+    scenarios never are, each subtest waiting for its own delay in order.
+
+    Like a unittest.TestSuite, an instance is called with a RunResults,
+    shared by the workers.
+
+    :param suite:   A TestPlan.
+    :param configs: Suite and scenarios config blocks, as from generate_tests.
+    :param jobs:    Maximum number of tests running at the same time.
+    :param scenarios: Indexes of the scenarios to run, None to run them all.
+    """
+
+    def __init__(self, suite, configs, jobs, scenarios=None) -> None:
+        self.suite = suite
+        self.configs = configs
+        self.jobs = max(1, int(jobs))
+        self.scenarios = scenarios
+
+    def countTestCases(self):  # noqa: N802 same as unittest
+        return self.suite.countTestCases()
+
+    def scenario_type(self, scenario_index):
+        """Return the type of a scenario from its config block."""
+        # first config is the suite one
+        if scenario_index + 1 < len(self.configs):
+            return str(self.configs[scenario_index + 1].get("type")).lower()
+        return None
+
+    def __call__(self, result):
+        return self.run(result)
+
+    def scenario_groups(self):
+        """Return the TestGroup of the suite, as one list per scenario."""
+        scenario_groups = []
+        for group in group_tests(self.suite):
+            if self.scenarios is not None and group.scenario not in self.scenarios:
+                continue
+            if not scenario_groups or scenario_groups[-1][0].scenario != group.scenario:
+                scenario_groups.append([])
+            scenario_groups[-1].append(group)
+        return scenario_groups
+
+    def startable_groups(
+        self, pending, nb_running, pvs_in_use, waiting=None, jobs=None
+    ):
+        """Yield pending groups that can start, removing them from pending.
+
+        A group can start if it does not use any PV from pvs_in_use, if it
+        does not wait for any group in waiting, and if less than jobs groups
+        are running (0 meaning no limit, defaults to `jobs` of the runner).
+        """
+        jobs = self.jobs if jobs is None else jobs
+        for group in list(pending):
+            if jobs and nb_running >= jobs:
+                break
+            if group.pvs & pvs_in_use:
+                continue
+            if waiting and waiting[group]:
+                continue
+            pending.remove(group)
+            pvs_in_use.update(group.pvs)
+            nb_running += 1
+            yield group
+
+    def run(self, result):
+        """Run the tests, scenario after scenario."""
+        for groups in self.scenario_groups():
+            dependencies = dag.group_dependencies(groups)
+            if dependencies is not None:
+                log_dependencies(groups[0].scenario, dependencies)
+                self._run_concurrently(groups, result, dependencies)
+                log_critical_path(groups, result)
+            elif self.jobs > 1 and self.scenario_type(groups[0].scenario) == "unit":
+                logger.info(
+                    "Running scenario %d on %d workers",
+                    groups[0].scenario,
+                    self.jobs,
+                )
+                self._run_concurrently(groups, result)
+            else:
+                self._run_sequentially(
+                    groups,
+                    result,
+                    batching=self.scenario_type(groups[0].scenario) == "unit",
+                )
+
+        return result
+
+    def _run_sequentially(self, groups, result, *, batching=False):
+        """Run groups one after the other.
+
+        :param batching: Whether to batch getter-only subtests (see run_batch).
+        """
+        batch = []
+        for group in groups:
+            for test_case, test_data in group.subtests():
+                if result.shouldStop:
+                    return
+                if (
+                    batching
+                    and is_batchable(test_data)
+                    and result.skip_reason(test_data.id) is None
+                ):
+                    batch.append((test_case, test_data))
+                    continue
+                self._run_batch(batch, result)
+                batch = []
+                test_case(result)
+        self._run_batch(batch, result)
+
+    def _run_batch(self, batch, result):
+        """Run a batch, a lone subtest does not need the batch machinery."""
+        if len(batch) > 1:
+            logger.debug("Reading %d getters at once", len(batch))
+            run_batch(batch, result)
+        elif batch:
+            batch[0][0](result)
+
+    def _run_concurrently(self, groups, result, dependencies=None):
+        """Run groups on the workers, waiting for the PVs they use to be free.
+
+        With dependencies, groups also wait for the groups they depend on, and
+        as many groups as possible run at the same time, unless limited by jobs.
+        """
+        pending = list(groups)
+        running = {}
+        pvs_in_use = set()
+        waiting = None
+        jobs = self.jobs
+        if dependencies is not None:
+            waiting = {group: set(after) for group, after in dependencies.items()}
+            jobs = self.jobs if self.jobs > 1 else 0
+
+        with ThreadPoolExecutor(
+            max_workers=jobs or len(groups),
+            thread_name_prefix="wetest-worker",
+            initializer=epics.ca.use_initial_context,
+        ) as executor:
+            while pending or running:
+                # start every test whose PVs are not already used
+                for group in self.startable_groups(
+                    pending,
+                    len(running),
+                    pvs_in_use,
+                    waiting,
+                    jobs,
+                ):
+                    future = executor.submit(group.run, result)
+                    running[future] = group
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    group = running.pop(future)
+                    pvs_in_use.difference_update(group.pvs)
+                    release(waiting, group)
+                    future.result()
@@ -0,0 +1,151 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Learn how long getters take to settle after a put, across runs.
+
+Settle times observed by subtests in `settle` and `adaptive` delay modes are
+kept for each setter and getter pair in a JSON file. Subtests in `adaptive`
+mode then wait for a high percentile of the settle times of their pair, times
+a safety factor, rather than for their whole delay.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX, saving processes may then lose samples
+    fcntl = None
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+DEFAULT_HISTORY_PATH = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "wetest"
+    / "settle-history.json"
+)
+# settle times kept per pair, the most recent ones
+MAX_SAMPLES = 200
+# settle times needed before waiting for less than the whole delay
+MIN_SAMPLES = 5
+# learned delay is this percentile of the settle times, times the safety factor
+PERCENTILE = 95
+SAFETY_FACTOR = 1.5
+
+
+def pair_key(setter, getter):
+    """Return the key of a setter and getter pair in the history."""
+    return f"{setter or ''} -> {getter}"
+
+
+class SettleHistory:
+    """Settle times observed for each setter and getter pair.
+
+    The file is read on first use. Saving merges the settle times recorded
+    since then with the ones saved meanwhile by other processes, such as
+    shard workers.
+
+    :param path: The JSON file, None to neither read nor save any history.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH) -> None:
+        self.path = path
+        self._samples = None
+        self._new = {}
+        self._lock = threading.Lock()
+
+    def _read(self):
+        """Return the settle times saved in the file, by pair key."""
+        if self.path is None:
+            return {}
+        try:
+            with Path(self.path).open() as history_file:
+                return json.load(history_file)["pairs"]
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring settle history %s: %s", self.path, e)
+            return {}
+
+    def _loaded(self):
+        if self._samples is None:
+            self._samples = self._read()
+        return self._samples
+
+    def samples(self, setter, getter):
+        """Return the settle times of a pair, oldest first."""
+        with self._lock:
+            return list(self._loaded().get(pair_key(setter, getter), []))
+
+    def learned_delay(self, setter, getter, delay):
+        """Return the time to wait for a pair, None while still learning.
+
+        :param delay: The configured delay, never exceeded.
+        """
+        samples = self.samples(setter, getter)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return min(delay, float(np.percentile(samples, PERCENTILE)) * SAFETY_FACTOR)
+
+    def record(self, setter, getter, settle_time):
+        """Add a settle time observed for a pair."""
+        key = pair_key(setter, getter)
+        with self._lock:
+            samples = self._loaded().setdefault(key, [])
+            samples.append(settle_time)
+            del samples[:-MAX_SAMPLES]
+            self._new.setdefault(key, []).append(settle_time)
+
+    def save(self):
+        """Write the settle times recorded since last save to the file."""
+        with self._lock:
+            if self.path is None or not self._new:
+                return
+            path = Path(self.path)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with path.with_suffix(".lock").open("w") as lock_file:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    pairs = self._read()
+                    for key, samples in self._new.items():
+                        pairs[key] = (pairs.get(key, []) + samples)[-MAX_SAMPLES:]
+                    temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+                    with temp_path.open("w") as history_file:
+                        json.dump({"pairs": pairs}, history_file)
+                    temp_path.replace(path)
+            except OSError as e:
+                logger.warning("Could not save settle history %s: %s", path, e)
+                return
+            logger.info(
+                "Saved %d settle times to %s",
+                sum(len(samples) for samples in self._new.values()),
+                path,
+            )
+            self._samples = pairs
+            self._new = {}
+
+
+# settle times shared by the tests of a process
+SETTLE_HISTORY = SettleHistory()
@@ -0,0 +1,231 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Distribute whole scenarios over several runner processes."""
+
+import logging
+import multiprocessing
+import queue
+
+import epics
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+from wetest.pvs.pool import PV_POOL
+from wetest.testing.aio import AsyncTestSuite
+from wetest.testing.control import RunAbortedError
+from wetest.testing.metrics import METRICS
+from wetest.testing.plan import NOT_RUN, RunResults
+from wetest.testing.runner import ConcurrentTestSuite, group_tests
+from wetest.testing.settle import SETTLE_HISTORY
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+# how often the collector checks that workers are still alive (seconds)
+WORKERS_CHECK_PERIOD = 1.0
+
+
+# TestData attributes filled in by the runners, sent back by the workers
+RECORDED_ATTRIBUTES = (
+    "retries",
+    "retry_time",
+    "settle_time",
+    "learned_delay",
+    "capture",
+)
+
+
+def scenario_outcome(scenario, result):
+    """Summarize the result of a scenario, to be sent between processes.
+
+    Planned tests are designated by their index in the plan, only the ones
+    run are sent, subtests not run are not created.
+    """
+    records = []
+    recorded = {}
+    for group in group_tests(result.plan):
+        if group.scenario != scenario:
+            continue
+        for index in group.indexes:
+            status = result.status[index]
+            if status == NOT_RUN:
+                continue
+            test_data = result.plan.test_data(index)
+            recorded[index] = tuple(
+                getattr(test_data, attribute) for attribute in RECORDED_ATTRIBUTES
+            )
+            records.append(
+                (
+                    index,
+                    status,
+                    result.messages.get(index),
+                    result.durations[index],
+                ),
+            )
+    return {
+        "scenario": scenario,
+        "tests_run": result.testsRun,
+        "records": records,
+        "recorded": recorded,
+        "metrics": METRICS.take(),
+    }
+
+
+def merge_outcome(result, outcome):
+    """Add a scenario outcome to result."""
+    result.add_tests_run(outcome["tests_run"])
+    for record in outcome["records"]:
+        result.record(*record)
+    METRICS.merge(outcome["metrics"])
+    for index, values in outcome["recorded"].items():
+        for attribute, value in zip(RECORDED_ATTRIBUTES, values):
+            setattr(result.plan.test_data(index), attribute, value)
+
+
+def run_shard(sharded_suite, skip_reasons, tasks, outcomes):
+    """Run the scenarios received from tasks until None is received.
+
+    Test results are logged as usual, the outcome of each scenario is put in
+    outcomes, followed by None once done.
+    """
+    # latencies are sent back with the outcomes, not the ones of the runner
+    METRICS.take()
+    try:
+        while True:
+            scenario = tasks.get()
+            if scenario is None:
+                break
+            logger.info(
+                "Running scenario %d in process %d",
+                scenario,
+                multiprocessing.current_process().pid,
+            )
+            PV_POOL.warm_up(sharded_suite.scenario_pvs(scenario))
+            result = RunResults(sharded_suite.suite, skip_reasons)
+            try:
+                sharded_suite.scenario_suite(scenario)(result)
+            except RunAbortedError:
+                logger.info("Scenario %d aborted", scenario)
+                outcomes.put(scenario_outcome(scenario, result))
+                break
+            except Exception:
+                logger.exception("Scenario %d could not be run", scenario)
+            outcomes.put(scenario_outcome(scenario, result))
+    finally:
+        PV_POOL.close()
+        SETTLE_HISTORY.save()
+        outcomes.put(None)
+
+
+class ShardedTestSuite:
+    """Run whole scenarios in parallel, on several runner processes.
+
+    Scenarios are handed to the workers one at a time, the ones with the most
+    subtests first. Workers log test results as usual, so that they are
+    streamed to the GUI, and send back the outcome of each scenario, merged
+    in a single RunResults for the report. Being forked from the runner
+    process, workers follow its run control.
+
+    Like a unittest.TestSuite, an instance is called with a RunResults.
+
+    :param suite:       A TestPlan.
+    :param configs:     Suite and scenarios config blocks, as from generate_tests.
+    :param shards:      Number of runner processes.
+    :param jobs:        Jobs of each runner process (see ConcurrentTestSuite).
+    :param use_asyncio: Whether workers run their tests on an event loop.
+    """
+
+    def __init__(
+        self,
+        suite,
+        configs,
+        shards,
+        jobs=None,
+        use_asyncio=False,  # noqa: FBT002 same as command line flag
+    ) -> None:
+        self.suite = suite
+        self.configs = configs
+        self.shards = max(1, int(shards))
+        self.jobs = jobs
+        self.use_asyncio = use_asyncio
+
+    def countTestCases(self):  # noqa: N802 same as unittest
+        return self.suite.countTestCases()
+
+    def __call__(self, result):
+        return self.run(result)
+
+    def scenario_suite(self, scenario):
+        """Return the runner of a single scenario."""
+        if self.use_asyncio:
+            return AsyncTestSuite(self.suite, self.configs, self.jobs, {scenario})
+        return ConcurrentTestSuite(self.suite, self.configs, self.jobs or 1, {scenario})
+
+    def scenario_pvs(self, scenario):
+        """Return the names of the PVs used by a scenario."""
+        return {
+            pv_name
+            for group in group_tests(self.suite)
+            if group.scenario == scenario
+            for pv_name in group.pvs
+        }
+
+    def scenarios(self):
+        """Return the scenarios indexes, the ones with the most subtests first."""
+        sizes = {}
+        for group in group_tests(self.suite):
+            sizes[group.scenario] = sizes.get(group.scenario, 0) + len(group)
+        return sorted(sizes, key=lambda scenario: -sizes[scenario])
+
+    def run(self, result):
+        """Run the scenarios on the workers and merge their outcomes."""
+        scenarios = self.scenarios()
+        tasks = multiprocessing.Queue()
+        outcomes = multiprocessing.Queue()
+        for scenario in scenarios:
+            tasks.put(scenario)
+
+        workers = []
+        for index in range(min(self.shards, len(scenarios))):
+            tasks.put(None)
+            worker = epics.CAProcess(
+                target=run_shard,
+                args=(self, result.skip_reasons, tasks, outcomes),
+                name=f"wetest-shard-{index}",
+            )
+            worker.start()
+            workers.append(worker)
+        logger.info(
+            "Running %d scenarios on %d processes", len(scenarios), len(workers)
+        )
+
+        nb_done = 0
+        while nb_done < len(workers):
+            try:
+                outcome = outcomes.get(timeout=WORKERS_CHECK_PERIOD)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    logger.error("Runner processes ended without all outcomes.")  # noqa: TRY400
+                    break
+                continue
+            if outcome is None:
+                nb_done += 1
+            else:
+                merge_outcome(result, outcome)
+
+        for worker in workers:
+            worker.join()
+        return result
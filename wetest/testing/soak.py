@@ -0,0 +1,101 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Run the tests again and again, measuring the load they put on the IOCs."""
+
+import logging
+import time
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+from wetest.testing.events import ERROR, FAILURE
+from wetest.testing.metrics import METRICS
+from wetest.testing.plan import NOT_RUN, RunResults
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+
+def merge_iteration(result, iteration_result, iteration):
+    """Add the outcomes of an iteration to result.
+
+    A subtest keeps its first failure or error, otherwise its last outcome.
+    """
+    result.add_tests_run(iteration_result.testsRun)
+    for index, status in enumerate(iteration_result.status):
+        if status == NOT_RUN or result.status[index] in (FAILURE, ERROR):
+            continue
+        message = iteration_result.messages.get(index)
+        if status in (FAILURE, ERROR):
+            message = f"Iteration {iteration}: {message}"
+        result.record(index, status, message, iteration_result.durations[index])
+
+
+class SoakTestSuite:
+    """Run the tests with another runner, again and again.
+
+    Put, get and settle latencies of each PV are measured meanwhile, and
+    given along with the result, as its `metrics`.
+
+    Like a unittest.TestSuite, an instance is called with a RunResults.
+
+    :param runner:   The runner of a single iteration, like a ConcurrentTestSuite.
+    :param repeat:   Number of iterations, None for no limit.
+    :param duration: Time after which no iteration is started (seconds),
+                     None for no limit.
+    """
+
+    def __init__(self, runner, repeat=None, duration=None) -> None:
+        self.runner = runner
+        self.repeat = repeat
+        self.duration = duration
+
+    def countTestCases(self):  # noqa: N802 same as unittest
+        return self.runner.countTestCases()
+
+    def __call__(self, result):
+        return self.run(result)
+
+    def done(self, iteration, start_time):
+        """Tell whether no other iteration should be started."""
+        if self.repeat is not None and iteration >= self.repeat:
+            return True
+        return self.duration is not None and time.time() - start_time >= self.duration
+
+    def run(self, result):
+        """Run the iterations, merging their outcomes in result."""
+        METRICS.reset()
+        METRICS.enabled = True
+        start_time = time.time()
+        try:
+            while not result.shouldStop:
+                iteration_result = RunResults(result.plan, result.skip_reasons)
+                self.runner(iteration_result)
+                METRICS.iterations += 1
+                if not iteration_result.wasSuccessful():
+                    METRICS.failed_iterations += 1
+                merge_iteration(result, iteration_result, METRICS.iterations)
+                logger.info(
+                    "Iteration %d: %s",
+                    METRICS.iterations,
+                    iteration_result.summary().replace("\n\n", ", "),
+                )
+                if self.done(METRICS.iterations, start_time):
+                    break
+        finally:
+            METRICS.enabled = False
+            METRICS.elapsed = time.time() - start_time
+            result.metrics = METRICS.snapshot()
+        return result
@@ -0,0 +1,173 @@
+# Copyright (c) 2019 by CEA
+#
+# The full license specifying the redistribution, modification, usage and other
+# rights and obligations is included with the distribution of this project in
+# the file "LICENSE".
+#
+# THIS SOFTWARE IS PROVIDED AS-IS WITHOUT WARRANTY OF ANY KIND, NOT EVEN THE
+# IMPLIED WARRANTY OF MERCHANTABILITY. THE AUTHOR OF THIS SOFTWARE, ASSUMES
+# _NO_ RESPONSIBILITY FOR ANY CONSEQUENCE RESULTING FROM THE USE, MODIFICATION,
+# OR REDISTRIBUTION OF THIS SOFTWARE.
+
+"""Check a getter over a time window, rather than from a single read.
+
+The getter is monitored for the duration of the window, its value when the
+window opens and each monitor update being buffered as samples. The samples
+are then checked all at once: their mean against the expected value, their
+standard deviation, their extrema and their number.
+"""
+
+# Asserts are used here, like in generated tests
+# ruff: noqa: S101
+
+import logging
+import threading
+
+import numpy as np
+
+from wetest.common.constants import FILE_HANDLER, VERBOSE_FORMATTER
+
+# configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(VERBOSE_FORMATTER)
+logger.addHandler(stream_handler)
+logger.addHandler(FILE_HANDLER)
+
+# defaults of the window block
+DEFAULT_MIN_SAMPLES = 1
+DEFAULT_CAPACITY = 10000
+
+
+class SampleBuffer:
+    """Samples of a getter, the most recent ones kept in a ring buffer.
+
+    The extrema are tracked over all the samples added, so that a sample out
+    of band is never missed, even once overwritten.
+
+    :param capacity: Number of samples kept.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY) -> None:
+        self._values = np.empty(max(1, int(capacity)), dtype=float)
+        self.count = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+        # first value that could not be buffered, as an exception
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        """Buffer a sample, keeping the error if value is not a scalar."""
+        try:
+            value = float(value)
+        except (TypeError, ValueError) as e:
+            if self.error is None:
+                self.error = ValueError(f"Sample is not a number: {value!r} ({e})")
+            return
+        with self._lock:
+            self._values[self.count % len(self._values)] = value
+            self.count += 1
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    @property
+    def values(self):
+        """The samples kept, as a numpy array (not in order once wrapped)."""
+        with self._lock:
+            return self._values[: min(self.count, len(self._values))].copy()
+
+
+class WindowCheck:
+    """What a subtest asserts about the samples of its getter.
+
+    duration:    time monitoring the getter (seconds)
+    min_samples: minimum number of samples
+    stddev:      maximum standard deviation of the samples, None for no limit
+    low:         no sample may be lower, None for no limit (`min` field)
+    high:        no sample may be higher, None for no limit (`max` field)
+    capacity:    number of samples kept for the mean and standard deviation,
+                 the most recent ones
+
+    The mean of the samples is compared with the expected value, allowing the
+    margin and delta of the subtest.
+    """
+
+    def __init__(
+        self,
+        duration,
+        min_samples=DEFAULT_MIN_SAMPLES,
+        stddev=None,
+        low=None,
+        high=None,
+        capacity=DEFAULT_CAPACITY,
+    ) -> None:
+        self.duration = max(0.0, float(duration))
+        self.min_samples = int(min_samples)
+        self.stddev = None if stddev is None else float(stddev)
+        self.low = None if low is None else float(low)
+        self.high = None if high is None else float(high)
+        self.capacity = int(capacity)
+
+    @classmethod
+    def from_data(cls, window_data):
+        """Create a check from a `window` block, None if there is none."""
+        if not window_data:
+            return None
+        window_data = dict(window_data)
+        window_data["low"] = window_data.pop("min", None)
+        window_data["high"] = window_data.pop("max", None)
+        return cls(**window_data)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.duration}s window, at least {self.min_samples} samples, "
+            f"stddev {self.stddev}, band [{self.low}, {self.high}]"
+        )
+
+    def new_buffer(self):
+        """Return an empty buffer for the samples of a window."""
+        return SampleBuffer(self.capacity)
+
+    def check(self, getter, comparator, samples):
+        """Assert the samples of a window are the expected ones.
+
+        :param getter:     The getter PV name, for messages.
+        :param comparator: The Comparator of the subtest, checking the mean.
+        :param samples:    The SampleBuffer filled during the window.
+        """
+        if samples.error is not None:
+            raise samples.error
+        assert samples.count >= self.min_samples, (
+            f"Expected at least {self.min_samples} samples of {getter} "
+            f"in {self.duration:.3G}s, but got {samples.count}"
+        )
+        if samples.count == 0:
+            return
+
+        if self.low is not None:
+            assert samples.min >= self.low, (
+                f"Expected {getter} to stay above {self.low:.3G}, "
+                f"but got {samples.min:.3G}"
+            )
+        if self.high is not None:
+            assert samples.max <= self.high, (
+                f"Expected {getter} to stay below {self.high:.3G}, "
+                f"but got {samples.max:.3G}"
+            )
+
+        values = samples.values
+        if self.stddev is not None:
+            stddev = float(np.std(values))
+            assert stddev <= self.stddev, (
+                f"Expected standard deviation of {getter} to be at most "
+                f"{self.stddev:.3G}, but got {stddev:.3G}"
+            )
+
+        mean = float(np.mean(values))
+        try:
+            comparator.check(mean)
+        except AssertionError as e:
+            msg = f"Mean of {samples.count} samples: {e}"
+            raise AssertionError(msg) from None